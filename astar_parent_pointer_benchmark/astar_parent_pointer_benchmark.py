@@ -0,0 +1,107 @@
+# astar_parent_pointer_benchmark.py
+# 経路コピー型 A*（ヒープに path + [cur] を積む従来版）と
+# 親ポインタ型 A*（avlib.grid_astar）の実行時間・ヒープメモリ比較
+import heapq, time, tracemalloc
+import numpy as np
+import matplotlib.pyplot as plt
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.grid_astar import GridAStar
+
+SIZES = [100, 1000]
+DENSITY = 0.2
+REPEAT = 1   # 従来版は 1000x1000 で数十秒・数GB かかるので 1 回だけ
+SEED = 0
+
+# ====== 従来版（各スクリプトにあった経路コピー型） ======
+def a_star_path_copy(grid, start, goal):
+    size = len(grid)
+    h = lambda a, b: abs(a[0]-b[0]) + abs(a[1]-b[1])
+    open_set = [(h(start, goal), 0, start, [])]
+    visited = set()
+    while open_set:
+        _, cost, current, path = heapq.heappop(open_set)
+        if current in visited:
+            continue
+        visited.add(current)
+        path = path + [current]
+        if current == goal:
+            return path
+        for dx, dy in [(1,0), (-1,0), (0,1), (0,-1)]:
+            nx, ny = current[0]+dx, current[1]+dy
+            if 0<=nx<size and 0<=ny<size and grid[ny][nx]==0:
+                heapq.heappush(open_set,(cost+1+h((nx,ny),goal), cost+1, (nx,ny), path))
+    return []
+
+# ====== マップ生成（スタート・ゴールは空ける） ======
+def generate_grid(size, density, rng):
+    g = (rng.random((size, size)) < density)
+    g[0, 0] = g[-1, -1] = False
+    return g
+
+def measure(fn):
+    """(戻り値, 秒, tracemalloc のピーク [MB])"""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn()
+    dt = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, dt, peak / 1e6
+
+def run_benchmark():
+    rng = np.random.default_rng(SEED)
+    rows = []
+    for size in SIZES:
+        start, goal = (0, 0), (size-1, size-1)
+        # 経路が存在するマップを用意
+        while True:
+            blocked = generate_grid(size, DENSITY, rng)
+            planner = GridAStar(blocked.shape)
+            if planner.plan(start, goal, blocked):
+                break
+        grid = blocked.astype(int).tolist()
+
+        # 事前確保バッファ自体の大きさ（1回きり）
+        _, _, buf_mb = measure(lambda: GridAStar(blocked.shape))
+
+        res = {"size": size, "buffers_mb": buf_mb}
+        for name, fn in (("path_copy", lambda: a_star_path_copy(grid, start, goal)),
+                         ("parent_ptr", lambda: planner.plan(start, goal, blocked))):
+            times, peaks = [], []
+            for _ in range(REPEAT):
+                path, dt, peak = measure(fn)
+                times.append(dt); peaks.append(peak)
+            res[name] = (min(times), max(peaks), len(path))
+        rows.append(res)
+    return rows
+
+def main():
+    rows = run_benchmark()
+    print(f"{'size':>6} | {'path_copy [s]':>13} {'peak [MB]':>10} | {'parent_ptr [s]':>14} {'peak [MB]':>10} | {'buffers [MB]':>12} | path len")
+    for r in rows:
+        pc, pp = r["path_copy"], r["parent_ptr"]
+        print(f"{r['size']:>6} | {pc[0]:>13.3f} {pc[1]:>10.1f} | {pp[0]:>14.3f} {pp[1]:>10.1f} | {r['buffers_mb']:>12.1f} | {pc[2]} / {pp[2]}")
+
+    # ====== 可視化 ======
+    labels = [f"{r['size']}x{r['size']}" for r in rows]
+    x = np.arange(len(rows))
+    width = 0.35
+    fig, axes = plt.subplots(1, 2, figsize=(11, 4))
+    axes[0].bar(x-width/2, [r["path_copy"][0] for r in rows], width, label="path copy")
+    axes[0].bar(x+width/2, [r["parent_ptr"][0] for r in rows], width, label="parent pointer")
+    axes[0].set_ylabel("Runtime [s]")
+    axes[1].bar(x-width/2, [r["path_copy"][1] for r in rows], width, label="path copy")
+    axes[1].bar(x+width/2, [r["parent_ptr"][1] for r in rows], width, label="parent pointer")
+    axes[1].set_ylabel("Peak traced memory [MB]")
+    for ax in axes:
+        ax.set_xticks(x)
+        ax.set_xticklabels(labels)
+        ax.set_yscale("log")
+        ax.legend()
+    plt.suptitle("A*: path-copy-per-push vs parent-pointer reconstruction")
+    plt.tight_layout()
+    plt.show()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# astar_search_mode_benchmark.py
+# 一様コストの 4 近傍グリッドで、avlib.grid_astar の探索モード
+#   "astar"（通常の A*） / "bidir"（双方向 A*） / "jps"（Jump Point Search）
+# の実行時間・展開ノード数を、開けたマップと障害物の多いマップで比較する
+# （どのモードも同じ長さの最短経路を返すことも確認する）
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.grid_astar import GridAStar, MODES
+
+SIZES = [256, 2048]
+MAPS = {"open": 0.0, "cluttered": 0.25}   # 名前: 障害物密度
+REPEAT = 3   # 2 回目以降は JPS の前計算（盤面ごと）が使い回される
+SEED = 0
+
+# ====== マップ生成（スタート・ゴールは空ける） ======
+def generate_grid(size, density, rng):
+    g = (rng.random((size, size)) < density)
+    g[0, 0] = g[-1, -1] = False
+    return g
+
+def run_benchmark():
+    rng = np.random.default_rng(SEED)
+    rows = []
+    for size in SIZES:
+        start, goal = (0, 0), (size-1, size-1)
+        planner = GridAStar((size, size))
+        for name, density in MAPS.items():
+            # 経路が存在するマップを用意
+            while True:
+                blocked = generate_grid(size, density, rng)
+                if planner.plan(start, goal, blocked):
+                    break
+            res = {"size": size, "map": name}
+            for mode in MODES:
+                planner.clear_cache()   # 1 回目は前計算・バッファ確保込みで測る
+                times = []
+                for _ in range(REPEAT):
+                    t0 = time.perf_counter()
+                    path = planner.plan(start, goal, blocked, mode=mode)
+                    times.append(time.perf_counter() - t0)
+                res[mode] = (times[0], min(times[1:] or times), planner.expanded, len(path))
+            lengths = {res[m][3] for m in MODES}
+            assert len(lengths) == 1, f"path lengths differ: {lengths}"
+            rows.append(res)
+    return rows
+
+def main():
+    rows = run_benchmark()
+    head = " | ".join(f"{m + ' first/warm [s]':>22} {'expanded':>9}" for m in MODES)
+    print(f"{'size':>6} {'map':>10} | {head} | path len")
+    for r in rows:
+        cols = " | ".join(f"{r[m][0]:>10.3f} /{r[m][1]:>10.3f} {r[m][2]:>9}" for m in MODES)
+        print(f"{r['size']:>6} {r['map']:>10} | {cols} | {r[MODES[0]][3]}")
+
+    # ====== 可視化 ======
+    labels = [f"{r['size']}x{r['size']}\n{r['map']}" for r in rows]
+    x = np.arange(len(rows))
+    width = 0.8 / len(MODES)
+    fig, axes = plt.subplots(1, 2, figsize=(11, 4))
+    for k, mode in enumerate(MODES):
+        off = (k - (len(MODES)-1) / 2) * width
+        axes[0].bar(x+off, [r[mode][1] for r in rows], width, label=mode)
+        axes[1].bar(x+off, [r[mode][2] for r in rows], width, label=mode)
+    axes[0].set_ylabel("Runtime (warm) [s]")
+    axes[1].set_ylabel("Expanded nodes")
+    for ax in axes:
+        ax.set_xticks(x)
+        ax.set_xticklabels(labels)
+        ax.set_yscale("log")
+        ax.legend()
+    plt.suptitle("Uniform-cost 4-connected grid: A* vs bidirectional A* vs JPS")
+    plt.tight_layout()
+    plt.show()
+
+if __name__ == "__main__":
+    main()
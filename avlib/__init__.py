@@ -0,0 +1,5 @@
+# avlib: 各デモスクリプトから共通で使う計画・センサー処理の部品集
+#
+# スクリプトはフォルダごとに単体で動かす想定なので、利用側では
+#   sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+# でリポジトリ直下をパスに追加してから `from avlib.xxx import ...` する。
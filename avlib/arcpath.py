@@ -0,0 +1,117 @@
+# arcpath.py
+# 折れ線経路を弧長 s でパラメータ化して持つ（PID 追従デモ共通）
+#
+# 作るときに 1 回だけ:
+#   - s[i]: 先頭から頂点 i までの累積弧長、length: 全長
+#   - 区間ごとの長さ・向き、頂点ごとの曲率（曲がる角度 / 前後区間の平均長）
+# を計算しておき、毎フレームの問い合わせは
+#   - point_at(s) / heading_at(s) / curvature_at(s): 二分探索で区間を引く O(log N)
+#   - closest_s(pos, s_min, s_max): [s_min, s_max] の区間だけに射影（前回の s 付近だけ見れば O(log N + 窓)）
+#   - lookahead(pos, dist, ...): pure pursuit 用の「最寄り点から弧長 dist 先の点」
+# で答える（waypoint を 1 つずつ hypot で辿らない）。
+import numpy as np
+
+
+class ArcPath:
+    """points: [(x, y), ...] か (N, 2) 配列（N >= 1）"""
+    def __init__(self, points):
+        pts = np.ascontiguousarray(points, dtype=float).reshape(-1, 2)
+        self.points = pts
+        d = np.diff(pts, axis=0)
+        self.seg_len = np.hypot(d[:, 0], d[:, 1])
+        self.s = np.concatenate([[0.0], np.cumsum(self.seg_len)])
+        self.length = float(self.s[-1])
+        self.seg_heading = np.arctan2(d[:, 1], d[:, 0])
+        # 頂点での曲率（端点は 0）
+        self.curvature = np.zeros(len(pts))
+        if len(pts) > 2:
+            turn = np.diff(self.seg_heading)
+            turn = (turn + np.pi) % (2*np.pi) - np.pi
+            mean_len = 0.5 * (self.seg_len[:-1] + self.seg_len[1:])
+            self.curvature[1:-1] = np.where(mean_len > 0, turn / np.maximum(mean_len, 1e-12), 0.0)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _segment(self, s):
+        """s を含む区間番号と区間内の割合"""
+        i = np.clip(np.searchsorted(self.s, s, side="right") - 1, 0, max(len(self.seg_len) - 1, 0))
+        if len(self.seg_len) == 0:
+            return i, np.zeros_like(np.asarray(s, dtype=float))
+        L = self.seg_len[i]
+        t = np.where(L > 0, (s - self.s[i]) / np.where(L > 0, L, 1.0), 0.0)
+        return i, t
+
+    def point_at(self, s):
+        """弧長 s の点（s は [0, length] に丸める。配列なら (..., 2)）"""
+        if len(self.seg_len) and np.ndim(s) == 0:
+            # 毎フレームの 1 点問い合わせは配列演算を通さない
+            s = min(max(float(s), 0.0), self.length)
+            i = min(max(int(self.s.searchsorted(s, side="right")) - 1, 0), len(self.seg_len) - 1)
+            L = self.seg_len[i]
+            p = self.points[i]
+            return p + (self.points[i + 1] - p) * ((s - self.s[i]) / L if L > 0 else 0.0)
+        s = np.clip(s, 0.0, self.length)
+        if len(self.seg_len) == 0:
+            return np.broadcast_to(self.points[0], np.shape(s) + (2,)).copy()
+        i, t = self._segment(s)
+        p = self.points[i]
+        return p + (self.points[i + 1] - p) * np.asarray(t)[..., None]
+
+    def heading_at(self, s):
+        i, _ = self._segment(np.clip(s, 0.0, self.length))
+        return self.seg_heading[i]
+
+    def curvature_at(self, s):
+        """頂点の曲率を区間内で線形補間"""
+        if len(self.seg_len) == 0:
+            return np.zeros(np.shape(s))
+        i, t = self._segment(np.clip(s, 0.0, self.length))
+        return self.curvature[i] * (1 - t) + self.curvature[i + 1] * t
+
+    def remaining(self, s):
+        """弧長 s からゴールまでの残り"""
+        return self.length - np.clip(s, 0.0, self.length)
+
+    def closest_s(self, pos, s_min=0.0, s_max=None):
+        """
+        pos を経路に射影した弧長（[s_min, s_max] に掛かる区間だけを見る）と、その点までの距離
+        """
+        if len(self.seg_len) == 0:
+            return 0.0, float(np.hypot(*(np.asarray(pos, dtype=float) - self.points[0])))
+        n = len(self.seg_len)
+        lo = min(max(int(self.s.searchsorted(s_min, side="right")) - 1, 0), n - 1)
+        hi = n if s_max is None else min(max(int(self.s.searchsorted(s_max, side="left")), lo + 1), n)
+        a = self.points[lo:hi]
+        ab = self.points[lo+1:hi+1] - a
+        L2 = self.seg_len[lo:hi] ** 2
+        px, py = float(pos[0]), float(pos[1])
+        dx = px - a[:, 0]
+        dy = py - a[:, 1]
+        t = np.clip((dx*ab[:, 0] + dy*ab[:, 1]) / np.where(L2 > 0, L2, 1.0), 0.0, 1.0)
+        ex = dx - t*ab[:, 0]
+        ey = dy - t*ab[:, 1]
+        d2 = ex*ex + ey*ey
+        k = int(d2.argmin())
+        s = float(self.s[lo + k] + t[k] * self.seg_len[lo + k])
+        s = min(max(s, s_min), self.length if s_max is None else s_max)
+        return s, float(np.sqrt(d2[k]))
+
+    def lookahead(self, pos, dist, s_hint=None, window=None):
+        """
+        pure pursuit の目標点。pos の最寄り点（s_hint があれば [s_hint, s_hint + window] から）
+        の弧長 dist 先。戻り値: (目標点, 最寄り点の弧長)
+        """
+        if s_hint is None:
+            s, _ = self.closest_s(pos)
+        else:
+            s, _ = self.closest_s(pos, s_hint, None if window is None else s_hint + window)
+        return self.point_at(s + dist), s
+
+    def corners(self):
+        """向きが変わる頂点の番号（始点・終点を含む）"""
+        n = len(self.points)
+        if n <= 2:
+            return np.arange(n)
+        turn = np.flatnonzero(self.seg_heading[1:] != self.seg_heading[:-1]) + 1
+        return np.concatenate([[0], turn, [n - 1]])
@@ -0,0 +1,222 @@
+# connectivity.py
+# 「このセルを塞ぐと source→target が切れるか」を、毎回 BFS/A* し直さずに答える
+#
+# 3 段構えで、どれも必要になったときだけ作り直す（盤面が変わっても即座には作り直さない）:
+#   1) 証人経路: source→target の道を 1 本持っておく。
+#      この道に乗っていないセルは塞いでも道が残るので、答えは即「切れない」（O(1)）。
+#      道の外を塞いだときは道はそのまま使える。source が道に沿って進めば道の先頭を捨てるだけ、
+#      隣のセルへ外れたら先頭に 1 マス足すだけで済む。
+#   2) 迂回: 道の上のセルなら、その 1 つ手前から先の道へ戻る迂回路を
+#      探索数 DETOUR_BUDGET までの小さな BFS で探す。見つかれば「切れない」で、
+#      実際に塞いだときはその迂回路を道に継ぎ足す（全体探索なし）。
+#   3) 切断点: 迂回が予算内で見つからないときだけ、source からの DFS（Tarjan の lowlink）で
+#      「source と target を分ける関節点」の set を作る。盤面が変わるまで使い回す。
+# 盤面の書き換えは block / unblock（または try_block）経由で行うこと。
+from collections import deque
+
+DETOUR_BUDGET = 256   # 局所迂回探索で調べるセル数の上限
+
+
+class ConnectivityOracle:
+    """grid[y][x] == 1 を障害物（4 近傍）とする盤面。grid はコピーせずそのまま参照・更新する"""
+    def __init__(self, grid, source, target):
+        self.grid = grid
+        self.H = len(grid)
+        self.W = len(grid[0])
+        self.source = tuple(source)
+        self.target = tuple(target)
+        self.rev = None       # 証人経路を target→source の順で（None=作り直しが必要、[]=道なし）
+        self.pos = {}         # 証人経路のセル → rev 内の位置
+        self.cut = None       # source と target を分ける関節点の set（None=作り直しが必要）
+        self._detour = None   # (cell, 迂回路) 直前の問い合わせで見つけた迂回路
+        self.refreshes = 0    # 全体探索をした回数
+
+    # ---------- 盤面・source の更新 ----------
+    def set_source(self, cell):
+        cell = tuple(cell)
+        if cell == self.source:
+            return
+        old, self.source = self.source, cell
+        self.cut = None
+        self._detour = None
+        if not self.rev:
+            self.rev = None
+            return
+        i = self.pos.get(cell)
+        if i is not None:
+            # 道に沿って進んだ → それより手前を捨てる
+            for c in self.rev[i+1:]:
+                del self.pos[c]
+            del self.rev[i+1:]
+        elif abs(cell[0] - old[0]) + abs(cell[1] - old[1]) == 1 and not self.grid[cell[1]][cell[0]]:
+            # 隣へ外れた → 先頭に 1 マス足せば道のまま
+            self.pos[cell] = len(self.rev)
+            self.rev.append(cell)
+        else:
+            self.rev = None
+
+    def block(self, cell):
+        cell = tuple(cell)
+        x, y = cell
+        self.grid[y][x] = 1
+        if self.rev is not None and cell in self.pos:
+            d = self._detour
+            if d is not None and d[0] == cell:
+                self._splice(*d)
+            else:
+                self.rev = None
+        self.cut = None
+        self._detour = None
+
+    def unblock(self, cell):
+        x, y = cell
+        self.grid[y][x] = 0
+        if self.rev == []:
+            self.rev = None   # 道が無かったのがつながったかもしれない
+        self.cut = None
+        self._detour = None
+
+    def try_block(self, cell):
+        """切れないなら塞いで True、切れるなら何もせず False"""
+        if self.would_disconnect(cell):
+            return False
+        self.block(cell)
+        return True
+
+    # ---------- 問い合わせ ----------
+    @property
+    def connected(self):
+        self._ensure_path()
+        return bool(self.rev)
+
+    def path(self):
+        """証人経路（source→target）。道がなければ []"""
+        self._ensure_path()
+        return self.rev[::-1]
+
+    def would_disconnect(self, cell):
+        """cell を塞ぐと source→target が切れるか（source / target 自身は常に True）"""
+        cell = tuple(cell)
+        if cell == self.source or cell == self.target:
+            return True
+        if self.grid[cell[1]][cell[0]]:
+            return False
+        self._ensure_path()
+        if cell not in self.pos:
+            return False       # 証人経路が残る（もともと道がない場合もここ）
+        if self.cut is not None:
+            return cell in self.cut
+        d = self._find_detour(cell)
+        if d is not None:
+            self._detour = (cell, d)
+            return False
+        self._ensure_cut()
+        return cell in self.cut
+
+    # ---------- 局所迂回 ----------
+    def _find_detour(self, cell):
+        """
+        cell の 1 つ手前（source 側）から、cell より target 側の道のセルへ戻る道を
+        cell と source 側の道を通らずに探す。見つかれば道の外のセル列（手前→戻り先の順、両端を含む）
+        """
+        i = self.pos[cell]
+        a = self.rev[i+1]
+        H, W, grid, pos = self.H, self.W, self.grid, self.pos
+        parent = {a: None}
+        q = deque([a])
+        while q and len(parent) <= DETOUR_BUDGET:
+            x, y = q.popleft()
+            for v in ((x+1, y), (x-1, y), (x, y+1), (x, y-1)):
+                if v in parent or not (0 <= v[0] < W and 0 <= v[1] < H) or grid[v[1]][v[0]]:
+                    continue
+                j = pos.get(v)
+                if j is not None:
+                    if j < i:
+                        out = [v, (x, y)]
+                        while parent[out[-1]] is not None:
+                            out.append(parent[out[-1]])
+                        return out[::-1]
+                    continue    # cell 自身と source 側の道は通らない
+                parent[v] = (x, y)
+                q.append(v)
+        return None
+
+    def _splice(self, cell, detour):
+        """迂回路 detour（手前→戻り先）で cell を含む区間を置き換える"""
+        i, j = self.pos[cell], self.pos[detour[-1]]
+        rev = self.rev[:j+1] + detour[-2:0:-1] + self.rev[i+1:]
+        self.rev = rev
+        self.pos = {c: k for k, c in enumerate(rev)}
+
+    # ---------- 作り直し ----------
+    def _neighbors(self, u):
+        W, n = self.W, self.W * self.H
+        x = u % W
+        if x < W - 1: yield u + 1
+        if x > 0: yield u - 1
+        if u + W < n: yield u + W
+        if u >= W: yield u - W
+
+    def _free(self, u):
+        return not self.grid[u // self.W][u % self.W]
+
+    def _ensure_path(self):
+        if self.rev is not None:
+            return
+        self.refreshes += 1
+        W = self.W
+        s = self.source[1] * W + self.source[0]
+        t = self.target[1] * W + self.target[0]
+        parent = {s: -1}
+        q = deque([s])
+        while q and t not in parent:
+            u = q.popleft()
+            for v in self._neighbors(u):
+                if v not in parent and self._free(v):
+                    parent[v] = u
+                    q.append(v)
+        rev = []
+        if t in parent and self._free(s):
+            u = t
+            while u != -1:
+                rev.append((u % W, u // W))
+                u = parent[u]
+        self.rev = rev
+        self.pos = {c: i for i, c in enumerate(rev)}
+
+    def _ensure_cut(self):
+        if self.cut is not None:
+            return
+        self.refreshes += 1
+        W = self.W
+        s = self.source[1] * W + self.source[0]
+        t = self.target[1] * W + self.target[0]
+        # 反復版 DFS で発見順 disc と lowlink を求める
+        disc, low, parent = {s: 0}, {s: 0}, {s: -1}
+        stack = [(s, self._neighbors(s))]
+        while stack:
+            u, it = stack[-1]
+            for v in it:
+                if not self._free(v):
+                    continue
+                if v not in disc:
+                    disc[v] = low[v] = len(disc)
+                    parent[v] = u
+                    stack.append((v, self._neighbors(v)))
+                    break
+                if v != parent[u] and disc[v] < low[u]:
+                    low[u] = disc[v]
+            else:
+                stack.pop()
+                p = parent[u]
+                if p != -1 and low[u] < low[p]:
+                    low[p] = low[u]
+        # target の祖先 v（source 以外）のうち、target 側の子 c が v より上へ戻れないものが切断点
+        cut = set()
+        c = t
+        v = parent.get(t, -1)
+        while v not in (-1, s):
+            if low[c] >= disc[v]:
+                cut.add((v % W, v // W))
+            c, v = v, parent[v]
+        self.cut = cut
@@ -0,0 +1,98 @@
+# costmap.py
+# レイヤ分けしたコストマップ（静的 / インフレーション / 予測 / 占有 など）
+#
+# 毎フレーム全部を作り直すのではなく、レイヤごとに
+#   - 入力（動的障害物リストなど）のスナップショットをキーとして覚えておき、
+#   - 入力が変わったレイヤだけ作り直し、
+#   - 何か変わったときだけ 1 枚の float32 バッファに合成し直す。
+# 静的障害物は最初に渡したら作り直さない。
+#
+#   cost    = base + Σ weight * layer
+#   blocked = static_blocked | Σ（レイヤが返した blocked）
+import numpy as np
+
+
+def _freeze(x):
+    """入力を比較可能なスナップショットにする（リストは中身ごとコピー）"""
+    if isinstance(x, np.ndarray):
+        return (x.shape, x.dtype.str, x.tobytes())
+    if isinstance(x, (list, tuple)):
+        return tuple(_freeze(v) for v in x)
+    return x
+
+
+class _Layer:
+    def __init__(self, fn, weight, shape):
+        self.fn = fn
+        self.weight = weight
+        self.key = None
+        self.cost = np.zeros(shape, dtype=np.float32)   # weight 込みで保持
+        self.blocked = None
+        self.builds = 0                                  # 作り直した回数
+
+
+class LayeredCostMap:
+    """
+    shape=(H, W)、base はどのセルにも入る基本の移動コスト。
+    static_blocked（True=通行不可）は作り直さない。
+    add_layer(name, fn) で登録したレイヤは update(name, *inputs) で入力を渡し、
+    入力が前回と同じなら fn を呼ばない。fn は cost 配列か (cost, blocked) を返す。
+    """
+    def __init__(self, shape, base=1.0, static_blocked=None):
+        self.shape = tuple(shape)
+        self.base = base
+        self.static_blocked = np.zeros(self.shape, dtype=bool)
+        if static_blocked is not None:
+            self.static_blocked[...] = np.asarray(static_blocked) != 0
+        self.layers = {}
+        self.cost = np.empty(self.shape, dtype=np.float32)   # 合成バッファ（使い回す）
+        self.blocked = np.empty(self.shape, dtype=bool)
+        self._dirty = True
+
+    def add_layer(self, name, fn=None, weight=1.0):
+        self.layers[name] = _Layer(fn, weight, self.shape)
+        self._dirty = True
+
+    def layer(self, name):
+        """レイヤ単体のコスト（weight 込み、float32）"""
+        return self.layers[name].cost
+
+    def update(self, name, *inputs):
+        """入力が変わっていればレイヤを作り直す。作り直したら True"""
+        L = self.layers[name]
+        key = _freeze(inputs)
+        if L.key is not None and key == L.key:
+            return False
+        self._store(L, L.fn(*inputs))
+        L.key = key
+        return True
+
+    def set_layer(self, name, out):
+        """外で計算済みの cost か (cost, blocked) をそのまま差し替える（OccupancyCostMap など）"""
+        L = self.layers[name]
+        self._store(L, out)
+        L.key = None
+
+    def invalidate(self, name):
+        """次の update() で必ず作り直させる（パラメータを変えたときなど）"""
+        self.layers[name].key = None
+
+    def _store(self, L, out):
+        cost, blocked = out if isinstance(out, tuple) else (out, None)
+        np.multiply(cost, L.weight, out=L.cost, casting="unsafe")
+        L.blocked = None if blocked is None else np.asarray(blocked, dtype=bool)
+        L.builds += 1
+        self._dirty = True
+
+    def compose(self):
+        """変化があったときだけ合成し直し、(cost, blocked) を返す（どちらも内部バッファ）"""
+        if self._dirty:
+            cost, blocked = self.cost, self.blocked
+            cost.fill(self.base)
+            np.copyto(blocked, self.static_blocked)
+            for L in self.layers.values():
+                cost += L.cost
+                if L.blocked is not None:
+                    blocked |= L.blocked
+            self._dirty = False
+        return self.cost, self.blocked
@@ -0,0 +1,99 @@
+# distfield.py
+# 1 回の BFS / Dijkstra で作る距離場（source から全セルへの最短距離 + 親ポインタ）
+#
+# 目標ごとに A* を回す代わりに、source（ロボット位置やゴール）から 1 回だけ全域を広げておき、
+# 何個の目標についても距離・到達可否・経路を同じ場から引く。
+#   - 一様コスト（cost=None）は deque の BFS、cost があれば heapq の Dijkstra
+#   - セルはフラット index（i = y*W + x）、距離は (H, W) の float 配列（到達不能は inf）
+#   - 経路は親ポインタを辿って復元する（source→cell / cell→source のどちら向きでも）
+import heapq
+from collections import deque
+import numpy as np
+from avlib.grid_astar import flat_mask
+
+INF = float("inf")
+
+
+class DistanceField:
+    """
+    blocked: (H, W) の bool（True=通行不可）、source: (x, y)
+    shape  : blocked を flat_mask 済みの list で渡すときの (H, W)（全体変換を省ける）
+    cost: 任意。(H, W) のセルへ入る移動コスト（省略時は 1）
+    ゴールから作った場を path_from で辿ると「cell→ゴール」の経路になる（一様コストなら最短）。
+    """
+    def __init__(self, blocked, source, cost=None, shape=None):
+        if shape is None:
+            blocked = np.asarray(blocked, dtype=bool)
+            shape = blocked.shape
+        self.h, self.w = int(shape[0]), int(shape[1])
+        self.source = tuple(source)
+        W, H = self.w, self.h
+        n = W * H
+        blk = flat_mask(blocked, shape)
+        dist = [INF] * n
+        par = [-1] * n
+        s = self.source[1] * W + self.source[0]
+        dist[s] = 0.0
+        if cost is None:
+            q = deque([s])
+            while q:
+                u = q.popleft()
+                du = dist[u] + 1.0
+                uy, ux = divmod(u, W)
+                for v, ok in ((u + 1, ux + 1 < W), (u - 1, ux > 0), (u + W, uy + 1 < H), (u - W, uy > 0)):
+                    if ok and not blk[v] and dist[v] == INF:
+                        dist[v] = du; par[v] = u
+                        q.append(v)
+        else:
+            cst = np.asarray(cost, dtype=float).ravel().tolist()
+            openq = [(0.0, s)]
+            while openq:
+                d, u = heapq.heappop(openq)
+                if d > dist[u]:
+                    continue
+                uy, ux = divmod(u, W)
+                for v, ok in ((u + 1, ux + 1 < W), (u - 1, ux > 0), (u + W, uy + 1 < H), (u - W, uy > 0)):
+                    if ok and not blk[v]:
+                        nd = d + cst[v]
+                        if nd < dist[v]:
+                            dist[v] = nd; par[v] = u
+                            heapq.heappush(openq, (nd, v))
+        self.parent = par
+        self.dist = np.array(dist).reshape(H, W)
+
+    def distance(self, cell):
+        return float(self.dist[cell[1], cell[0]])
+
+    def reachable(self, cell):
+        return self.dist[cell[1], cell[0]] < INF
+
+    def distances(self, cells):
+        """複数セルの距離をまとめて（(N,) 配列）"""
+        if len(cells) == 0:
+            return np.zeros(0)
+        c = np.asarray(cells, dtype=np.intp).reshape(-1, 2)
+        return self.dist[c[:, 1], c[:, 0]]
+
+    def nearest(self, cells):
+        """cells のうち最も近い到達可能なセルと距離。なければ (None, inf)"""
+        d = self.distances(cells)
+        if d.size == 0 or not np.isfinite(d.min()):
+            return None, INF
+        k = int(np.argmin(d))
+        return tuple(cells[k]), float(d[k])
+
+    def path_from(self, cell):
+        """cell→source の経路（到達不能なら []）"""
+        if not self.reachable(cell):
+            return []
+        W, par = self.w, self.parent
+        out = []
+        i = cell[1] * W + cell[0]
+        while i != -1:
+            out.append((i % W, i // W))
+            i = par[i]
+        return out
+
+    def path_to(self, cell):
+        """source→cell の経路（到達不能なら []）"""
+        return self.path_from(cell)[::-1]
@@ -0,0 +1,127 @@
+# dynobs.py
+# 動的障害物を struct-of-arrays（x, y, vx, vy の NumPy 配列）＋占有ビットマップで持つ
+#
+# 「他の障害物がいるか」はタプルの set / リスト走査ではなく occ[y, x] の参照で済ませ、
+# 移動は全障害物の候補手をまとめて評価する:
+#   候補を優先順に 1 手ずつ（ラウンドごとに）試し、同じセルを狙った障害物同士は
+#   番号の小さい方を勝たせる。勝ったセルはその場で occ に立てるので、
+#   以降のラウンドで他の障害物が同じセルに入ることはない。
+# 元のセルも移動が終わるまで occ に残すので、すれ違い・入れ替わりも起きない（従来と同じ）。
+import numpy as np
+
+# その場 + 上下左右（ランダムウォーク用）
+STEP5_DX = np.array([0, 1, -1, 0, 0], dtype=np.intp)
+STEP5_DY = np.array([0, 0, 0, 1, -1], dtype=np.intp)
+
+
+class DynamicObstacles:
+    def __init__(self, shape, xs, ys, vxs=None, vys=None):
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.x = np.asarray(xs, dtype=np.intp).copy()
+        self.y = np.asarray(ys, dtype=np.intp).copy()
+        n = self.x.size
+        self.vx = np.zeros(n, dtype=np.intp) if vxs is None else np.asarray(vxs, dtype=np.intp).copy()
+        self.vy = np.zeros(n, dtype=np.intp) if vys is None else np.asarray(vys, dtype=np.intp).copy()
+        self.occ = np.zeros(self.shape, dtype=bool)   # 占有ビットマップ（その場で更新）
+        self.occ[self.y, self.x] = True
+
+    @classmethod
+    def from_rows(cls, shape, rows):
+        """[(x, y), ...] または [(x, y, vx, vy), ...] から作る"""
+        a = np.asarray(rows, dtype=np.intp).reshape(len(rows), -1) if len(rows) else np.zeros((0, 2), np.intp)
+        if a.shape[1] >= 4:
+            return cls(shape, a[:, 0], a[:, 1], a[:, 2], a[:, 3])
+        return cls(shape, a[:, 0], a[:, 1])
+
+    def __len__(self):
+        return self.x.size
+
+    def occupied(self, cell):
+        return bool(self.occ[cell[1], cell[0]])
+
+    def xy(self):
+        """(N, 2) の [x, y] 配列"""
+        return np.stack([self.x, self.y], axis=1)
+
+    def state(self):
+        """(N, 4) の [x, y, vx, vy] 配列"""
+        return np.stack([self.x, self.y, self.vx, self.vy], axis=1)
+
+    def cells(self):
+        """[(x, y), ...]（描画など少数で使う用）"""
+        return list(zip(self.x.tolist(), self.y.tolist()))
+
+    def move(self, cand_dx, cand_dy, blocked=None, forbidden=(), set_velocity=False):
+        """
+        cand_dx, cand_dy: (N, K) の候補移動量（左ほど優先）
+        blocked  : (H, W) 入れないセル（静的障害物など）
+        forbidden: 入れないセルの列 [(x, y), ...]（車・スタート・ゴールなど）
+        set_velocity=True なら、動けた障害物の速度を選んだ候補に置き換える
+        どの候補も入れなければその場にとどまる。戻り値: 選んだ候補番号（動けなければ -1）
+        """
+        H, W = self.shape
+        n = self.x.size
+        choice = np.full(n, -1, dtype=np.intp)
+        if n == 0:
+            return choice
+        cand_dx = np.asarray(cand_dx, dtype=np.intp)
+        cand_dy = np.asarray(cand_dy, dtype=np.intp)
+        nx = self.x[:, None] + cand_dx
+        ny = self.y[:, None] + cand_dy
+        ok = (nx >= 0) & (nx < W) & (ny >= 0) & (ny < H)
+        tgt = np.where(ok, ny * W + nx, 0)
+        if blocked is not None:
+            ok &= ~np.asarray(blocked, dtype=bool).ravel()[tgt]
+        if len(forbidden):
+            f = np.asarray(forbidden, dtype=np.intp).reshape(-1, 2)
+            ok &= ~np.isin(tgt, f[:, 1] * W + f[:, 0])
+
+        occ = self.occ.ravel()   # ビュー（書き込むと self.occ も変わる）
+        settled = np.zeros(n, dtype=bool)
+        for k in range(cand_dx.shape[1]):
+            idx = np.flatnonzero(ok[:, k] & ~settled)
+            t = tgt[idx, k]
+            free = ~occ[t]
+            idx, t = idx[free], t[free]
+            # 同じセルを狙ったら番号の小さい障害物が勝つ（idx は昇順なので最初の出現）
+            t, first = np.unique(t, return_index=True)
+            win = idx[first]
+            occ[t] = True
+            settled[win] = True
+            choice[win] = k
+
+        m = np.flatnonzero(settled)
+        if m.size:
+            occ[self.y[m] * W + self.x[m]] = False
+            dx = cand_dx[m, choice[m]]
+            dy = cand_dy[m, choice[m]]
+            self.x[m] += dx
+            self.y[m] += dy
+            if set_velocity:
+                self.vx[m] = dx
+                self.vy[m] = dy
+        return choice
+
+
+def random_walk_candidates(n, rng=np.random):
+    """その場 + 上下左右の 5 手を障害物ごとにランダムな順に並べた (N, 5) の候補"""
+    order = np.argsort(rng.random((n, 5)), axis=1)
+    return STEP5_DX[order], STEP5_DY[order]
+
+
+def velocity_candidates(vx, vy, n_random=None, rng=np.random):
+    """
+    「今の速度のまま」+ 速度を変えた候補（各軸 -1/0/1）を障害物ごとにランダムな順に並べた候補。
+    n_random=None なら 9 通りすべて、整数ならランダムに n_random 個（重複あり）。
+    """
+    n = len(vx)
+    if n_random is None:
+        jx = np.broadcast_to(np.repeat([-1, 0, 1], 3), (n, 9))
+        jy = np.broadcast_to(np.tile([-1, 0, 1], 3), (n, 9))
+    else:
+        jx = np.floor(rng.random((n, n_random)) * 3).astype(np.intp) - 1
+        jy = np.floor(rng.random((n, n_random)) * 3).astype(np.intp) - 1
+    cdx = np.concatenate([np.asarray(vx, dtype=np.intp)[:, None], jx], axis=1)
+    cdy = np.concatenate([np.asarray(vy, dtype=np.intp)[:, None], jy], axis=1)
+    order = np.argsort(rng.random(cdx.shape), axis=1)
+    return np.take_along_axis(cdx, order, 1), np.take_along_axis(cdy, order, 1)
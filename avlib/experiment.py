@@ -0,0 +1,95 @@
+# experiment.py
+# モンテカルロ実験（設定 × 試行回数）を ProcessPoolExecutor で並列に回す共通エンジン
+#
+# - 試行ごとのシードは (base_seed, 設定番号, 試行番号) から決まるので、
+#   ワーカー数やスケジュールに関係なく同じ結果になる
+# - 各試行の直前に random と np.random の両方をそのシードで初期化する
+#   （各スクリプトはモジュールレベルの乱数を使っているため）
+# - 試行はチャンクにまとめて投げ、プロセス間通信の回数を減らす
+#
+# 注意: fn はモジュールのトップレベル関数であること（pickle で子プロセスに渡すため）。
+# また呼び出し側スクリプトは `if __name__ == "__main__":` で実行部分を守ること。
+import os
+import random
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+
+def trial_seed(base_seed, setting_idx, trial_idx):
+    """(base_seed, 設定番号, 試行番号) → 32bit シード"""
+    ss = np.random.SeedSequence([int(base_seed), int(setting_idx), int(trial_idx)])
+    return int(ss.generate_state(1)[0])
+
+
+def _run_chunk(fn, settings, chunk, base_seed):
+    out = []
+    for si, ti in chunk:
+        seed = trial_seed(base_seed, si, ti)
+        random.seed(seed)
+        np.random.seed(seed)
+        out.append((si, ti, fn(*settings[si])))
+    return out
+
+
+def run_trials(fn, settings, trials, seed=0, workers=None, chunksize=None):
+    """
+    settings の各要素（引数タプル）について fn(*setting) を trials 回ずつ実行する。
+    workers=None なら CPU コア数、1 ならプロセスを作らずその場で実行。
+    戻り値: results[設定番号][試行番号]
+    """
+    settings = [tuple(s) if isinstance(s, (tuple, list)) else (s,) for s in settings]
+    tasks = [(si, ti) for si in range(len(settings)) for ti in range(trials)]
+    results = [[None] * trials for _ in settings]
+    if not tasks:
+        return results
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(tasks)))
+    if chunksize is None:
+        # ワーカーあたり 4 チャンク程度（偏りを均しつつ通信回数を抑える）
+        chunksize = max(1, len(tasks) // (workers * 4))
+    chunks = [tasks[i:i+chunksize] for i in range(0, len(tasks), chunksize)]
+
+    if workers == 1:
+        for c in chunks:
+            for si, ti, r in _run_chunk(fn, settings, c, seed):
+                results[si][ti] = r
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futures = [ex.submit(_run_chunk, fn, settings, c, seed) for c in chunks]
+        for f in futures:
+            for si, ti, r in f.result():
+                results[si][ti] = r
+    return results
+
+
+def success_rate(results):
+    """各設定の成功率（結果が真偽値のとき）"""
+    return [float(np.mean([bool(r) for r in rs])) if rs else float("nan") for rs in results]
+
+
+def summarize(metrics):
+    """エピソードごとの指標 dict のリスト → 数値キーごとの平均（bool は率になる）"""
+    out = {"episodes": len(metrics)}
+    if not metrics:
+        return out
+    for k, v in metrics[0].items():
+        if isinstance(v, (bool, int, float, np.integer, np.floating)):
+            out[k] = float(np.mean([m[k] for m in metrics]))
+    return out
+
+
+def run_headless(episode_fn, argv, seed=0):
+    """
+    `python script.py --headless [N] [--workers W]` 用の共通処理。
+    episode_fn() を N 回（既定 1000）実行し、平均指標を表示して返す。
+    """
+    i = argv.index("--headless")
+    episodes = int(argv[i+1]) if i + 1 < len(argv) and argv[i+1].isdigit() else 1000
+    workers = int(argv[argv.index("--workers")+1]) if "--workers" in argv else None
+    metrics = run_trials(episode_fn, [()], episodes, seed=seed, workers=workers)[0]
+    summary = summarize(metrics)
+    for k, v in summary.items():
+        print(f"{k:>16}: {v:.4g}" if isinstance(v, float) else f"{k:>16}: {v}")
+    return summary
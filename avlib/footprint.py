@@ -0,0 +1,49 @@
+# footprint.py
+# 円形（半径 r）スキャンの足跡テンプレート
+#
+# 「中心からの距離 <= r のセル」の相対オフセットは半径だけで決まるので、
+# 半径ごとに 1 度だけ作ってキャッシュし、スキャン時は平行移動＋盤面外の除去だけ行う。
+import numpy as np
+
+_discs = {}
+
+def disc_offsets(radius):
+    """半径 radius の円内セルの相対オフセット (dx, dy)。行優先（y→x）順、読み取り専用"""
+    d = _discs.get(radius)
+    if d is None:
+        r = int(np.floor(radius))
+        dy, dx = np.mgrid[-r:r+1, -r:r+1]
+        inside = np.hypot(dx, dy) <= radius
+        dx = dx[inside].astype(np.intp)
+        dy = dy[inside].astype(np.intp)
+        dx.setflags(write=False); dy.setflags(write=False)
+        d = _discs[radius] = (dx, dy)
+    return d
+
+
+def disc_cells(shape, pos, radius):
+    """pos を中心とする円内で、盤面 (H, W) に収まるセルの (xs, ys)"""
+    H, W = shape
+    dx, dy = disc_offsets(radius)
+    xs = dx + pos[0]
+    ys = dy + pos[1]
+    x0, y0 = pos
+    if radius <= x0 < W - radius and radius <= y0 < H - radius:
+        return xs, ys   # 円全体が盤面内ならクリップ不要
+    keep = (xs >= 0) & (xs < W) & (ys >= 0) & (ys < H)
+    return xs[keep], ys[keep]
+
+
+def disc_scan(true_grid, pos, radius, p_false=0.0, p_miss=0.0, rng=np.random):
+    """
+    円形スキャン。戻り値: (xs, ys, meas)  meas: 1=occupied 観測 / 0=free 観測
+    ノイズ（誤検知 p_false / 見逃し p_miss）はスキャンごとに乱数を 1 回まとめて引いて適用する。
+    """
+    true_grid = np.asarray(true_grid)
+    xs, ys = disc_cells(true_grid.shape, pos, radius)
+    truth = true_grid[ys, xs] != 0
+    if p_false <= 0.0 and p_miss <= 0.0:
+        return xs, ys, truth.astype(np.int8)
+    u = rng.random(xs.size)
+    meas = np.where(truth, u >= p_miss, u < p_false)
+    return xs, ys, meas.astype(np.int8)
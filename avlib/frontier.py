@@ -0,0 +1,100 @@
+# frontier.py
+# 既知マップ（int8: -1=unknown / 0=free / 1=blocked）からフロンティアを NumPy で取り出す
+#
+# - フロンティア = FREE で、上下左右のどれかが UNKNOWN のセル。
+#   セルごとの Python ループではなく、ずらした配列どうしの比較で一括判定する
+# - FrontierClusters: フロンティアを 8 近傍の連結成分にまとめ、成分ごとの大きさ・重心・代表セルを持つ
+#   （探索先を数百セルではなく数十個の塊から選べる）
+# - FrontierTracker: 観測で書き換わったセルとその 4 近傍だけを判定し直す差分更新版
+import numpy as np
+from avlib.scenario import label_free
+from avlib.knownmap import UNKNOWN, FREE
+
+_D5X = np.array([0, 1, -1, 0, 0], dtype=np.intp)
+_D5Y = np.array([0, 0, 0, 1, -1], dtype=np.intp)
+
+
+def frontier_mask(known):
+    """(H, W) の bool。FREE かつ 4 近傍に UNKNOWN がある（盤面外は UNKNOWN ではない）"""
+    k = np.asarray(known)
+    unk = k == UNKNOWN
+    near = np.zeros_like(unk)
+    near[1:, :] |= unk[:-1, :]
+    near[:-1, :] |= unk[1:, :]
+    near[:, 1:] |= unk[:, :-1]
+    near[:, :-1] |= unk[:, 1:]
+    return near & (k == FREE)
+
+
+def mask_cells(mask):
+    """mask が True のセルを [(x, y), ...]（行優先）で"""
+    ys, xs = np.nonzero(mask)
+    return list(zip(xs.tolist(), ys.tolist()))
+
+
+class FrontierClusters:
+    """
+    フロンティアの 8 近傍連結成分。min_size 未満の塊は捨てる。
+    size[k]: セル数、centroid[k]: 重心 (x, y)、anchors[k]: 重心に最も近い塊内のセル（移動目標用）
+    """
+    def __init__(self, mask, min_size=1):
+        mask = np.asarray(mask, dtype=bool)
+        ys, xs = np.nonzero(mask)
+        if xs.size == 0:
+            self.size = np.zeros(0, dtype=np.intp)
+            self.centroid = np.zeros((0, 2))
+            self.anchors = []
+            return
+        # ラベリングはフロンティアを囲む矩形の中だけで行う
+        x0, y0 = xs.min(), ys.min()
+        box = mask[y0:ys.max()+1, x0:xs.max()+1]
+        lab = label_free(box, diagonal=True)[ys - y0, xs - x0]
+        _, inv, size = np.unique(lab, return_inverse=True, return_counts=True)
+        inv = inv.ravel()
+        cx = np.bincount(inv, xs) / size
+        cy = np.bincount(inv, ys) / size
+        # 各塊で重心に最も近いセル（塊番号 → 距離 の順に並べて先頭を取る）
+        d = (xs - cx[inv]) ** 2 + (ys - cy[inv]) ** 2
+        order = np.lexsort((d, inv))
+        first = order[np.searchsorted(inv[order], np.arange(size.size))]
+        keep = size >= min_size
+        self.size = size[keep]
+        self.centroid = np.stack([cx, cy], axis=1)[keep]
+        self.anchors = list(zip(xs[first][keep].tolist(), ys[first][keep].tolist()))
+
+    def __len__(self):
+        return len(self.anchors)
+
+
+class FrontierTracker:
+    """
+    known（int8 配列、コピーせず参照）のフロンティアを保持し、差分で更新する。
+    known を書き換えたら update(xs, ys) にそのセルを渡す。
+    """
+    def __init__(self, known):
+        self.known = known
+        self.mask = frontier_mask(known)
+
+    def update(self, xs, ys):
+        """書き換えたセル (xs, ys) とその 4 近傍だけフロンティアかどうかを判定し直す"""
+        H, W = self.mask.shape
+        cx = (np.asarray(xs, dtype=np.intp)[:, None] + _D5X).ravel()
+        cy = (np.asarray(ys, dtype=np.intp)[:, None] + _D5Y).ravel()
+        ok = (cx >= 0) & (cx < W) & (cy >= 0) & (cy < H)
+        idx = np.unique(cy[ok] * W + cx[ok])
+        if idx.size == 0:
+            return
+        cy, cx = np.divmod(idx, W)
+        k = self.known
+        near = np.zeros(idx.size, dtype=bool)
+        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            nx, ny = cx + dx, cy + dy
+            inb = (nx >= 0) & (nx < W) & (ny >= 0) & (ny < H)
+            near[inb] |= k[ny[inb], nx[inb]] == UNKNOWN
+        self.mask.ravel()[idx] = near & (k[cy, cx] == FREE)
+
+    def cells(self):
+        return mask_cells(self.mask)
+
+    def clusters(self, min_size=1):
+        return FrontierClusters(self.mask, min_size)
@@ -0,0 +1,392 @@
+# grid_astar.py
+# NumPy の占有/コスト配列を受け取る 4近傍グリッド A*
+#
+# - セルはフラットな整数 index（i = y*W + x）で扱う
+# - g / parent / closed は盤面サイズ分を事前確保し、世代スタンプで使い回す
+#   （探索ごとの全消去やタプルキー dict を作らない）
+# - ヒープは 1 本だけ。経路は parent を辿って最後に 1 回だけ復元する
+#
+# 一様コスト（cost=None）のときは mode で探索方法を選べる（どれも最短の同じ長さの経路を返す）:
+#   "astar" : 通常の A*
+#   "bidir" : 双方向 A*（スタート側・ゴール側から交互に広げ、出会った最良の点で繋ぐ）
+#   "jps"   : Jump Point Search（4 近傍版）。縦に進んでから横、を正規の順序として対称な経路を刈り、
+#             「次に止まるセル」を行・列ごとに NumPy で前計算しておくので 1 回のジャンプは O(1)
+import heapq
+import numpy as np
+
+INF = float("inf")
+MODES = ("astar", "bidir", "jps")
+
+
+def flat_mask(blocked, shape):
+    """
+    blocked（(H, W) の bool 配列）を探索用のフラットな list（i = y*W + x）にする。
+    すでに長さ H*W のフラットな list（KnownMap.blocked_list など）ならそのまま返す（全体変換しない）
+    """
+    H, W = int(shape[0]), int(shape[1])
+    if isinstance(blocked, list) and len(blocked) == H * W and not isinstance(blocked[0], (list, tuple)):
+        return blocked
+    return np.asarray(blocked, dtype=bool).reshape(H, W).ravel().tolist()
+
+
+def _next_stop(mask, axis, reverse):
+    """mask の各位置から axis 方向に見て最初に True になる位置（なければ端の外: n か -1）"""
+    if axis == 0:
+        # 列方向は転置して行方向で計算する（連続メモリ上の accumulate の方がずっと速い）
+        return _next_stop(np.ascontiguousarray(mask.T), 1, reverse).T
+    n = mask.shape[1]
+    idx = np.arange(n, dtype=np.int32)
+    if reverse:
+        return np.maximum.accumulate(np.where(mask, idx, np.int32(-1)), axis=1)
+    out = np.where(mask[:, ::-1], idx[::-1], np.int32(n))
+    return np.minimum.accumulate(out, axis=1)[:, ::-1]
+
+
+class _JumpTables:
+    """
+    JPS 用の前計算（すべてフラット index の 1 次元配列）。
+    横に進むジャンプは「塞がったセル」か「forced neighbor を持つセル」で止まる。
+    縦に進むジャンプは「塞がったセル」か「そこから横にジャンプすると止まる点があるセル」で止まる。
+    """
+    def __init__(self, blk):
+        H, W = blk.shape
+        B = np.ones((H + 2, W + 2), dtype=bool)
+        B[1:-1, 1:-1] = blk
+        F = ~B
+        free = ~blk
+        # 右向き（+x）に入ったセル: 1 つ後ろの上/下が塞がっていて自分の上/下が空いていれば forced
+        self.up_r = (B[:-2, :-2] & F[:-2, 1:-1] & free).ravel()
+        self.dn_r = (B[2:, :-2] & F[2:, 1:-1] & free).ravel()
+        self.up_l = (B[:-2, 2:] & F[:-2, 1:-1] & free).ravel()
+        self.dn_l = (B[2:, 2:] & F[2:, 1:-1] & free).ravel()
+        forced_r = (self.up_r | self.dn_r).reshape(H, W)
+        forced_l = (self.up_l | self.dn_l).reshape(H, W)
+        next_r = _next_stop(blk | forced_r, 1, False)
+        next_l = _next_stop(blk | forced_l, 1, True)
+        # (x, y) から横にジャンプ（x+1 / x-1 から走査）して forced な点に当たるか
+        ys = np.arange(H)[:, None]
+        sr = np.concatenate([next_r[:, 1:], np.full((H, 1), W)], axis=1)
+        sl = np.concatenate([np.full((H, 1), -1), next_l[:, :-1]], axis=1)
+        hit_r = (sr < W) & forced_r[ys, np.minimum(sr, W - 1)]
+        hit_l = (sl >= 0) & forced_l[ys, np.maximum(sl, 0)]
+        vstop = blk | (free & (hit_r | hit_l))
+        self.blk = blk.ravel()
+        self.forced_r = forced_r.ravel()
+        self.forced_l = forced_l.ravel()
+        self.next_r = next_r.ravel()
+        self.next_l = next_l.ravel()
+        self.wall_r = _next_stop(blk, 1, False).ravel()   # 塞がったセルだけで止まる版（ゴール判定用）
+        self.wall_l = _next_stop(blk, 1, True).ravel()
+        self.next_d = _next_stop(vstop, 0, False).ravel()
+        self.next_u = _next_stop(vstop, 0, True).ravel()
+
+
+class GridAStar:
+    """
+    shape=(H, W) の盤面用に作る再利用可能な A* プランナ。
+    plan() に blocked（True=通行不可）と任意の cost（セルへ入る移動コスト）を渡す。
+    """
+    def __init__(self, shape):
+        self.h, self.w = int(shape[0]), int(shape[1])
+        n = self.h * self.w
+        self.g = [INF] * n
+        self.parent = [-1] * n
+        self.seen = [0] * n      # g/parent が今回の探索で有効か（世代番号）
+        self.closed = [0] * n    # 確定済みか（世代番号）
+        self.gen = 0
+        self.expanded = 0        # 直近の探索で展開したセル数
+        self._back = None        # 双方向探索のゴール側バッファ（必要になったら確保）
+        self._jump = None        # (盤面のバイト列, _JumpTables) 同じ盤面なら JPS の前計算を使い回す
+
+    def _next_gen(self):
+        self.gen += 1
+        if self.gen >= 2**31:
+            # まず起きないが、スタンプが一周したら作り直す
+            n = self.h * self.w
+            self.seen = [0] * n
+            self.closed = [0] * n
+            self._back = None
+            self.gen = 1
+        return self.gen
+
+    def clear_cache(self):
+        """JPS の前計算と双方向探索用の追加バッファを捨てる（計測やメモリ解放用）"""
+        self._jump = None
+        self._back = None
+
+    def reconstruct(self, goal_idx):
+        """parent を辿ってフラット index 列 [start..goal] を返す"""
+        out = []
+        par = self.parent
+        i = goal_idx
+        while i != -1:
+            out.append(i)
+            i = par[i]
+        out.reverse()
+        return out
+
+    def plan(self, start, goal, blocked=None, cost=None, mode="astar"):
+        """
+        start, goal: (x, y)
+        blocked: (H, W) の bool 配列か flat_mask 済みの list（None なら障害物なし）
+        cost: (H, W) の移動コスト配列（None なら一律 1）
+        mode: "astar" / "bidir" / "jps"（"bidir" と "jps" は一様コストのときだけ）
+        戻り値: [(x, y), ...]（見つからなければ []）
+        """
+        if mode not in MODES:
+            raise ValueError("Unknown search mode: %r" % (mode,))
+        if mode != "astar" and cost is not None:
+            raise ValueError("mode %r needs uniform cost (cost=None)" % (mode,))
+        W, H = self.w, self.h
+        s = start[1] * W + start[0]
+        t = goal[1] * W + goal[0]
+        blk = None if blocked is None else flat_mask(blocked, (H, W))
+        if blk is not None and blk[t]:
+            return []
+        if s == t:
+            return [tuple(start)]
+        if mode == "jps":
+            blk_arr = np.zeros((H, W), dtype=bool) if blk is None else np.array(blk, dtype=bool).reshape(H, W)
+            return self._plan_jps(start, goal, blk_arr)
+        if mode == "bidir":
+            return self._plan_bidir(s, t, blk)
+        cst = None
+        hw = 1.0
+        if cost is not None:
+            cost = np.asarray(cost, dtype=float)
+            cst = cost.ravel().tolist()
+            # マンハッタン距離 × 最小コストなら許容的（過大評価しない）
+            hw = max(0.0, float(cost.min()))
+
+        gen = self._next_gen()
+        g, par, seen, closed = self.g, self.parent, self.seen, self.closed
+        gx, gy = goal
+        pop, push = heapq.heappop, heapq.heappush
+
+        g[s] = 0.0; par[s] = -1; seen[s] = gen
+        sx, sy = start
+        h0 = hw * (abs(sx - gx) + abs(sy - gy))
+        openq = [(h0, h0, s)]   # (f, h, index): 同じ f なら h が小さい（ゴール寄り）方を優先
+        expanded = 0
+        found = False
+        while openq:
+            _, _, u = pop(openq)
+            if closed[u] == gen:
+                continue
+            closed[u] = gen
+            expanded += 1
+            if u == t:
+                found = True
+                break
+            gu = g[u]
+            uy, ux = divmod(u, W)
+            for v, vx, vy, ok in ((u + 1, ux + 1, uy, ux + 1 < W),
+                                  (u - 1, ux - 1, uy, ux > 0),
+                                  (u + W, ux, uy + 1, uy + 1 < H),
+                                  (u - W, ux, uy - 1, uy > 0)):
+                if not ok or closed[v] == gen:
+                    continue
+                if blk is not None and blk[v]:
+                    continue
+                ng = gu + (cst[v] if cst is not None else 1.0)
+                if seen[v] != gen or ng < g[v]:
+                    seen[v] = gen; g[v] = ng; par[v] = u
+                    hv = hw * (abs(vx - gx) + abs(vy - gy))
+                    push(openq, (ng + hv, hv, v))
+        self.expanded = expanded
+        if not found:
+            return []
+        return [(i % W, i // W) for i in self.reconstruct(t)]
+
+    def _plan_bidir(self, s, t, blk):
+        """双方向 A*（一様コスト）。どちらかの側の最小 f が出会いの最良コスト以上になったら確定"""
+        W, H = self.w, self.h
+        gen = self._next_gen()
+        if self._back is None:
+            n = W * H
+            self._back = ([INF] * n, [-1] * n, [0] * n, [0] * n)
+        fwd = (self.g, self.parent, self.seen, self.closed)
+        bwd = self._back
+        pop, push = heapq.heappop, heapq.heappush
+        sy, sx = divmod(s, W)
+        ty, tx = divmod(t, W)
+        sides = []
+        for (g, par, seen, _), u, (ax, ay) in ((fwd, s, (tx, ty)), (bwd, t, (sx, sy))):
+            g[u] = 0; par[u] = -1; seen[u] = gen
+            hu = abs(u % W - ax) + abs(u // W - ay)
+            sides.append(([(hu, hu, u)], ax, ay))
+        best, meet = INF, -1
+        expanded = 0
+        while sides[0][0] and sides[1][0]:
+            if sides[0][0][0][0] >= best or sides[1][0][0][0] >= best:
+                break
+            k = 0 if len(sides[0][0]) <= len(sides[1][0]) else 1
+            openq, ax, ay = sides[k]
+            g, par, seen, closed = fwd if k == 0 else bwd
+            og, _, oseen, _ = bwd if k == 0 else fwd
+            _, _, u = pop(openq)
+            if closed[u] == gen:
+                continue
+            closed[u] = gen
+            expanded += 1
+            ng = g[u] + 1
+            uy, ux = divmod(u, W)
+            for v, vx, vy, ok in ((u + 1, ux + 1, uy, ux + 1 < W),
+                                  (u - 1, ux - 1, uy, ux > 0),
+                                  (u + W, ux, uy + 1, uy + 1 < H),
+                                  (u - W, ux, uy - 1, uy > 0)):
+                if not ok or closed[v] == gen:
+                    continue
+                if blk is not None and blk[v]:
+                    continue
+                if seen[v] != gen or ng < g[v]:
+                    seen[v] = gen; g[v] = ng; par[v] = u
+                    hv = abs(vx - ax) + abs(vy - ay)
+                    push(openq, (ng + hv, hv, v))
+                    if oseen[v] == gen and ng + og[v] < best:
+                        best, meet = ng + og[v], v
+        self.expanded = expanded
+        if meet == -1:
+            return []
+        out = self.reconstruct(meet)
+        par2 = bwd[1]
+        i = par2[meet]
+        while i != -1:
+            out.append(i)
+            i = par2[i]
+        return [(i % W, i // W) for i in out]
+
+    def _plan_jps(self, start, goal, blk_arr):
+        """4 近傍 Jump Point Search（一様コスト）。ジャンプ点どうしを A* で繋ぎ、最後に直線で埋める"""
+        W, H = self.w, self.h
+        key = blk_arr.tobytes()
+        if self._jump is None or self._jump[0] != key:
+            self._jump = (key, _JumpTables(blk_arr))
+        J = self._jump[1]
+        blk, next_r, next_l, next_d, next_u = J.blk, J.next_r, J.next_l, J.next_d, J.next_u
+        gx, gy = goal
+        t = gy * W + gx
+
+        def goal_in_row(x, y):
+            # (x, y) から同じ行のゴールまで塞がったセルなしで行けるか（y == gy のとき）
+            i = y * W + x
+            return gx == x or (gx > x and J.wall_r[i] > gx) or (gx < x and J.wall_l[i] < gx)
+
+        def jump(x, y, dx, dy):
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < W and 0 <= ny < H) or blk[ny * W + nx]:
+                return -1
+            if dy == 0:
+                if dx > 0:
+                    e = int(next_r[ny * W + nx])
+                    if y == gy and nx <= gx <= e:
+                        return t
+                    return y * W + e if e < W and J.forced_r[y * W + e] else -1
+                e = int(next_l[ny * W + nx])
+                if y == gy and e <= gx <= nx:
+                    return t
+                return y * W + e if e >= 0 and J.forced_l[y * W + e] else -1
+            # 縦: 止まる行 e までの間にゴールの行があり、そこから横にゴールが見えればそこで止まる
+            if dy > 0:
+                e = int(next_d[ny * W + x])
+                if ny <= gy <= e and gy < H and not blk[gy * W + x] and goal_in_row(x, gy):
+                    return gy * W + x
+                return e * W + x if e < H and not blk[e * W + x] else -1
+            e = int(next_u[ny * W + x])
+            if e <= gy <= ny and gy >= 0 and not blk[gy * W + x] and goal_in_row(x, gy):
+                return gy * W + x
+            return e * W + x if e >= 0 and not blk[e * W + x] else -1
+
+        gen = self._next_gen()
+        g, par, seen, closed = self.g, self.parent, self.seen, self.closed
+        pop, push = heapq.heappop, heapq.heappush
+        s = start[1] * W + start[0]
+        g[s] = 0; par[s] = -1; seen[s] = gen
+        h0 = abs(start[0] - gx) + abs(start[1] - gy)
+        openq = [(h0, h0, s)]
+        expanded = 0
+        found = False
+        all_dirs = ((1, 0), (-1, 0), (0, 1), (0, -1))
+        while openq:
+            _, _, u = pop(openq)
+            if closed[u] == gen:
+                continue
+            closed[u] = gen
+            expanded += 1
+            if u == t:
+                found = True
+                break
+            uy, ux = divmod(u, W)
+            p = par[u]
+            if p == -1:
+                dirs = all_dirs
+            else:
+                py, px = divmod(p, W)
+                dx = (ux > px) - (ux < px)
+                dy = (uy > py) - (uy < py)
+                if dy:
+                    dirs = ((0, dy), (1, 0), (-1, 0))   # 縦に来たら: 直進 + 左右（自然な近傍）
+                else:
+                    dirs = [(dx, 0)]                    # 横に来たら: 直進 + forced な上下だけ
+                    up, dn = (J.up_r, J.dn_r) if dx > 0 else (J.up_l, J.dn_l)
+                    if up[u]:
+                        dirs.append((0, -1))
+                    if dn[u]:
+                        dirs.append((0, 1))
+            gu = g[u]
+            for dx, dy in dirs:
+                v = jump(ux, uy, dx, dy)
+                if v == -1 or closed[v] == gen:
+                    continue
+                vy, vx = divmod(v, W)
+                ng = gu + abs(vx - ux) + abs(vy - uy)
+                if seen[v] != gen or ng < g[v]:
+                    seen[v] = gen; g[v] = ng; par[v] = u
+                    hv = abs(vx - gx) + abs(vy - gy)
+                    push(openq, (ng + hv, hv, v))
+        self.expanded = expanded
+        if not found:
+            return []
+        # ジャンプ点の列を直線で埋めてセル列にする
+        jp = self.reconstruct(t)
+        out = [(jp[0] % W, jp[0] // W)]
+        for a, b in zip(jp, jp[1:]):
+            ay, ax = divmod(a, W)
+            by, bx = divmod(b, W)
+            sx, sy = (bx > ax) - (bx < ax), (by > ay) - (by < ay)
+            for k in range(1, abs(bx - ax) + abs(by - ay) + 1):
+                out.append((ax + sx * k, ay + sy * k))
+        return out
+
+    def cost_of(self, cell):
+        """直近の探索で確定した g 値（未到達なら inf）"""
+        i = cell[1] * self.w + cell[0]
+        return self.g[i] if self.seen[i] == self.gen else INF
+
+
+# 盤面サイズごとにプランナ（バッファ）を使い回す
+_planners = {}
+
+def get_planner(shape):
+    key = (int(shape[0]), int(shape[1]))
+    p = _planners.get(key)
+    if p is None:
+        p = _planners[key] = GridAStar(key)
+    return p
+
+
+def a_star(grid, start, goal, cost=None, mode="astar"):
+    """
+    各スクリプトの a_star(grid, start, goal) の置き換え用。
+    grid: 0=free / 1=blocked（list of lists でも ndarray でもよい）
+    cost: 任意。セルへ入るときの移動コスト（省略時は 1）
+    mode: "astar" / "bidir" / "jps"（一様コストのときだけ後ろ 2 つを選べる）
+    """
+    blocked = np.asarray(grid) == 1
+    return get_planner(blocked.shape).plan(start, goal, blocked, cost, mode)
+
+
+def a_star_with_cost(cost_grid, start, goal, blocked_mask):
+    """occupancy 系の a_star_with_cost(cost_grid, start, goal, blocked_mask) の置き換え用"""
+    blocked = np.asarray(blocked_mask, dtype=bool)
+    return get_planner(blocked.shape).plan(start, goal, blocked, cost_grid)
@@ -0,0 +1,112 @@
+# kernels.py
+# 核（カーネル）による「点群 → 格子上のコスト/確率場」の一括合成
+#
+# ■ ガウス核（splat_gaussian）
+# 予測位置はすべて整数セルなので、
+#   1) 重みをインパルス格子（核半径ぶん外側に余白を取る）へ np.add.at でまとめて足し込み
+#   2) ガウス核は x, y で分離できるので 1 次元の畳み込みを 2 回かける
+# とすれば、点の数に依らず O(格子面積 × 核幅) で済む。核は truncate×σ で打ち切る。
+#
+# ■ 半径 R のインフレーション核（inflation_offsets / stamp_kernel）
+# 距離 <= R のオフセットと値を 1 度だけ作り、各点のまわりにだけ置く（O(点数 × 核面積)）。
+# 点が格子面積より多いときはインパルス格子に集計してから核のオフセットぶんずらし足す
+# （O(格子面積 × 核面積)）。どちらも「各点からの寄与の和」で、結果は同じ。
+import math
+import numpy as np
+
+_kernels = {}
+
+def gaussian_kernel1d(sigma, truncate=3.0):
+    """exp(-0.5 d^2/σ^2) を d=-R..R で並べた 1 次元核（R = ceil(truncate*σ)）。キャッシュ・読み取り専用"""
+    key = (float(sigma), float(truncate))
+    k = _kernels.get(key)
+    if k is None:
+        r = max(0, int(math.ceil(truncate * sigma)))
+        d = np.arange(-r, r + 1, dtype=float)
+        k = np.exp(-0.5 * d * d / (sigma * sigma))
+        k.setflags(write=False)
+        _kernels[key] = k
+    return k
+
+
+def splat_gaussian(shape, xs, ys, weights, sigma, truncate=3.0):
+    """
+    sum_i weights[i] * exp(-0.5*((gx-xs[i])^2 + (gy-ys[i])^2)/σ^2) を (H, W) 格子で返す。
+    xs, ys は整数（盤面外でもよい。核が盤面に届かない点は自動的に無視される）
+    """
+    H, W = shape
+    k = gaussian_kernel1d(sigma, truncate)
+    r = len(k) // 2
+    xs, ys, w = np.broadcast_arrays(np.asarray(xs, dtype=np.intp), np.asarray(ys, dtype=np.intp),
+                                    np.asarray(weights, dtype=float))
+    xs, ys, w = xs.ravel(), ys.ravel(), w.ravel()
+
+    # 余白つきインパルス格子に足し込み（核が盤面に届かない点は捨てる）
+    px, py = xs + r, ys + r
+    keep = (px >= 0) & (px < W + 2*r) & (py >= 0) & (py < H + 2*r)
+    imp = np.zeros((H + 2*r, W + 2*r))
+    np.add.at(imp, (py[keep], px[keep]), w[keep])
+
+    # 分離畳み込み: 横 → 縦（核幅ぶんのずらし足し込み）
+    tmp = np.zeros((H + 2*r, W))
+    for i, kv in enumerate(k):
+        tmp += kv * imp[:, i:i+W]
+    out = np.zeros((H, W))
+    for i, kv in enumerate(k):
+        out += kv * tmp[i:i+H, :]
+    return out
+
+
+_inflations = {}
+
+def inflation_offsets(radius, metric="euclid"):
+    """
+    距離 <= radius のセルの相対オフセット (dx, dy, d)。
+    metric: "manhattan" ならマンハッタン距離、それ以外はユークリッド距離。キャッシュ・読み取り専用
+    """
+    key = (float(radius), metric)
+    o = _inflations.get(key)
+    if o is None:
+        r = max(0, int(math.floor(radius)))
+        dy, dx = np.mgrid[-r:r+1, -r:r+1]
+        d = (np.abs(dx) + np.abs(dy)).astype(float) if metric == "manhattan" else np.hypot(dx, dy)
+        inside = d <= radius
+        o = (dx[inside].astype(np.intp), dy[inside].astype(np.intp), d[inside])
+        for a in o:
+            a.setflags(write=False)
+        _inflations[key] = o
+    return o
+
+
+def stamp_kernel(shape, xs, ys, weights, dx, dy, vals):
+    """
+    sum_i weights[i] * vals[k] を セル (xs[i]+dx[k], ys[i]+dy[k]) に足し込んだ (H, W) 配列。
+    xs, ys は整数（盤面外でもよい。盤面からはみ出た部分は捨てる）
+    """
+    H, W = shape
+    xs, ys, w = np.broadcast_arrays(np.asarray(xs, dtype=np.intp), np.asarray(ys, dtype=np.intp),
+                                    np.asarray(weights, dtype=float))
+    xs, ys, w = xs.ravel(), ys.ravel(), w.ravel()
+    if xs.size == 0:
+        return np.zeros((H, W))
+
+    if xs.size * dx.size <= H * W:
+        # 点ごとに核を置く: O(点数 × 核面積)
+        cx = xs[:, None] + dx[None, :]
+        cy = ys[:, None] + dy[None, :]
+        v = w[:, None] * vals[None, :]
+        keep = (cx >= 0) & (cx < W) & (cy >= 0) & (cy < H)
+        out = np.bincount(cy[keep] * W + cx[keep], weights=v[keep], minlength=H * W)
+        return out.reshape(H, W)
+
+    # 点が多いとき: 余白つきインパルス格子に集計 → 核のオフセットぶんずらし足し
+    r = int(max(np.abs(dx).max(), np.abs(dy).max()))
+    Hp, Wp = H + 2*r, W + 2*r
+    px, py = xs + r, ys + r
+    keep = (px >= 0) & (px < Wp) & (py >= 0) & (py < Hp)
+    imp = np.bincount(py[keep] * Wp + px[keep], weights=w[keep], minlength=Hp * Wp).reshape(Hp, Wp)
+    out = np.zeros((H, W))
+    for ox, oy, v in zip(dx.tolist(), dy.tolist(), vals.tolist()):
+        # out[y, x] += v * imp[y - oy, x - ox]（余白 r ぶんずらして参照）
+        out += v * imp[r-oy:r-oy+H, r-ox:r-ox+W]
+    return out
@@ -0,0 +1,63 @@
+# knownmap.py
+# 部分観測エージェント用の既知マップ（int8: -1=unknown / 0=free / 1=blocked）
+#
+# リストのリストで持って毎ステップ 0/1 のリストへ作り直す代わりに:
+#   - 本体は int8 の (H, W) 配列 1 枚
+#   - 「通れない」「未知」の bool マスク（blocked / unknown）を本体と一緒に持ち、
+#     書き込みのたびに書いたセルだけ更新する
+#   - blocked はフラットな list（blocked_list）でも持ち、これも書いたセルだけ書き換える。
+#     プランナ（GridAStar.plan / DistanceField）はこの list をそのまま使う（毎回の ravel().tolist() なし）
+# 本体とマスクがずれないよう、書き込みは set / mark_free 経由にする（grid は読み取り専用）。
+import numpy as np
+
+UNKNOWN, FREE, BLOCKED = -1, 0, 1
+
+
+class KnownMap:
+    """
+    shape=(H, W)。known[y][x] / known[y, x] で値を読める。
+    blocked: True=既知の障害物、unknown: True=未観測（どちらも常に最新）
+    blocked_list: blocked のフラットな list（i = y*W + x、読み取り専用）
+    """
+    def __init__(self, shape, fill=UNKNOWN):
+        self.shape = (int(shape[0]), int(shape[1]))
+        self._grid = np.full(self.shape, fill, dtype=np.int8)
+        self.grid = self._grid.view()
+        self.grid.flags.writeable = False
+        self.blocked = self._grid == BLOCKED
+        self.unknown = self._grid == UNKNOWN
+        self.blocked_list = self.blocked.ravel().tolist()
+
+    def __getitem__(self, idx):
+        return self.grid[idx]
+
+    def __array__(self, dtype=None, copy=None):
+        return self.grid if dtype is None else self.grid.astype(dtype)
+
+    def set(self, xs, ys, values):
+        """(xs, ys) のセルを values（スカラーかセルごと）にする"""
+        xs = np.asarray(xs, dtype=np.intp)
+        ys = np.asarray(ys, dtype=np.intp)
+        self._grid[ys, xs] = values
+        v = self._grid[ys, xs]
+        b = v == BLOCKED
+        self.blocked[ys, xs] = b
+        self.unknown[ys, xs] = v == UNKNOWN
+        lst = self.blocked_list
+        for i, bi in zip((ys * self.shape[1] + xs).ravel().tolist(), b.ravel().tolist()):
+            lst[i] = bi
+
+    def mark_free(self, xs, ys, keep_blocked=False):
+        """free にする。keep_blocked=True なら既に障害物と分かっているセルはそのまま"""
+        xs = np.asarray(xs, dtype=np.intp)
+        ys = np.asarray(ys, dtype=np.intp)
+        if keep_blocked:
+            keep = ~self.blocked[ys, xs]
+            xs, ys = xs[keep], ys[keep]
+        self.set(xs, ys, FREE)
+
+    def mark_blocked(self, xs, ys):
+        self.set(xs, ys, BLOCKED)
+
+    def known_count(self):
+        return self.unknown.size - int(np.count_nonzero(self.unknown))
@@ -0,0 +1,114 @@
+# occupancy.py
+# ログオッズ占有格子の更新とコストマップ生成（配列まとめて計算）
+#
+# 観測は (xs, ys, meas) の 3 本の配列で受け取る。
+#   meas: 1=occupied 観測 / 0=free 観測
+# 1 回のスキャン内で同じセルは 1 度しか現れない前提（円形・ビームどちらのスキャンでも成り立つ）。
+import numpy as np
+
+
+def logodds_to_prob(L, out=None):
+    """p = 1 / (1 + e^-L)（配列まとめて。スカラーも可。out を渡したときだけその場で計算）"""
+    if out is None:
+        return 1.0 / (1.0 + np.exp(-np.asarray(L, dtype=float)))
+    out = np.negative(L, out=out)
+    np.exp(out, out=out)
+    out += 1.0
+    np.reciprocal(out, out=out)
+    return out
+
+
+def update_logodds(logodds, xs, ys, meas, l_occ, l_free, l_min, l_max):
+    """観測セルに +l_occ / -l_free を足してクリップ（logodds をその場で更新）"""
+    xs = np.asarray(xs, dtype=np.intp)
+    ys = np.asarray(ys, dtype=np.intp)
+    delta = np.where(np.asarray(meas, dtype=bool), l_occ, -l_free)
+    vals = logodds[ys, xs] + delta
+    np.clip(vals, l_min, l_max, out=vals)
+    logodds[ys, xs] = vals
+
+
+def build_cost_and_block(logodds, w_risk, w_unk, p_block, out=None):
+    """
+    占有確率 p から計画用のコストと通行不可マスクを作る:
+      - p >= p_block なら通行不可
+      - cost = 1 + w_risk*p + w_unk*unknown,  unknown = 1 - |p-0.5|*2
+    out=(cost, blocked, p) を渡すとその配列に書き込む（毎ステップの確保を避ける）
+    戻り値: (cost, blocked, p)
+    """
+    if out is None:
+        cost = np.empty(logodds.shape, dtype=float)
+        blocked = np.empty(logodds.shape, dtype=bool)
+        p = np.empty(logodds.shape, dtype=float)
+    else:
+        cost, blocked, p = out
+    logodds_to_prob(logodds, out=p)
+    np.greater_equal(p, p_block, out=blocked)
+    # cost = 1 + w_risk*p + w_unk*(1 - 2|p-0.5|)
+    np.subtract(p, 0.5, out=cost)
+    np.abs(cost, out=cost)
+    cost *= -2.0 * w_unk
+    cost += 1.0 + w_unk
+    cost += w_risk * p
+    return cost, blocked, p
+
+
+class OccupancyCostMap:
+    """
+    ログオッズ・占有確率・コスト・通行不可マスクをまとめて保持し、
+    スキャンで触れたセルだけ再計算するコストマップ。
+
+    update() の後は
+      changed_xs / changed_ys : コストか通行可否が実際に変わったセル
+      dirty_bbox              : 今回触れたセルの外接矩形 (x0, y0, x1, y1)（両端含む）
+    を参照できるので、インクリメンタルなプランナはそこだけ見ればよい。
+    keep_free に渡したセル（スタート・ゴールなど）は常に通行可能にする。
+    """
+    def __init__(self, shape, w_risk, w_unk, p_block, l_occ, l_free, l_min, l_max, keep_free=()):
+        self.w_risk, self.w_unk, self.p_block = w_risk, w_unk, p_block
+        self.l_occ, self.l_free, self.l_min, self.l_max = l_occ, l_free, l_min, l_max
+        self.logodds = np.zeros(shape, dtype=float)
+        self.cost = np.empty(shape, dtype=float)
+        self.blocked = np.empty(shape, dtype=bool)
+        self.p = np.empty(shape, dtype=float)
+        self.keep_free = list(keep_free)
+        self.rebuild()
+
+    def rebuild(self):
+        """全セルを作り直す（初期化時やパラメータ変更時）"""
+        build_cost_and_block(self.logodds, self.w_risk, self.w_unk, self.p_block,
+                             out=(self.cost, self.blocked, self.p))
+        for x, y in self.keep_free:
+            self.blocked[y, x] = False
+        h, w = self.logodds.shape
+        ys, xs = np.indices((h, w))
+        self.changed_xs, self.changed_ys = xs.ravel(), ys.ravel()
+        self.dirty_bbox = (0, 0, w - 1, h - 1)
+
+    def update(self, xs, ys, meas):
+        """観測 (xs, ys, meas) を取り込み、そのセルだけ p / cost / blocked を更新"""
+        xs = np.asarray(xs, dtype=np.intp)
+        ys = np.asarray(ys, dtype=np.intp)
+        if xs.size == 0:
+            self.changed_xs = self.changed_ys = xs
+            self.dirty_bbox = None
+            return self.changed_xs, self.changed_ys
+        update_logodds(self.logodds, xs, ys, meas, self.l_occ, self.l_free, self.l_min, self.l_max)
+
+        old_cost = self.cost[ys, xs]
+        old_blk = self.blocked[ys, xs]
+        cost, blk, p = build_cost_and_block(self.logodds[ys, xs], self.w_risk, self.w_unk, self.p_block)
+        for x, y in self.keep_free:
+            blk[(xs == x) & (ys == y)] = False
+        self.p[ys, xs] = p
+        self.cost[ys, xs] = cost
+        self.blocked[ys, xs] = blk
+
+        changed = (cost != old_cost) | (blk != old_blk)
+        self.changed_xs, self.changed_ys = xs[changed], ys[changed]
+        self.dirty_bbox = (int(xs.min()), int(ys.min()), int(xs.max()), int(ys.max()))
+        return self.changed_xs, self.changed_ys
+
+    def changed_cells(self):
+        """直近の update() で変化したセルを [(x, y), ...] で返す"""
+        return list(zip(self.changed_xs.tolist(), self.changed_ys.tolist()))
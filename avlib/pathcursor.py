@@ -0,0 +1,65 @@
+# pathcursor.py
+# 連続空間の経路追従で「経路上のどの点の近くにいるか」を毎フレーム O(1) で求める
+#
+# 毎フレーム全 waypoint との距離を測る代わりに:
+#   1) 経路は (N, 2) の float 配列 1 つで持つ
+#   2) 前回の最近傍 index から先の window 点だけを調べる（戻らない）。
+#      窓の末端が一番近ければ窓をずらして続ける（速く進んだとき用）
+#   3) 窓内の最近傍が reloc_dist より遠い（経路から大きく外れた・飛ばされた）ときだけ
+#      全体から最近傍を探し直す。scipy があれば KD 木（初回に 1 回だけ作る）、なければ一括の距離計算
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:   # scipy は任意
+    cKDTree = None
+
+WINDOW = 16
+RELOC_DIST = 2.0
+
+
+class PathCursor:
+    """
+    path: [(x, y), ...] か (N, 2) 配列
+    window: 1 回に調べる点数、reloc_dist: これより遠ければ全体から探し直す（None なら探し直さない）
+    """
+    def __init__(self, path, window=WINDOW, reloc_dist=RELOC_DIST):
+        self.points = np.ascontiguousarray(path, dtype=float).reshape(-1, 2)
+        self.window = max(2, int(window))
+        self.reloc_dist = reloc_dist
+        self.index = 0
+        self.relocalizations = 0
+        self._tree = None
+
+    def __len__(self):
+        return len(self.points)
+
+    def nearest(self, pos):
+        """pos に最も近い経路点の index（前回の index より前には戻らない。探し直したときを除く）"""
+        pts = self.points
+        px, py = float(pos[0]), float(pos[1])
+        i = self.index
+        while True:
+            seg = pts[i:i+self.window]
+            d2 = (seg[:, 0] - px) ** 2 + (seg[:, 1] - py) ** 2
+            k = int(np.argmin(d2))
+            if k < len(seg) - 1 or i + k >= len(pts) - 1:
+                break
+            i += k   # 窓の末端が最寄り → その先も見る
+        self.index = i + k
+        if self.reloc_dist is not None and d2[k] > self.reloc_dist ** 2:
+            self.relocalize(pos)
+        return self.index
+
+    def relocalize(self, pos):
+        """経路全体から最近傍を探し直して index を置き換える"""
+        self.relocalizations += 1
+        if cKDTree is not None:
+            if self._tree is None:
+                self._tree = cKDTree(self.points)
+            _, i = self._tree.query((float(pos[0]), float(pos[1])))
+        else:
+            d = self.points - np.asarray(pos, dtype=float)
+            i = np.argmin((d * d).sum(axis=1))
+        self.index = int(i)
+        return self.index
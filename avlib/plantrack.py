@@ -0,0 +1,128 @@
+# plantrack.py
+# 追従中の経路を保持し、壊れた区間だけ局所探索で繋ぎ直すトラッカー
+#
+# 毎フレーム全体を A* し直す代わりに:
+#   1) 現在地まで経路を進める（経路上のセル → 位置 の dict で O(1)）
+#   2) 前回から状態が変わったセル（changed）のうち経路上にあるものだけを index で引いて判定する
+#      （経路を先頭から舐めない）。通行不可になったセルは常に無効、
+#      危険マスク（高コストなど）のセルは「計画したときには危険でなかった」ものだけ無効
+#      （危険と分かっていてコスト込みで選んだセルは受け入れ済みとして set で覚えておく）。
+#      差し替えたばかりの経路はまだ判定していないので、次の 1 回だけ全セルを調べる
+#   3) 経路上で最初の無効セルの手前から、最後の無効セルの先で有効な経路上のセルまでを、
+#      区間を囲む小さな窓の中だけで A* して差し替える（修復）
+#   4) 修復できないときだけ呼び出し側の全体再計画を使う
+import numpy as np
+from avlib.grid_astar import get_planner
+
+KEEP, REPAIR, REPLAN = "keep", "repair", "replan"
+
+
+class PlanTracker:
+    """
+    margin: 修復時の探索窓を区間の外接矩形から何セル広げるか
+    """
+    def __init__(self, margin=2):
+        self.margin = margin
+        self.path = []
+        self.index = {}
+        self.accepted = set()   # 計画時点で既に危険だった経路上のセル
+        self.checked = False    # 今の経路を一度でも全体判定したか
+        self.repairs = 0
+        self.replans = 0
+
+    def set_path(self, path, bad=None):
+        """経路を差し替える。bad を渡すと、その時点で危険なセルを受け入れ済みにする"""
+        self.path = list(path or [])
+        self._reindex()
+        self.checked = False
+        if bad is not None:
+            self.accepted = {c for c in self.path if bad[c[1], c[0]]}
+
+    def _reindex(self):
+        self.index = {c: i for i, c in enumerate(self.path)}
+
+    def advance(self, cell):
+        """cell が経路上にあれば、そこより前を捨てる。経路から外れていれば False"""
+        i = self.index.get(cell)
+        if i is None:
+            return False
+        if i > 0:
+            self.path = self.path[i:]
+            self._reindex()
+        return True
+
+    def update(self, cur, step_cost, blocked, bad, replan, changed=None):
+        """
+        cur      : 現在セル
+        step_cost: (H, W) 移動コスト
+        blocked  : (H, W) 通行不可（静的障害物・動的障害物の現在位置など）
+        bad      : (H, W) 避けたいセル（高コストなど）
+        replan   : 全体再計画の関数（引数なし、経路を返す）
+        changed  : 前回の update から blocked / bad が変わったセル (xs, ys)。None なら経路全体を調べる
+        戻り値: KEEP / REPAIR / REPLAN
+        """
+        if not self.advance(cur) or len(self.path) < 2:
+            return self._replan(replan, bad)
+        path = self.path
+        invalid = lambda c: blocked[c[1], c[0]] or (bad[c[1], c[0]] and c not in self.accepted)
+        if changed is None or not self.checked:
+            seg = np.asarray(path[1:])
+            cand = np.flatnonzero(blocked[seg[:, 1], seg[:, 0]] | bad[seg[:, 1], seg[:, 0]]) + 1
+        else:
+            index = self.index
+            cand = [index[c] for c in zip(*(np.asarray(v).tolist() for v in changed)) if c in index]
+        hit = sorted(int(h) for h in cand if h > 0 and invalid(path[h]))
+        self.checked = True
+        if not hit:
+            return KEEP
+        i, k = hit[0], hit[-1]
+
+        # 無効区間の後ろで最初に有効な経路上のセル（合流点）
+        j = k + 1
+        while j < len(path) and invalid(path[j]):
+            j += 1
+        if j >= len(path):
+            return self._replan(replan, bad)
+        local = self._search(path[i-1], path[j], path[i-1:j+1], step_cost, blocked)
+        if not local:
+            return self._replan(replan, bad)
+        accepted = self.accepted
+        self.set_path(_drop_loops(path[:i-1] + local + path[j+1:]), bad)
+        # 修復区間の外で受け入れ済みだったセルはそのまま。
+        # 区間の外は判定済み、区間内は blocked を避けて探索したので経路全体が判定済み
+        self.accepted |= {c for c in accepted if c in self.index}
+        self.checked = True
+        self.repairs += 1
+        return REPAIR
+
+    def _search(self, a, b, segment, step_cost, blocked):
+        """a → b を、segment の外接矩形 + margin の窓の中だけで探索（避けたいセルはコストで避ける）"""
+        H, W = blocked.shape
+        xs = [c[0] for c in segment]; ys = [c[1] for c in segment]
+        x0, x1 = max(0, min(xs) - self.margin), min(W - 1, max(xs) + self.margin)
+        y0, y1 = max(0, min(ys) - self.margin), min(H - 1, max(ys) + self.margin)
+        win_blk = blocked[y0:y1+1, x0:x1+1].copy()
+        win_blk[a[1]-y0, a[0]-x0] = False   # 出発点（現在地のこともある）は通す
+        local = get_planner(win_blk.shape).plan((a[0]-x0, a[1]-y0), (b[0]-x0, b[1]-y0),
+                                                win_blk, step_cost[y0:y1+1, x0:x1+1])
+        return [(x + x0, y + y0) for x, y in local]
+
+    def _replan(self, replan, bad):
+        self.set_path(replan(), bad)
+        self.replans += 1
+        return REPLAN
+
+
+def _drop_loops(path):
+    """同じセルを 2 度通る部分（つなぎ直しでできた輪）を取り除く"""
+    out, pos = [], {}
+    for c in path:
+        i = pos.get(c)
+        if i is not None:
+            for d in out[i+1:]:
+                del pos[d]
+            del out[i+1:]
+            continue
+        pos[c] = len(out)
+        out.append(c)
+    return out
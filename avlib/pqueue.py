@@ -0,0 +1,103 @@
+# pqueue.py
+# 位置マップ付き二分ヒープ（decrease-key / remove 対応の優先度キュー）
+#
+# heapq はキー変更や削除ができないため、D* Lite のように
+# 「キュー内の頂点のキーを書き換える / 取り除く」処理では全走査が必要になる。
+# ここでは item -> ヒープ内位置 の dict を持ち、どれも O(log N) で行う。
+
+
+class IndexedPriorityQueue:
+    """item はハッシュ可能なら何でもよい（セル座標のタプルなど）"""
+    def __init__(self):
+        self.keys = []    # ヒープ順に並んだキー
+        self.items = []   # keys と同じ位置の item
+        self.pos = {}     # item -> index
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return item in self.pos
+
+    def top(self):
+        """最小キーの (key, item)（空なら例外）"""
+        return self.keys[0], self.items[0]
+
+    def top_key(self, default=None):
+        return self.keys[0] if self.keys else default
+
+    def push(self, item, key):
+        """未登録なら追加、登録済みならキーを更新（増減どちらも可）"""
+        i = self.pos.get(item)
+        if i is None:
+            self.keys.append(key)
+            self.items.append(item)
+            i = self.pos[item] = len(self.items) - 1
+            self._up(i)
+            return
+        old = self.keys[i]
+        self.keys[i] = key
+        if key < old:
+            self._up(i)
+        else:
+            self._down(i)
+
+    update = push
+
+    def pop(self):
+        """最小キーの (key, item) を取り出す"""
+        key, item = self.keys[0], self.items[0]
+        self._remove_at(0)
+        return key, item
+
+    def remove(self, item):
+        """登録されていれば取り除く（無ければ何もしない）"""
+        i = self.pos.get(item)
+        if i is not None:
+            self._remove_at(i)
+
+    def _remove_at(self, i):
+        last = len(self.items) - 1
+        del self.pos[self.items[i]]
+        if i != last:
+            self.keys[i] = self.keys[last]
+            self.items[i] = self.items[last]
+            self.pos[self.items[i]] = i
+        self.keys.pop()
+        self.items.pop()
+        if i < len(self.items):
+            self._up(i)
+            self._down(i)
+
+    def _swap(self, i, j):
+        k, it = self.keys, self.items
+        k[i], k[j] = k[j], k[i]
+        it[i], it[j] = it[j], it[i]
+        self.pos[it[i]] = i
+        self.pos[it[j]] = j
+
+    def _up(self, i):
+        k = self.keys
+        while i > 0:
+            p = (i - 1) >> 1
+            if k[i] < k[p]:
+                self._swap(i, p)
+                i = p
+            else:
+                break
+
+    def _down(self, i):
+        k = self.keys
+        n = len(k)
+        while True:
+            l = 2*i + 1
+            if l >= n:
+                break
+            c = l
+            if l + 1 < n and k[l+1] < k[l]:
+                c = l + 1
+            if k[c] < k[i]:
+                self._swap(i, c)
+                i = c
+            else:
+                break
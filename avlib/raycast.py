@@ -0,0 +1,100 @@
+# raycast.py
+# LiDAR 風スキャンの一括レイキャスト
+#
+# セル中心から出るビームが通過するセル列は、発射位置に依らず同じ相対オフセットになる。
+# そこで (ビーム本数, 最大距離) ごとに DDA（格子トラバーサル）でオフセット表を 1 度だけ作り、
+# スキャン時は「原点 + オフセット表」を配列のまま盤面に当てて全ビームを同時に処理する。
+import math
+import numpy as np
+
+
+def _dda_offsets(angle, max_range):
+    """セル (0,0) の中心から angle 方向へ max_range まで進むときに通るセル（原点は含まない）"""
+    dx, dy = math.cos(angle), math.sin(angle)
+    if abs(dx) < 1e-12: dx = 0.0
+    if abs(dy) < 1e-12: dy = 0.0
+    cx, cy = 0, 0
+    step_x = 1 if dx > 0 else -1
+    step_y = 1 if dy > 0 else -1
+    # 次の縦線・横線に当たるまでの距離 t と、1 マス進むごとの増分
+    t_max_x = 0.5 / abs(dx) if dx else math.inf
+    t_max_y = 0.5 / abs(dy) if dy else math.inf
+    t_dx = 1.0 / abs(dx) if dx else math.inf
+    t_dy = 1.0 / abs(dy) if dy else math.inf
+    cells = []
+    while True:
+        if t_max_x < t_max_y:
+            t = t_max_x; cx += step_x; t_max_x += t_dx
+        else:
+            t = t_max_y; cy += step_y; t_max_y += t_dy
+        if t > max_range:
+            break
+        cells.append((cx, cy))
+    return cells
+
+
+class BeamTable:
+    """
+    ビームごとの通過セルオフセット表。
+    dx, dy: (ビーム数, 最大長) の int 配列、valid: 実データかどうか（短いビームの詰め物は False）
+    """
+    def __init__(self, angles, max_range):
+        self.angles = np.asarray(angles, dtype=float)
+        self.max_range = max_range
+        rays = [_dda_offsets(a, max_range) for a in self.angles]
+        length = max(1, max(len(r) for r in rays))
+        B = len(rays)
+        self.dx = np.zeros((B, length), dtype=np.intp)
+        self.dy = np.zeros((B, length), dtype=np.intp)
+        self.valid = np.zeros((B, length), dtype=bool)
+        for b, r in enumerate(rays):
+            if r:
+                arr = np.array(r, dtype=np.intp)
+                self.dx[b, :len(r)] = arr[:, 0]
+                self.dy[b, :len(r)] = arr[:, 1]
+                self.valid[b, :len(r)] = True
+        self._cols = np.arange(length)
+
+    def cast(self, grid, origin):
+        """
+        grid: (H, W) 配列（0 以外=障害物）、origin: (x, y)
+        戻り値: (hit_xs, hit_ys, free_xs, free_ys)
+          hit  : 各ビームが最初に当たった障害物セル（重複なし）
+          free : 障害物に当たるまで／盤面外に出るまでに通過した空きセル（重複なし、原点は含まない）
+        """
+        grid = np.asarray(grid)
+        H, W = grid.shape
+        ox, oy = origin
+        xs = self.dx + ox
+        ys = self.dy + oy
+        inside = self.valid & (xs >= 0) & (xs < W) & (ys >= 0) & (ys < H)
+        # 一度盤面外に出たビームはそこで打ち切り
+        inside = np.logical_and.accumulate(inside, axis=1)
+
+        occ = np.zeros(inside.shape, dtype=bool)
+        occ[inside] = grid[ys[inside], xs[inside]] != 0
+        has_hit = occ.any(axis=1)
+        first = np.where(has_hit, occ.argmax(axis=1), occ.shape[1])
+        free = inside & (self._cols[None, :] < first[:, None])
+
+        hb = np.nonzero(has_hit)[0]
+        hit_idx = np.unique(ys[hb, first[hb]] * W + xs[hb, first[hb]])
+        free_idx = np.unique(ys[free] * W + xs[free])
+        return hit_idx % W, hit_idx // W, free_idx % W, free_idx // W
+
+
+# (ビーム本数, 最大距離, 開始角) ごとにオフセット表を使い回す
+_tables = {}
+
+def get_beam_table(n_beams, max_range, start_angle=0.0):
+    key = (int(n_beams), float(max_range), float(start_angle))
+    t = _tables.get(key)
+    if t is None:
+        angles = start_angle + 2*np.pi * np.arange(n_beams) / n_beams
+        t = _tables[key] = BeamTable(angles, max_range)
+    return t
+
+
+def cast_scan(grid, origin, n_beams, max_range):
+    """全周 n_beams 本のビームを一括で飛ばす（表はキャッシュされる）"""
+    return get_beam_table(n_beams, max_range).cast(grid, origin)
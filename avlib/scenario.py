@@ -0,0 +1,190 @@
+# scenario.py
+# 「スタート→ゴールに必ず道がある」ランダムマップのライブラリ（シード付き・ディスクキャッシュ）
+#
+# 従来の「ランダムに置く → A* で確認 → ダメなら作り直し」の代わりに:
+#   1) シードごとの乱数から候補マップを BATCH 枚まとめて引き（障害物は重複なし）、
+#   2) 作りたいシード全部の候補をまとめて 1 回の連結成分ラベリングにかけ、
+#   3) スタートとゴールが同じ成分になった最初の候補をそのシードのマップにする。
+#      全滅したシードだけ、同じ乱数の続きから次の BATCH 枚を引いてやり直す。
+# 道を掘ったりしないので、マップは「障害物数が指定どおりのランダムマップのうち、解けるもの」の分布そのまま。
+#
+# マップは (size, 障害物数, start, goal, seed) で決まり、要求されたシードの分だけ作る（seed は 0 以上の任意の整数）。
+# 作ったマップはキーごとに圧縮 .npz（ビットパック）で SCENARIO_DIR に保存して次回以降はそれを読む。
+# 生成方法を変えたら FORMAT を上げる（ファイル名に入るので古いキャッシュは読まれない）。
+# 中身はシードだけで決まるので、複数プロセスが同時に作って保存しても食い違わない。
+import os
+import random
+import numpy as np
+
+SCENARIO_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+                            "avlib", "scenarios")
+FORMAT = 2      # 生成方法・保存形式の版（キャッシュのファイル名に入る）
+POOL = 1024     # random_scenario が選ぶシードの範囲（0..POOL-1）
+BATCH = 8       # 1 シードあたり 1 回に引く候補マップ数
+MAX_ROUNDS = 512
+
+_libraries = {}
+
+
+def obstacle_count(size, density):
+    """密度（0〜1）→ 障害物の個数（スタート・ゴールの 2 マスは除く）"""
+    return int(round(density * (size * size - 2)))
+
+
+def label_free(free, diagonal=False):
+    """
+    free: (..., H, W) の bool（True=通行可）。最後の 2 軸の 4 近傍連結成分ラベル（障害物は -1）。
+    diagonal=True なら斜めもつながる（8 近傍）。
+    先頭の軸はバッチ（マップ間はつながない）。近傍の最小値伝播 + ポインタジャンプで全マップ同時に解く。
+    """
+    free = np.asarray(free, dtype=bool)
+    big = free.size
+    lab = np.where(free, np.arange(big).reshape(free.shape), big)
+    while True:
+        m = lab.copy()
+        np.minimum(m[..., 1:, :], lab[..., :-1, :], out=m[..., 1:, :])
+        np.minimum(m[..., :-1, :], lab[..., 1:, :], out=m[..., :-1, :])
+        np.minimum(m[..., :, 1:], lab[..., :, :-1], out=m[..., :, 1:])
+        np.minimum(m[..., :, :-1], lab[..., :, 1:], out=m[..., :, :-1])
+        if diagonal:
+            np.minimum(m[..., 1:, 1:], lab[..., :-1, :-1], out=m[..., 1:, 1:])
+            np.minimum(m[..., :-1, :-1], lab[..., 1:, 1:], out=m[..., :-1, :-1])
+            np.minimum(m[..., 1:, :-1], lab[..., :-1, 1:], out=m[..., 1:, :-1])
+            np.minimum(m[..., :-1, 1:], lab[..., 1:, :-1], out=m[..., :-1, 1:])
+        m[~free] = big
+        # ラベルは同じ成分内のセル番号なので、そのセルのラベルを辿って一気に縮める
+        flat = np.append(m.ravel(), big)
+        while True:
+            nxt = flat[flat]
+            if np.array_equal(nxt, flat):
+                break
+            flat = nxt
+        m = flat[:-1].reshape(free.shape)
+        if np.array_equal(m, lab):
+            break
+        lab = m
+    return np.where(free, lab, -1)
+
+
+def _candidates(rng, size, cells, k, n):
+    """cells から k 個ずつ障害物を選んだ候補マップ n 枚 (n, size, size)"""
+    grids = np.zeros((n, size * size), dtype=bool)
+    if k > 0:
+        pick = np.argpartition(rng.random((n, cells.size)), k - 1, axis=1)[:, :k]
+        grids[np.arange(n)[:, None], cells[pick]] = True
+    return grids.reshape(n, size, size)
+
+
+def solvable_grids(size, obstacles, seeds, start=(0, 0), goal=None, batch=BATCH):
+    """seeds の各シードについて、start→goal がつながったマップを作る。(N, size, size) の bool（True=障害物）"""
+    if goal is None:
+        goal = (size - 1, size - 1)
+    seeds = list(seeds)
+    n = size * size
+    cells = np.setdiff1d(np.arange(n), [start[1] * size + start[0], goal[1] * size + goal[0]])
+    k = min(int(obstacles), cells.size)
+    rngs = [np.random.default_rng(int(s)) for s in seeds]
+    out = np.zeros((len(seeds), size, size), dtype=bool)
+    pending = np.arange(len(seeds))
+    for _ in range(MAX_ROUNDS):
+        if pending.size == 0:
+            return out
+        cand = np.stack([_candidates(rngs[i], size, cells, k, batch) for i in pending])
+        lab = label_free(~cand)
+        ok = lab[..., start[1], start[0]] == lab[..., goal[1], goal[0]]   # (残りのシード, batch)
+        hit = ok.any(axis=1)
+        first = ok.argmax(axis=1)
+        out[pending[hit]] = cand[hit, first[hit]]
+        pending = pending[~hit]
+    if pending.size == 0:
+        return out
+    raise ValueError("no solvable map with %d obstacles on %dx%d (seed %d)" % (k, size, size, seeds[pending[0]]))
+
+
+class ScenarioLibrary:
+    """
+    (size, obstacles, start, goal) ごとの、シード → マップ。
+    キャッシュファイルがあれば読み、ないシードは作って保存する（保存できなくてもメモリ上で使える）。
+    pool: random_scenario が選ぶシードの範囲（0..pool-1）
+    """
+    def __init__(self, size, obstacles, start=(0, 0), goal=None, pool=POOL, cache_dir=SCENARIO_DIR):
+        self.size = int(size)
+        self.obstacles = int(obstacles)
+        self.start = tuple(start)
+        self.goal = (self.size - 1, self.size - 1) if goal is None else tuple(goal)
+        self.pool = int(pool)
+        self.path = None
+        if cache_dir:
+            self.path = os.path.join(cache_dir, "v%d_s%d_n%d_%d-%d_%d-%d.npz" % (
+                FORMAT, self.size, self.obstacles, self.start[0], self.start[1], self.goal[0], self.goal[1]))
+        self.grids = self._load()
+
+    def _load(self):
+        if self.path is None or not os.path.exists(self.path):
+            return {}
+        try:
+            with np.load(self.path) as f:
+                seeds, packed = f["seeds"], f["grids"]
+        except (OSError, ValueError, KeyError):
+            return {}
+        grids = np.unpackbits(packed, axis=-1, count=self.size).astype(bool)
+        return dict(zip(seeds.tolist(), grids))
+
+    def _save(self):
+        if self.path is None:
+            return
+        grids = dict(self._load())    # 他のプロセスが保存した分も残す
+        grids.update(self.grids)
+        seeds = sorted(grids)
+        tmp = "%s.%d.tmp" % (self.path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp, "wb") as f:
+                np.savez_compressed(f, seeds=np.array(seeds, dtype=np.int64),
+                                    grids=np.packbits(np.stack([grids[s] for s in seeds]), axis=-1))
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def prepare(self, seeds):
+        """seeds のうちまだないマップをまとめて作って保存する"""
+        missing = sorted({int(s) for s in seeds} - self.grids.keys())
+        if missing:
+            grids = solvable_grids(self.size, self.obstacles, missing, self.start, self.goal)
+            self.grids.update(zip(missing, grids))
+            self._save()
+
+    def array(self, seed):
+        """seed 番のマップ（bool 配列、読み取り専用のつもりで使う）"""
+        seed = int(seed)
+        if seed not in self.grids:
+            self.prepare([seed])
+        return self.grids[seed]
+
+    def grid(self, seed):
+        """seed 番のマップを grid[y][x] = 0/1 のリストで（呼ぶたびに新しいリスト）"""
+        return self.array(seed).astype(int).tolist()
+
+
+def get_library(size, obstacles, start=(0, 0), goal=None, pool=POOL):
+    """プロセス内で同じキーのライブラリを使い回す"""
+    key = (size, obstacles, tuple(start), None if goal is None else tuple(goal), pool)
+    lib = _libraries.get(key)
+    if lib is None:
+        lib = _libraries[key] = ScenarioLibrary(size, obstacles, start, goal, pool)
+    return lib
+
+
+def scenario_grid(size, obstacles, seed, start=(0, 0), goal=None):
+    """(size, obstacles, seed) で決まる解けるマップ（grid[y][x] = 0/1）"""
+    return get_library(size, obstacles, start, goal).grid(seed)
+
+
+def random_scenario(size, obstacles, start=(0, 0), goal=None, rng=random, pool=POOL):
+    """
+    ライブラリの 0..pool-1 番から rng（既定はモジュールの random）でマップを 1 枚選ぶ。random.seed で再現できる。
+    初回にプール全体をまとめて作っておく（1 枚ずつ作って保存し直すより速い）
+    """
+    lib = get_library(size, obstacles, start, goal, pool)
+    lib.prepare(range(lib.pool))
+    return lib.grid(rng.randrange(lib.pool))
@@ -0,0 +1,123 @@
+# smoothing.py
+# グリッド A* の階段状の経路を、連続空間の追従（PID など）向けの少数のなめらかな waypoint にする
+#
+#   1) shortcut: 見通し（line_of_sight）が通る限り先の点まで直線でつなぎ、途中の点を捨てる
+#      見通しは「線分と障害物セル中心の距離が clearance 以上」で判定する
+#      （clearance > 0.5*√2 ならセルの角をかすめることもない）
+#   2) fillet: 残った角を円弧で丸める。半径は 1/max_curvature 以上にしたいが、
+#      隣の角と取り合わないよう前後の辺の半分までしか削らない（辺が短いときは曲率が上限を超える）。
+#      円弧が障害物に近づきすぎるときは削る長さを縮め、それでもダメならその角は丸めない
+#   3) resample: 等間隔に打ち直す（最近傍 index で追従するスクリプト用）
+# 盤面はどれも blocked: (H, W) の bool（True=障害物）、座標は (x, y)＝セル中心。
+import math
+import numpy as np
+from avlib.arcpath import ArcPath
+
+CLEARANCE = 0.75        # 経路と障害物セル中心の最小距離
+MAX_CURVATURE = 1.0     # 円弧の曲率上限（半径 1 セル）
+ARC_SPACING = 1.0       # 円弧を折れ線にするときの点の間隔
+FILLET_TRIES = 4        # 円弧が通れないとき削る長さを半分にしてやり直す回数
+
+
+def line_of_sight(blocked, a, b, clearance=CLEARANCE):
+    """線分 a→b が障害物セル中心から clearance 以上離れているか"""
+    H, W = blocked.shape
+    ax, ay = float(a[0]), float(a[1])
+    bx, by = float(b[0]), float(b[1])
+    r = int(math.ceil(clearance))
+    x0 = max(int(math.floor(min(ax, bx))) - r, 0)
+    x1 = min(int(math.ceil(max(ax, bx))) + r, W - 1)
+    y0 = max(int(math.floor(min(ay, by))) - r, 0)
+    y1 = min(int(math.ceil(max(ay, by))) + r, H - 1)
+    ys, xs = np.nonzero(blocked[y0:y1+1, x0:x1+1])
+    if xs.size == 0:
+        return True
+    dx, dy = bx - ax, by - ay
+    L2 = dx*dx + dy*dy
+    px = xs + (x0 - ax)
+    py = ys + (y0 - ay)
+    t = np.clip((px*dx + py*dy) / L2, 0.0, 1.0) if L2 > 0 else 0.0
+    ex = px - t*dx
+    ey = py - t*dy
+    return bool((ex*ex + ey*ey).min() >= clearance*clearance)
+
+
+def _polyline_clear(blocked, pts, clearance):
+    return all(line_of_sight(blocked, pts[k], pts[k+1], clearance) for k in range(len(pts) - 1))
+
+
+def shortcut(path, blocked, clearance=CLEARANCE):
+    """見通しの通る範囲で点を飛ばした経路（始点・終点は残す）"""
+    path = list(path)
+    if len(path) <= 2:
+        return path
+    out = [path[0]]
+    anchor = 0
+    for j in range(2, len(path)):
+        if not line_of_sight(blocked, path[anchor], path[j], clearance):
+            anchor = j - 1
+            out.append(path[anchor])
+    out.append(path[-1])
+    return out
+
+
+def _arc(v, u1, u2, d, spacing):
+    """角 v（入る向き u1、出る向き u2）を、辺を d ずつ削る円弧で置き換えた点列（両端の接点を含む）"""
+    cross = u1[0]*u2[1] - u1[1]*u2[0]
+    phi = math.atan2(abs(cross), u1[0]*u2[0] + u1[1]*u2[1])   # 曲がる角度
+    t1 = v - u1*d
+    t2 = v + u2*d
+    R = d / math.tan(phi / 2)
+    sgn = 1.0 if cross > 0 else -1.0
+    c = t1 + sgn * R * np.array([-u1[1], u1[0]])
+    a0 = math.atan2(t1[1] - c[1], t1[0] - c[0])
+    m = max(1, int(math.ceil(R * phi / spacing)))
+    ang = a0 + sgn * phi * np.arange(1, m) / m
+    mid = np.stack([c[0] + R*np.cos(ang), c[1] + R*np.sin(ang)], axis=1)
+    return np.vstack([t1, mid, t2])
+
+
+def fillet(points, blocked, max_curvature=MAX_CURVATURE, spacing=ARC_SPACING, clearance=CLEARANCE):
+    """角を円弧で丸めた (M, 2) の点列"""
+    pts = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(pts) <= 2:
+        return pts.copy()
+    seg = np.diff(pts, axis=0)
+    seg_len = np.hypot(seg[:, 0], seg[:, 1])
+    out = [pts[:1]]
+    for k in range(1, len(pts) - 1):
+        v = pts[k]
+        if seg_len[k-1] == 0 or seg_len[k] == 0:
+            out.append(v[None])
+            continue
+        u1 = seg[k-1] / seg_len[k-1]
+        u2 = seg[k] / seg_len[k]
+        phi = math.atan2(abs(u1[0]*u2[1] - u1[1]*u2[0]), u1[0]*u2[0] + u1[1]*u2[1])
+        if phi < 1e-9 or phi > math.pi - 1e-9:
+            out.append(v[None])   # まっすぐ / 折り返しは丸めない
+            continue
+        # 半径 1/max_curvature の円弧に必要な削り幅（ただし前後の辺の半分まで）
+        d = min(math.tan(phi / 2) / max_curvature, 0.5*seg_len[k-1], 0.5*seg_len[k])
+        arc = None
+        for _ in range(FILLET_TRIES):
+            cand = _arc(v, u1, u2, d, spacing)
+            if _polyline_clear(blocked, cand, clearance):
+                arc = cand
+                break
+            d *= 0.5
+        out.append(v[None] if arc is None else arc)
+    out.append(pts[-1:])
+    return np.vstack(out)
+
+
+def smooth_path(path, blocked, max_curvature=MAX_CURVATURE, spacing=ARC_SPACING, clearance=CLEARANCE):
+    """A* の経路 → shortcut → fillet。戻り値は (M, 2) の float 配列"""
+    blocked = np.asarray(blocked, dtype=bool)
+    return fillet(shortcut(path, blocked, clearance), blocked, max_curvature, spacing, clearance)
+
+
+def resample(points, spacing):
+    """折れ線を弧長 spacing ごとに打ち直した (K, 2)（終点を含む）"""
+    route = ArcPath(points)
+    s = np.arange(0.0, route.length, spacing)
+    return np.vstack([route.point_at(s).reshape(-1, 2), route.points[-1:]])
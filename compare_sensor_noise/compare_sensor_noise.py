@@ -2,6 +2,9 @@ import matplotlib.pyplot as plt
 import heapq
 import random
 import copy
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.scenario import random_scenario
 
 # マップ設定
 GRID_SIZE = 10
@@ -43,10 +46,8 @@ def generate_grid():
 
 # 🚀 経路保証付きグリッド生成
 def generate_grid_with_path():
-    while True:
-        grid = generate_grid()
-        if a_star(grid, START, GOAL):  # 経路がある場合のみ採用
-            return grid
+    # 経路がある盤面のプール（avlib.scenario）から選ぶ（作り直しループなし）
+    return random_scenario(GRID_SIZE, 20, START, GOAL)
 
 # センサー誤差の適用
 def apply_sensor_noise(grid, noise_prob=0.05):
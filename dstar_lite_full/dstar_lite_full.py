@@ -1,29 +1,35 @@
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-import heapq
 import random
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.pqueue import IndexedPriorityQueue
+from avlib.experiment import run_headless
 
 # === グリッド設定 ===
 GRID = 10
 START = (9, 0)   # 右下
 GOAL = (0, 9)    # 左上
+NEW_OBSTACLE_INTERVAL = 3  # 何フレームごとに新しい障害物を「検知」するか
+INF = float("inf")
+MAX_STEPS = 200   # バッチ実行時のセーフティブレーキ
+SEED = 0          # バッチ実行時のシードの元
 
 # === D* Lite 用のデータ構造 ===
 class DStarLite:
     def __init__(self, grid, start, goal):
         self.grid = grid
         self.start = start
+        self.last = start     # km 更新用（前回計画時のスタート）
         self.goal = goal
         self.g = {}
         self.rhs = {}
-        self.U = []
+        self.U = IndexedPriorityQueue()   # キー変更・削除が O(log N)
         self.km = 0
         for y in range(GRID):
             for x in range(GRID):
-                self.g[(x, y)] = float("inf")
-                self.rhs[(x, y)] = float("inf")
+                self.g[(x, y)] = INF
+                self.rhs[(x, y)] = INF
         self.rhs[goal] = 0
-        heapq.heappush(self.U, (self.calculateKey(goal), goal))
+        self.U.push(goal, self.calculateKey(goal))
 
     def heuristic(self, a, b):
         return abs(a[0] - b[0]) + abs(a[1] - b[1])
@@ -33,49 +39,78 @@ class DStarLite:
         return (val + self.heuristic(self.start, s) + self.km, val)
 
     def get_neighbors(self, s):
+        # 障害物セルも含めた隣接（通れるかどうかは cost で判定）
         (x, y) = s
         nbrs = []
         for dx, dy in [(1,0),(-1,0),(0,1),(0,-1)]:
             nx, ny = x+dx, y+dy
-            if 0 <= nx < GRID and 0 <= ny < GRID and self.grid[ny][nx] == 0:
+            if 0 <= nx < GRID and 0 <= ny < GRID:
                 nbrs.append((nx, ny))
         return nbrs
 
+    def cost(self, a, b):
+        if self.grid[a[1]][a[0]] == 1 or self.grid[b[1]][b[0]] == 1:
+            return INF
+        return 1
+
     def updateVertex(self, u):
         if u != self.goal:
-            self.rhs[u] = min([self.g[s] + 1 for s in self.get_neighbors(u)] or [float("inf")])
-        if u in [s for k, s in self.U]:
-            self.U = [(k, s) for k, s in self.U if s != u]
-            heapq.heapify(self.U)
+            self.rhs[u] = min([self.cost(u, s) + self.g[s] for s in self.get_neighbors(u)] or [INF])
         if self.g[u] != self.rhs[u]:
-            heapq.heappush(self.U, (self.calculateKey(u), u))
+            self.U.push(u, self.calculateKey(u))   # 追加 or キー更新
+        else:
+            self.U.remove(u)
 
     def computeShortestPath(self):
-        while self.U and (self.U[0][0] < self.calculateKey(self.start) or self.rhs[self.start] != self.g[self.start]):
-            k_old, u = heapq.heappop(self.U)
-            if k_old < self.calculateKey(u):
-                heapq.heappush(self.U, (self.calculateKey(u), u))
+        U = self.U
+        while U and (U.top_key() < self.calculateKey(self.start) or self.rhs[self.start] != self.g[self.start]):
+            k_old, u = U.top()
+            k_new = self.calculateKey(u)
+            if k_old < k_new:
+                U.push(u, k_new)
             elif self.g[u] > self.rhs[u]:
                 self.g[u] = self.rhs[u]
+                U.remove(u)
                 for s in self.get_neighbors(u):
                     self.updateVertex(s)
             else:
-                g_old = self.g[u]
-                self.g[u] = float("inf")
+                self.g[u] = INF
                 for s in self.get_neighbors(u) + [u]:
                     self.updateVertex(s)
 
+    def moveStart(self, new_start):
+        """ロボットが移動したら呼ぶ（km の補正は次の updateCells でまとめて行う）"""
+        self.start = new_start
+
+    def updateCells(self, changed):
+        """
+        セルの通行可否が変わったら呼ぶ。changed: [((x, y), 新しい値0/1), ...]
+        影響を受けるのは変化セルとその隣接だけなので、そこだけ更新する。
+        """
+        changed = [(c, v) for c, v in changed if self.grid[c[1]][c[0]] != v]
+        if not changed:
+            return False
+        self.km += self.heuristic(self.last, self.start)
+        self.last = self.start
+        touched = set()
+        for (x, y), v in changed:
+            self.grid[y][x] = v
+            touched.add((x, y))
+            touched.update(self.get_neighbors((x, y)))
+        for u in touched:
+            self.updateVertex(u)
+        return True
+
     def getPath(self):
         # 現在の g 値に基づいて最短経路を復元
         path = [self.start]
         current = self.start
+        if self.g[current] == INF:
+            return []
         while current != self.goal:
-            neighbors = self.get_neighbors(current)
-            if not neighbors:
-                return path
-            current = min(neighbors, key=lambda s: self.g[s])
-            if self.g[current] == float("inf"):
-                break
+            current = min(self.get_neighbors(current), key=lambda s: self.cost(current, s) + self.g[s])
+            if self.g[current] == INF or len(path) > GRID*GRID:
+                return []
             path.append(current)
         return path
 
@@ -91,66 +126,133 @@ def generate_grid():
             count += 1
     return grid
 
+# === 新しい障害物の「検知」（前方の経路上にランダムに出現させる） ===
+def sense_new_obstacle(path):
+    candidates = [c for c in path[2:] if c not in (START, GOAL)]
+    if not candidates:
+        return None
+    return random.choice(candidates)
+
+# === シミュレーション（描画なし） ===
+class DStarSim:
+    """1 エピソード分の状態。step() が 1 フレーム分（障害物検知 → 再計画 → 1 マス移動）"""
+    def __init__(self, max_steps=MAX_STEPS):
+        self.grid = generate_grid()
+        self.dstar = DStarLite(self.grid, START, GOAL)
+        self.dstar.computeShortestPath()
+        self.path = self.dstar.getPath()
+        self.history = [START]
+        self.frame = 0
+        self.max_steps = max_steps
+        self.obstacles_added = 0
+        self.no_path = False
+
+    @property
+    def done(self):
+        return self.dstar.start == GOAL or self.no_path or self.frame >= self.max_steps
+
+    def step(self):
+        dstar = self.dstar
+        # 一定フレームごとに新しい障害物を検知 → 影響セルだけ D* Lite に通知
+        if dstar.start != GOAL and self.frame > 0 and self.frame % NEW_OBSTACLE_INTERVAL == 0:
+            cell = sense_new_obstacle(self.path)
+            if cell is not None and dstar.updateCells([(cell, 1)]):
+                dstar.computeShortestPath()
+                if dstar.g[dstar.start] == INF:
+                    # ゴールへの道を完全に塞ぐ配置は取り消す（デモを止めないため）
+                    dstar.updateCells([(cell, 0)])
+                else:
+                    self.obstacles_added += 1
+        self.frame += 1
+
+        # 経路を再計算（変化がなければほぼ何もしない）
+        dstar.computeShortestPath()
+        self.path = dstar.getPath()
+        if not self.path:
+            self.no_path = True
+            return
+
+        # 車の移動（1フレーム1マス）
+        if len(self.path) > 1:
+            dstar.moveStart(self.path[1])
+            self.history.append(dstar.start)
+
+    def metrics(self):
+        return {
+            "success": self.dstar.start == GOAL,
+            "steps": self.frame,
+            "path_len": len(self.history) - 1,
+            "obstacles_added": self.obstacles_added,
+        }
+
+def run_episode(max_steps=MAX_STEPS):
+    """描画なしで 1 エピソード回して指標を返す（バッチ実行・回帰テスト用）"""
+    sim = DStarSim(max_steps)
+    while not sim.done:
+        sim.step()
+    return sim.metrics()
+
 # === 描画 ===
-fig, ax = plt.subplots()
-ax.set_aspect("equal")
-ax.set_xlim(-0.5, GRID-0.5)
-ax.set_ylim(-0.5, GRID-0.5)
-ax.invert_yaxis()
-ax.grid(True)
-
-grid = generate_grid()
-dstar = DStarLite(grid, START, GOAL)
-dstar.computeShortestPath()
-path = dstar.getPath()
-
-history = []
-
-def update(frame):
-    global path
-    ax.clear()
+def main():
+    import matplotlib.pyplot as plt
+    import matplotlib.animation as animation
+
+    fig, ax = plt.subplots()
     ax.set_aspect("equal")
     ax.set_xlim(-0.5, GRID-0.5)
     ax.set_ylim(-0.5, GRID-0.5)
     ax.invert_yaxis()
     ax.grid(True)
 
-    # 障害物を描画
-    for y in range(GRID):
-        for x in range(GRID):
-            if grid[y][x] == 1:
-                ax.add_patch(plt.Rectangle((x-0.5,y-0.5),1,1,color="black"))
+    sim = DStarSim(max_steps=INF)
+    grid = sim.grid
 
-    # START・GOALを毎回描画
-    sx, sy = START
-    gx, gy = GOAL
-    ax.text(sx, sy, "START", color="green", ha="center", va="center", fontsize=10, fontweight="bold")
-    ax.text(gx, gy, "GOAL", color="blue", ha="center", va="center", fontsize=10, fontweight="bold")
+    def update(frame):
+        ax.clear()
+        ax.set_aspect("equal")
+        ax.set_xlim(-0.5, GRID-0.5)
+        ax.set_ylim(-0.5, GRID-0.5)
+        ax.invert_yaxis()
+        ax.grid(True)
 
-    # 経路を再計算
-    dstar.computeShortestPath()
-    path = dstar.getPath()
+        # 障害物を描画
+        for y in range(GRID):
+            for x in range(GRID):
+                if grid[y][x] == 1:
+                    ax.add_patch(plt.Rectangle((x-0.5,y-0.5),1,1,color="black"))
 
-    if not path:
-        ax.set_title("No path found")
-        return []
+        # START・GOALを毎回描画
+        sx, sy = START
+        gx, gy = GOAL
+        ax.text(sx, sy, "START", color="green", ha="center", va="center", fontsize=10, fontweight="bold")
+        ax.text(gx, gy, "GOAL", color="blue", ha="center", va="center", fontsize=10, fontweight="bold")
 
-    # 車の移動
-    current_pos = path[min(frame, len(path)-1)]
-    history.append(current_pos)
+        sim.step()
+        if sim.no_path:
+            ax.set_title("No path found")
+            return []
+        current_pos = sim.dstar.start
 
-    # 経路と車を描画
-    xs, ys = zip(*history)
-    ax.plot(xs, ys, "b-")
-    ax.plot(current_pos[0], current_pos[1], "ro")
+        # 経路と車を描画
+        xs, ys = zip(*sim.history)
+        ax.plot(xs, ys, "b-")
+        ax.plot(current_pos[0], current_pos[1], "ro")
 
-    # ゴールチェック
-    if current_pos == GOAL:
-        ax.set_title("Goal Reached ✅")
-    else:
-        ax.set_title("D* Lite Pathfinding")
+        # ゴールチェック
+        if current_pos == GOAL:
+            ax.set_title("Goal Reached ✅")
+        else:
+            ax.set_title("D* Lite Pathfinding")
+
+        return []
 
-    return []
+    ani = animation.FuncAnimation(fig, update, interval=500, blit=False, save_count=200)
+    plt.show()
+    return ani
 
-ani = animation.FuncAnimation(fig, update, interval=500, blit=False, save_count=200)
-plt.show()
+if __name__ == "__main__":
+    # python dstar_lite_full.py --headless 1000  → 描画なしで 1000 エピソード
+    if "--headless" in sys.argv:
+        run_headless(run_episode, sys.argv, seed=SEED)
+    else:
+        main()
@@ -1,8 +1,14 @@
 import random
-import heapq
-import math
+import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.grid_astar import a_star as grid_a_star, a_star_with_cost as grid_a_star_with_cost
+from avlib.kernels import inflation_offsets, stamp_kernel
+from avlib.costmap import LayeredCostMap
+from avlib.dynobs import DynamicObstacles, random_walk_candidates
+from avlib.scenario import random_scenario
 
 # ======== Config ========
 GRID_SIZE = 10
@@ -23,100 +29,32 @@ INFLATION_WEIGHT = 3.0      # 係数（大きいほど避ける）
 # f(d) は 1/d or (R+1-d) など色々試せます。ここでは 1/(d+1) を採用。
 
 random.seed(SEED)
-
-# ======== Utilities ========
-def empty_grid():
-    return [[0 for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
-
-def in_bounds(x, y):
-    return 0 <= x < GRID_SIZE and 0 <= y < GRID_SIZE
-
-def neighbors4(x, y):
-    return [(x+1,y),(x-1,y),(x,y+1),(x,y-1)]
-
-def dist(a, b):
-    if INFLATION_METRIC == "manhattan":
-        return abs(a[0]-b[0]) + abs(a[1]-b[1])
-    else:
-        return math.hypot(a[0]-b[0], a[1]-b[1])
+np.random.seed(SEED)
 
 # ======== Cost map from dynamic obstacles ========
 def build_inflation_cost(dynamic_obs):
     """動的障害物の周辺に連続コストを付与（距離が近いほど高コスト）"""
-    cost = [[0.0 for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
-    if not dynamic_obs:
-        return cost
-    for y in range(GRID_SIZE):
-        for x in range(GRID_SIZE):
-            c = 0.0
-            for (ox, oy) in dynamic_obs:
-                d = dist((x,y), (ox,oy))
-                if d <= INFLATION_RADIUS:
-                    c += INFLATION_WEIGHT * (1.0 / (d + 1.0))
-            cost[y][x] = c
-    return cost
+    # 半径内のオフセットと 1/(d+1) の値は半径・距離の種類ごとにキャッシュされ、
+    # 各障害物のまわりにだけ置く（盤面全体 × 障害物数のループはしない）
+    dx, dy, d = inflation_offsets(INFLATION_RADIUS, INFLATION_METRIC)
+    if len(dynamic_obs) == 0:
+        return np.zeros((GRID_SIZE, GRID_SIZE))
+    xs, ys = np.asarray(dynamic_obs, dtype=np.intp).T
+    return stamp_kernel((GRID_SIZE, GRID_SIZE), xs, ys, 1.0, dx, dy, INFLATION_WEIGHT / (d + 1.0))
 
 # ======== A* (with inflation cost) ========
 def a_star_with_cost(grid, start, goal, inflation_cost):
     """grid[y][x]==1 は静的障害物。inflation_cost は追加コスト（動的障害物の近傍ペナルティ）"""
-    if start == goal:
-        return [start]
-    if grid[goal[1]][goal[0]] == 1 or grid[start[1]][start[0]] == 1:
+    if grid[start[1]][start[0]] == 1:
         return []
-
-    h = lambda a, b: abs(a[0]-b[0]) + abs(a[1]-b[1])  # Manhattan heuristic
-    openq = [(h(start, goal), 0.0, start, None)]
-    came = {}
-    gcost = {start: 0.0}
-    visited = set()
-
-    while openq:
-        _, g, cur, parent = heapq.heappop(openq)
-        if cur in visited:
-            continue
-        visited.add(cur)
-        came[cur] = parent
-
-        if cur == goal:
-            # reconstruct
-            path = []
-            n = cur
-            while n is not None:
-                path.append(n)
-                n = came[n]
-            return list(reversed(path))
-
-        cx, cy = cur
-        for nx, ny in neighbors4(cx, cy):
-            if not in_bounds(nx, ny): 
-                continue
-            if grid[ny][nx] == 1:     # 静的障害物は通行不可
-                continue
-            step_cost = 1.0 + inflation_cost[ny][nx]  # ここで動的近傍ペナルティ
-            ng = g + step_cost
-            if (nx, ny) not in gcost or ng < gcost[(nx,ny)]:
-                gcost[(nx,ny)] = ng
-                f = ng + h((nx,ny), goal)
-                heapq.heappush(openq, (f, ng, (nx,ny), cur))
-    return []
+    # 移動コスト = 1 + 動的近傍ペナルティ（探索本体は avlib の共通 A*）
+    step_cost = 1.0 + np.asarray(inflation_cost, dtype=float)
+    return grid_a_star(grid, start, goal, cost=step_cost)
 
 # ======== Map generation ========
 def generate_static_obstacles():
-    """A*でSTART→GOALに経路があるまで静的障害物を再生成"""
-    while True:
-        grid = empty_grid()
-        placed = 0
-        while placed < STATIC_OBS:
-            x = random.randint(0, GRID_SIZE-1)
-            y = random.randint(0, GRID_SIZE-1)
-            if (x,y) in (START, GOAL): 
-                continue
-            if grid[y][x]==0:
-                grid[y][x] = 1
-                placed += 1
-        # 経路チェック（動的コストなしで確認）
-        if a_star_with_cost(grid, START, GOAL, [[0]*GRID_SIZE for _ in range(GRID_SIZE)]):
-            return grid
+    """START→GOALに経路がある静的障害物マップ（avlib.scenario のプールから選ぶので再生成ループなし）"""
+    return random_scenario(GRID_SIZE, STATIC_OBS, START, GOAL)
 
 def spawn_dynamic_obstacles(grid, n):
     dyn = set()
@@ -131,25 +69,21 @@ def spawn_dynamic_obstacles(grid, n):
             dyn.add((x,y))
     return list(dyn)
 
-def move_dynamic_obstacles(grid, dyn_list, forbidden):
-    """ランダムウォーク（上下左右 or その場）。他障害物・車位置・Start/Goalは侵入禁止。"""
-    occupied = set(dyn_list)
-    new_list = []
-    for (x,y) in dyn_list:
-        candidates = [(x,y),(x+1,y),(x-1,y),(x,y+1),(x,y-1)]
-        random.shuffle(candidates)
-        for nx, ny in candidates:
-            if in_bounds(nx, ny) and grid[ny][nx]==0 and (nx,ny) not in occupied and (nx,ny) not in forbidden:
-                new_list.append((nx,ny))
-                occupied.add((nx,ny))
-                break
-        else:
-            new_list.append((x,y))  # 動けないときはその場
-    return new_list
+def move_dynamic_obstacles(static_blocked, dyn, forbidden):
+    """
+    ランダムウォーク（上下左右 or その場）。他障害物・車位置・Start/Goalは侵入禁止。
+    dyn（DynamicObstacles）を全障害物まとめてその場で更新する。
+    """
+    cdx, cdy = random_walk_candidates(len(dyn))
+    dyn.move(cdx, cdy, static_blocked, forbidden)
 
 # ======== Simulation state ========
 grid = generate_static_obstacles()
-dynamic_obs = spawn_dynamic_obstacles(grid, DYNAMIC_OBS)
+dynamic_obs = DynamicObstacles.from_rows((GRID_SIZE, GRID_SIZE), spawn_dynamic_obstacles(grid, DYNAMIC_OBS))
+
+# 静的障害物（作り直さない）＋動的インフレーション（障害物が動いたときだけ作り直す）
+costmap = LayeredCostMap((GRID_SIZE, GRID_SIZE), base=1.0, static_blocked=grid)
+costmap.add_layer("inflation", build_inflation_cost)
 
 car = START
 path_taken = [car]       # 前進の軌跡（青）
@@ -192,16 +126,17 @@ def draw_dynamic():
     for t in dyn_texts:
         t.remove()
     dyn_texts.clear()
-    for (x,y) in dynamic_obs:
+    for (x,y) in dynamic_obs.cells():
         dyn_texts.append(ax.text(x, y, "■", ha="center", va="center", color="orange", fontsize=12))
 
 def recompute_plan():
     """動的障害物を壁にせず、コストとして“避け気味”にする"""
-    infl = build_inflation_cost(dynamic_obs)
-    return a_star_with_cost(grid, car, GOAL, infl)
+    costmap.update("inflation", dynamic_obs.xy())
+    step_cost, blocked = costmap.compose()
+    return grid_a_star_with_cost(step_cost, car, GOAL, blocked)
 
 def update(_):
-    global car, dynamic_obs, cur_plan, wait_count, step_count, goal_reached
+    global car, cur_plan, wait_count, step_count, goal_reached
 
     if goal_reached:
         return forward_line, back_line, car_dot, plan_line
@@ -213,7 +148,7 @@ def update(_):
 
     # 1) 動的障害物を移動
     forbidden = set(path_taken) | {car, START, GOAL}
-    dynamic_obs[:] = move_dynamic_obstacles(grid, dynamic_obs, forbidden)
+    move_dynamic_obstacles(costmap.static_blocked, dynamic_obs, list(forbidden))
 
     # 2) プラン再計算（コスト付き）
     cur_plan = recompute_plan()
@@ -231,7 +166,7 @@ def update(_):
         # 4) 経路あり → 次の一歩へ。ただし次セルに動的障害物が居座ったら待機
         wait_count = 0
         nxt = cur_plan[1]
-        if nxt in dynamic_obs:
+        if dynamic_obs.occupied(nxt):
             wait_count += 1
         else:
             car = nxt
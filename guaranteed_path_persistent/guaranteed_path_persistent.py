@@ -1,59 +1,33 @@
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
-import heapq
 import random
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.grid_astar import a_star
+from avlib.scenario import random_scenario
+from avlib.connectivity import ConnectivityOracle
 
 # === マップ設定 ===
 GRID_SIZE = 10
 START = (9, 0)   # 右下
 GOAL = (0, 9)    # 左上
-
-# === A* 探索 ===
-def a_star(grid, start, goal):
-    h = lambda a, b: abs(a[0]-b[0]) + abs(a[1]-b[1])
-    open_set = [(h(start, goal), 0, start, [])]
-    visited = set()
-
-    while open_set:
-        _, cost, current, path = heapq.heappop(open_set)
-        if current in visited:
-            continue
-        visited.add(current)
-        path = path + [current]
-        if current == goal:
-            return path
-        for dx, dy in [(1,0), (-1,0), (0,1), (0,-1)]:
-            nx, ny = current[0]+dx, current[1]+dy
-            if 0 <= nx < GRID_SIZE and 0 <= ny < GRID_SIZE and grid[ny][nx] == 0:
-                heapq.heappush(open_set, (cost+1+h((nx,ny), goal), cost+1, (nx,ny), path))
-    return []
+SEARCH_MODE = "jps"   # avlib.grid_astar の探索モード（"astar" / "bidir" / "jps"）
 
 # === グリッド生成（ゴール保証） ===
 def generate_grid():
-    while True:
-        grid = [[0 for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
-        count = 0
-        while count < 20:
-            x, y = random.randint(0, GRID_SIZE-1), random.randint(0, GRID_SIZE-1)
-            if (x, y) not in (START, GOAL) and grid[y][x] == 0:
-                grid[y][x] = 1
-                count += 1
-        if a_star(grid, START, GOAL):
-            return grid
+    # 経路が保証されたマップのプール（avlib.scenario）から選ぶ
+    return random_scenario(GRID_SIZE, 20, START, GOAL)
 
-# === 障害物追加（行き止まりなら1個消す） ===
-def add_dynamic_obstacle(grid, path):
-    while True:
+# === 障害物追加（現在地→ゴールを切らないセルだけに置く） ===
+def add_dynamic_obstacle(grid, path, oracle, tries=100):
+    # 置いてから A* で確かめる代わりに、ConnectivityOracle に「塞ぐと切れるか」を聞く
+    oracle.set_source(path[-1])
+    for _ in range(tries):
         x, y = random.randint(0, GRID_SIZE-1), random.randint(0, GRID_SIZE-1)
         if (x, y) not in path and (x, y) != START and (x, y) != GOAL and grid[y][x] == 0:
-            grid[y][x] = 1
-            break
-    if not a_star(grid, path[-1], GOAL):
-        while True:
-            x, y = random.randint(0, GRID_SIZE-1), random.randint(0, GRID_SIZE-1)
-            if grid[y][x] == 1 and (x, y) not in (START, GOAL):
-                grid[y][x] = 0
-                break
+            if oracle.try_block((x, y)):
+                return (x, y)
+    return None
 
 # === 描画セットアップ ===
 fig, ax = plt.subplots()
@@ -65,7 +39,8 @@ ax.grid(True)
 
 # === 初期状態 ===
 grid = generate_grid()
-path = a_star(grid, START, GOAL)
+oracle = ConnectivityOracle(grid, START, GOAL)
+path = a_star(grid, START, GOAL, mode=SEARCH_MODE)
 history = [START]   # ★ スタート地点を必ず追加
 current_pos = [START]
 
@@ -100,10 +75,10 @@ def update(_):
         return
 
     # 経路探索
-    path = a_star(grid, current_pos[0], GOAL)
+    path = a_star(grid, current_pos[0], GOAL, mode=SEARCH_MODE)
     if not path:
-        add_dynamic_obstacle(grid, history+[current_pos[0]])
-        path = a_star(grid, current_pos[0], GOAL)
+        add_dynamic_obstacle(grid, history+[current_pos[0]], oracle)
+        path = a_star(grid, current_pos[0], GOAL, mode=SEARCH_MODE)
 
     # 移動
     if len(path) > 1:
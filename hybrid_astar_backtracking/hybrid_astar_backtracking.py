@@ -1,13 +1,16 @@
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
-import heapq
 import random
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.grid_astar import a_star
 
 # ==== グリッド設定 ====
 GRID_SIZE = 10
 START = (9, 0)
 GOAL = (0, 9)
 OBSTACLE_COUNT = 20
+SEARCH_MODE = "jps"   # avlib.grid_astar の探索モード（"astar" / "bidir" / "jps"）
 
 # ==== グリッド生成 ====
 def generate_grid():
@@ -20,35 +23,13 @@ def generate_grid():
             count += 1
     return grid
 
-# ==== A*探索 ====
-def a_star(grid, start, goal):
-    h = lambda a, b: abs(a[0] - b[0]) + abs(a[1] - b[1])
-    open_set = [(h(start, goal), 0, start, [start])]
-    visited = set()
-
-    while open_set:
-        _, cost, current, path = heapq.heappop(open_set)
-        if current in visited:
-            continue
-        visited.add(current)
-
-        if current == goal:
-            return path
-
-        for dx, dy in [(1,0), (-1,0), (0,1), (0,-1)]:
-            nx, ny = current[0]+dx, current[1]+dy
-            if 0 <= nx < GRID_SIZE and 0 <= ny < GRID_SIZE and grid[ny][nx] == 0:
-                new_path = path + [(nx, ny)]
-                heapq.heappush(open_set, (cost+1+h((nx, ny), goal), cost+1, (nx, ny), new_path))
-    return []
-
 # ==== 探索クラス（ハイブリッド）====
 class HybridCar:
     def __init__(self, grid, start, goal):
         self.grid = grid
         self.start = start
         self.goal = goal
-        self.path = a_star(grid, start, goal)
+        self.path = a_star(grid, start, goal, mode=SEARCH_MODE)
         self.current = start
         self.history = [start]
         self.backtrack_mode = False
@@ -77,7 +58,7 @@ class HybridCar:
                 self.backtrack_mode = True
             else:
                 # 完全に詰まった場合 → 再探索
-                self.path = a_star(self.grid, self.current, self.goal)
+                self.path = a_star(self.grid, self.current, self.goal, mode=SEARCH_MODE)
         return False
 
 # ==== 実行 ====
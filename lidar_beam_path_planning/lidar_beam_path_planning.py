@@ -1,7 +1,10 @@
 # lidar_beam_path_planning.py
-import random, heapq
-import numpy as np
+import random
 import matplotlib.pyplot as plt
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.grid_astar import a_star
+from avlib.raycast import cast_scan
 
 SIZE = 20
 START = (0, 0)
@@ -17,53 +20,10 @@ def generate_grid():
                 g[y][x] = 1
     return g
 
-# ====== A* ======
-def a_star(grid, start, goal):
-    h = lambda a, b: abs(a[0]-b[0]) + abs(a[1]-b[1])
-    open_set = [(h(start, goal), 0, start, [])]
-    visited = set()
-    while open_set:
-        _, cost, current, path = heapq.heappop(open_set)
-        if current in visited:
-            continue
-        visited.add(current)
-        path = path + [current]
-        if current == goal:
-            return path
-        for dx, dy in [(1,0), (-1,0), (0,1), (0,-1)]:
-            nx, ny = current[0]+dx, current[1]+dy
-            if 0<=nx<SIZE and 0<=ny<SIZE and grid[ny][nx]==0:
-                heapq.heappush(open_set,(cost+1+h((nx,ny),goal), cost+1, (nx,ny), path))
-    return []
-
-# ====== Bresenham (ビーム用) ======
-def bresenham_line(x0, y0, x1, y1):
-    points=[]
-    dx, dy = abs(x1-x0), abs(y1-y0)
-    sx, sy = (1 if x0<x1 else -1), (1 if y0<y1 else -1)
-    err = dx-dy
-    while True:
-        points.append((x0,y0))
-        if x0==x1 and y0==y1: break
-        e2=2*err
-        if e2>-dy: err-=dy; x0+=sx
-        if e2<dx: err+=dx; y0+=sy
-    return points
-
-# ====== LiDAR風ビーム ======
-def lidar_beam_scan(true_grid, pos, angles, radius=10):
-    detected=[]
-    x0,y0=pos
-    for theta in angles:
-        x1=int(round(x0+radius*np.cos(theta)))
-        y1=int(round(y0+radius*np.sin(theta)))
-        line=bresenham_line(x0,y0,x1,y1)
-        for (x,y) in line:
-            if 0<=x<SIZE and 0<=y<SIZE:
-                if true_grid[y][x]==1:
-                    detected.append((x,y))
-                    break
-    return detected
+# ====== LiDAR風ビーム（全ビームを一括レイキャスト） ======
+def lidar_beam_scan(true_grid, pos, n_beams=36, radius=10):
+    hit_xs, hit_ys, _, _ = cast_scan(true_grid, pos, n_beams, radius)
+    return list(zip(hit_xs.tolist(), hit_ys.tolist()))
 
 # ====== メイン処理 ======
 def main():
@@ -71,14 +31,13 @@ def main():
     # 車が知っているマップ（初期は空）
     known_grid=[[0]*SIZE for _ in range(SIZE)]
     pos=START
-    angles=np.linspace(0,2*np.pi,36,endpoint=False)
 
     path=[]
     history=[pos]
 
     for step in range(200):  # 最大ステップ数
         # センサー観測 → known_mapに追加
-        detections=lidar_beam_scan(true_grid,pos,angles,radius=6)
+        detections=lidar_beam_scan(true_grid,pos,n_beams=36,radius=6)
         for (x,y) in detections:
             known_grid[y][x]=1
 
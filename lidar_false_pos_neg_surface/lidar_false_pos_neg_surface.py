@@ -3,12 +3,18 @@ import matplotlib.pyplot as plt
 import heapq
 import numpy as np
 from mpl_toolkits.mplot3d import Axes3D
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.experiment import run_trials, success_rate
 
 # マップ設定
 GRID_SIZE = 10
 START = (9, 0)
 GOAL = (0, 9)
 OBSTACLE_COUNT = 20
+TRIALS = 50
+SEED = 0         # 試行ごとのシードはここから決まる（ワーカー数に依らず再現）
+WORKERS = None   # None=CPUコア数, 1=並列化しない
 
 # ====== A* 探索 ======
 def a_star(grid, start, goal):
@@ -59,38 +65,39 @@ def apply_sensor_noise(grid, false_pos_prob=0.0, false_neg_prob=0.0):
                 noisy_grid[y][x] = 0
     return noisy_grid
 
-# ====== 実験関数 ======
-def run_experiment(false_pos_prob, false_neg_prob, trials=50):
-    success_count = 0
-    for _ in range(trials):
-        grid = generate_grid()
-        noisy_grid = apply_sensor_noise(grid, false_pos_prob, false_neg_prob)
-        path = a_star(noisy_grid, START, GOAL)
-        if path:
-            success_count += 1
-    return success_count / trials
-
-# ====== パラメータ範囲 ======
-false_pos_probs = np.linspace(0, 0.3, 7)  # 0〜0.3
-false_neg_probs = np.linspace(0, 0.3, 7)
-heatmap = np.zeros((len(false_neg_probs), len(false_pos_probs)))
-
-# 実験実行
-for i, fn in enumerate(false_neg_probs):
-    for j, fp in enumerate(false_pos_probs):
-        heatmap[i, j] = run_experiment(fp, fn, trials=50)
-
-# ====== 3Dプロット ======
-FP, FN = np.meshgrid(false_pos_probs, false_neg_probs)
-
-fig = plt.figure(figsize=(9, 7))
-ax = fig.add_subplot(111, projection="3d")
-surf = ax.plot_surface(FP, FN, heatmap, cmap="viridis", edgecolor="k")
-
-ax.set_xlabel("False Positive Probability")
-ax.set_ylabel("False Negative Probability")
-ax.set_zlabel("Success Rate")
-ax.set_title("3D Surface: Success Rate vs FP & FN")
-fig.colorbar(surf, ax=ax, shrink=0.6, label="Success Rate")
-
-plt.show()
+# ====== 実験関数（1試行） ======
+def run_trial(false_pos_prob, false_neg_prob):
+    grid = generate_grid()
+    noisy_grid = apply_sensor_noise(grid, false_pos_prob, false_neg_prob)
+    return bool(a_star(noisy_grid, START, GOAL))
+
+def run_experiment(false_pos_prob, false_neg_prob, trials=TRIALS):
+    return success_rate(run_trials(run_trial, [(false_pos_prob, false_neg_prob)], trials, seed=SEED, workers=WORKERS))[0]
+
+def main():
+    # ====== パラメータ範囲 ======
+    false_pos_probs = np.linspace(0, 0.3, 7)  # 0〜0.3
+    false_neg_probs = np.linspace(0, 0.3, 7)
+
+    # 実験実行（7x7 設定 × TRIALS 試行をプロセス並列で）
+    settings = [(fp, fn) for fn in false_neg_probs for fp in false_pos_probs]
+    results = run_trials(run_trial, settings, TRIALS, seed=SEED, workers=WORKERS)
+    heatmap = np.array(success_rate(results)).reshape(len(false_neg_probs), len(false_pos_probs))
+
+    # ====== 3Dプロット ======
+    FP, FN = np.meshgrid(false_pos_probs, false_neg_probs)
+
+    fig = plt.figure(figsize=(9, 7))
+    ax = fig.add_subplot(111, projection="3d")
+    surf = ax.plot_surface(FP, FN, heatmap, cmap="viridis", edgecolor="k")
+
+    ax.set_xlabel("False Positive Probability")
+    ax.set_ylabel("False Negative Probability")
+    ax.set_zlabel("Success Rate")
+    ax.set_title("3D Surface: Success Rate vs FP & FN")
+    fig.colorbar(surf, ax=ax, shrink=0.6, label="Success Rate")
+
+    plt.show()
+
+if __name__ == "__main__":
+    main()
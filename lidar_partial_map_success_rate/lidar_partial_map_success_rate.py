@@ -1,25 +1,15 @@
 import random
 import matplotlib.pyplot as plt
 import numpy as np
-import heapq
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.footprint import disc_scan
+from avlib.experiment import run_trials, success_rate
+from avlib.grid_astar import get_planner
+from avlib.knownmap import KnownMap
 
-# --- A* Pathfinding ---
-def a_star(grid, start, goal):
-    size = len(grid)
-    h = lambda a, b: abs(a[0]-b[0]) + abs(a[1]-b[1])
-    open_set = [(h(start, goal), 0, start, [])]
-    visited = set()
-    while open_set:
-        _, cost, current, path = heapq.heappop(open_set)
-        if current in visited: continue
-        visited.add(current)
-        path = path + [current]
-        if current == goal: return path
-        for dx,dy in [(1,0),(-1,0),(0,1),(0,-1)]:
-            nx, ny = current[0]+dx, current[1]+dy
-            if 0<=nx<size and 0<=ny<size and grid[ny][nx]==0:
-                heapq.heappush(open_set,(cost+1+h((nx,ny),goal), cost+1,(nx,ny),path))
-    return []
+SEED = 0         # 試行ごとのシードの元（ワーカー数に依らず再現）
+WORKERS = None   # None=CPUコア数, 1=並列化しない
 
 # --- Generate Ground Truth Grid ---
 def generate_grid(size=20, density=0.25, start=(0,0), goal=None):
@@ -34,27 +24,18 @@ def generate_grid(size=20, density=0.25, start=(0,0), goal=None):
 
 # --- LiDAR Scan ---
 def lidar_scan(true_grid, pos, radius=5, noise=False, p_false=0.05, p_miss=0.05):
-    size = len(true_grid)
-    x0,y0 = pos
-    observed = []
-    for y in range(max(0,y0-radius), min(size,y0+radius+1)):
-        for x in range(max(0,x0-radius), min(size,x0+radius+1)):
-            dist = np.sqrt((x-x0)**2+(y-y0)**2)
-            if dist <= radius:
-                val = true_grid[y][x]
-                if noise:
-                    if val==0 and random.random() < p_false: val = 1  # 誤検知
-                    if val==1 and random.random() < p_miss:  val = 0  # 見逃し
-                observed.append((x,y,val))
-    return observed
+    # 円形テンプレートを平行移動（ノイズは1回の乱数でまとめて適用）
+    if not noise:
+        p_false = p_miss = 0.0
+    return disc_scan(true_grid, pos, radius, p_false, p_miss)
 
 # --- Run One Simulation ---
 def simulate(size=20, density=0.25, lidar_radius=5, noise=False):
     start, goal = (0,0), (size-1,size-1)
     true_grid = generate_grid(size, density, start, goal)
-    partial_grid = [[-1]*size for _ in range(size)]
-    partial_grid[start[1]][start[0]] = 0
-    partial_grid[goal[1]][goal[0]] = 0
+    partial_grid = KnownMap((size, size))   # -1=未知 / 0=free / 1=blocked
+    partial_grid.mark_free([start[0], goal[0]], [start[1], goal[1]])
+    planner = get_planner((size, size))
 
     pos = start
     steps = 0
@@ -62,13 +43,11 @@ def simulate(size=20, density=0.25, lidar_radius=5, noise=False):
 
     while pos != goal and steps < max_steps:
         # LiDAR観測で部分マップ更新
-        for x,y,val in lidar_scan(true_grid,pos,lidar_radius,noise):
-            partial_grid[y][x] = val
+        xs, ys, vals = lidar_scan(true_grid,pos,lidar_radius,noise)
+        partial_grid.set(xs, ys, vals)
 
-        # 部分マップから推定グリッドを作成
-        est_grid = [[1 if partial_grid[y][x]==1 else 0 for x in range(size)] for y in range(size)]
-
-        path = a_star(est_grid,pos,goal)
+        # 部分マップの障害物マスク（未知は通れる扱い）をそのままプランナへ
+        path = planner.plan(pos, goal, partial_grid.blocked_list)
         if not path: return False  # 経路断絶
 
         pos = path[1] if len(path)>1 else pos
@@ -82,11 +61,11 @@ def run_experiments(trials=100):
     settings = [("No Noise",False),("With Noise",True)]
     results = {}
 
-    for label,noise in settings:
-        results[label] = []
-        for r in radii:
-            success = sum(simulate(lidar_radius=r, noise=noise) for _ in range(trials))
-            results[label].append(success/trials*100)
+    # simulate(size, density, lidar_radius, noise) の引数タプルを並べてまとめて並列実行
+    sim_settings = [(20, 0.25, r, noise) for _, noise in settings for r in radii]
+    rates = success_rate(run_trials(simulate, sim_settings, trials, seed=SEED, workers=WORKERS))
+    for k, (label, _) in enumerate(settings):
+        results[label] = [rate*100 for rate in rates[k*len(radii):(k+1)*len(radii)]]
 
     # --- Visualization ---
     x = np.arange(len(radii))
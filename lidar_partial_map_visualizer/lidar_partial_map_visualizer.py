@@ -4,6 +4,9 @@ import heapq
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.colors import ListedColormap
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.footprint import disc_scan
 
 # ====== 基本設定 ======
 SIZE = 20
@@ -49,18 +52,10 @@ def generate_true_grid(size=SIZE, density=OBSTACLE_DENSITY, start=START, goal=GO
 
 # ====== LiDAR観測（円形半径） ======
 def lidar_scan(true_grid, pos, radius=LIDAR_RADIUS, noise=NOISE, p_false=P_FALSE, p_miss=P_MISS):
-    size = len(true_grid)
-    x0, y0 = pos
-    observed = []
-    for y in range(max(0, y0-radius), min(size, y0+radius+1)):
-        for x in range(max(0, x0-radius), min(size, x0+radius+1)):
-            if np.hypot(x-x0, y-y0) <= radius:
-                val = true_grid[y][x]
-                if noise:
-                    if val == 0 and random.random() < p_false: val = 1  # 誤検知
-                    if val == 1 and random.random() < p_miss:  val = 0  # 見逃し
-                observed.append((x, y, val))
-    return observed
+    """(xs, ys, val) の配列を返す。val: 0=free, 1=obstacle"""
+    if not noise:
+        p_false = p_miss = 0.0
+    return disc_scan(true_grid, pos, radius, p_false, p_miss)
 
 # ====== 可視化補助 ======
 def draw_map(ax, partial_grid, trail, planned_path):
@@ -71,15 +66,7 @@ def draw_map(ax, partial_grid, trail, planned_path):
     """
     size = len(partial_grid)
     # カテゴリ → 表示値： unknown=0, free=1, obstacle=2
-    vis = np.zeros((size, size), dtype=int)
-    for y in range(size):
-        for x in range(size):
-            if partial_grid[y][x] == -1:
-                vis[y][x] = 0
-            elif partial_grid[y][x] == 0:
-                vis[y][x] = 1
-            else:
-                vis[y][x] = 2
+    vis = np.asarray(partial_grid, dtype=int) + 1
 
     # カラーマップ（unknown=light gray, free=white, obstacle=light red）
     cmap = ListedColormap(["#dddddd", "#ffffff", "#ffcccc"])
@@ -111,9 +98,9 @@ def draw_map(ax, partial_grid, trail, planned_path):
 # ====== メイン：部分マップで逐次再計画 ======
 def main():
     true_grid = generate_true_grid()
-    partial = [[-1]*SIZE for _ in range(SIZE)]  # -1=unknown, 0=free, 1=obstacle
-    partial[START[1]][START[0]] = 0
-    partial[GOAL[1]][GOAL[0]] = 0
+    partial = np.full((SIZE, SIZE), -1, dtype=np.int8)  # -1=unknown, 0=free, 1=obstacle
+    partial[START[1], START[0]] = 0
+    partial[GOAL[1], GOAL[0]] = 0
 
     pos = START
     trail = [pos]
@@ -124,11 +111,11 @@ def main():
 
     while pos != GOAL and steps < MAX_STEPS:
         # センサーで観測 → 部分マップ更新
-        for x, y, val in lidar_scan(true_grid, pos):
-            partial[y][x] = val
+        xs, ys, vals = lidar_scan(true_grid, pos)
+        partial[ys, xs] = vals
 
         # 未知セルは自由扱いで推定グリッドを作成（探索を促す）
-        est_grid = [[1 if partial[y][x] == 1 else 0 for x in range(SIZE)] for y in range(SIZE)]
+        est_grid = (partial == 1).astype(int)
 
         # A* 再計画（現在位置 → ゴール）
         path = a_star(est_grid, pos, GOAL)
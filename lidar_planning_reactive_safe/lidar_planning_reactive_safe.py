@@ -1,9 +1,14 @@
 # File: lidar_planning_reactive_safe.py
 # LiDAR-based partial observation + A* reactive replanning demo (goal-guaranteed)
 
-import random, math, heapq
+import random
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.grid_astar import get_planner
+from avlib.raycast import cast_scan
+from avlib.knownmap import KnownMap
 
 # -------------------------
 # Configurable parameters
@@ -13,6 +18,7 @@ START = (9, 0)   # right-top
 GOAL  = (0, 9)   # left-bottom
 
 NUM_STATIC_OBSTACLES = 20
+SEARCH_MODE = "bidir"  # avlib.grid_astar search mode: "astar" / "bidir" / "jps" (map changes every scan)
 
 # LiDAR-like sensor config
 LIDAR_RANGE = 3
@@ -25,31 +31,6 @@ MAX_STEPS = 300
 PAUSE_INTERVAL = 0.3
 SHOW_GROUND_TRUTH = True
 
-# -------------------------
-# A* utility
-# -------------------------
-def heuristic(a, b):
-    return abs(a[0]-b[0]) + abs(a[1]-b[1])
-
-def a_star(grid, start, goal):
-    OPEN = []
-    heapq.heappush(OPEN, (heuristic(start,goal), 0, start, [start]))
-    visited = set()
-    while OPEN:
-        _, cost, cur, path = heapq.heappop(OPEN)
-        if cur in visited: continue
-        visited.add(cur)
-        if cur == goal:
-            return path
-        x, y = cur
-        for dx, dy in [(1,0),(-1,0),(0,1),(0,-1)]:
-            nx, ny = x+dx, y+dy
-            if 0 <= nx < GRID_SIZE and 0 <= ny < GRID_SIZE:
-                if grid[ny][nx] == 1:  # obstacle
-                    continue
-                heapq.heappush(OPEN, (cost+1+heuristic((nx,ny),goal), cost+1, (nx,ny), path+[(nx,ny)]))
-    return []
-
 # -------------------------
 # Environment
 # -------------------------
@@ -66,18 +47,8 @@ def generate_static_grid(seed=None):
     return grid
 
 def lidar_scan(true_grid, pos, angles=LIDAR_ANGLES, max_range=LIDAR_RANGE):
-    ox, oy = pos
-    observed_occupied = set()
-    for i in range(angles):
-        theta = 2*math.pi*i/angles
-        for r in range(1, max_range+1):
-            bx = int(round(ox + math.cos(theta)*r))
-            by = int(round(oy + math.sin(theta)*r))
-            if not (0 <= bx < GRID_SIZE and 0 <= by < GRID_SIZE): break
-            if true_grid[by][bx] == 1:
-                observed_occupied.add((bx, by))
-                break
-    return observed_occupied
+    """(hit_xs, hit_ys, free_xs, free_ys): 検知した障害物セルとビームが通過した空きセル（int 配列）"""
+    return cast_scan(true_grid, pos, angles, max_range)
 
 # -------------------------
 # Robot Simulation
@@ -85,38 +56,27 @@ def lidar_scan(true_grid, pos, angles=LIDAR_ANGLES, max_range=LIDAR_RANGE):
 class RobotSim:
     def __init__(self, true_grid):
         self.true_grid = true_grid
-        self.obs_grid = [[-1]*GRID_SIZE for _ in range(GRID_SIZE)]
+        # observed map: -1 unknown / 0 free / 1 blocked (int8 KnownMap, sim.obs_grid[y][x] still reads)
+        self.obs_grid = KnownMap((GRID_SIZE, GRID_SIZE))
         self.pos = START
         self.goal = GOAL
         self.history = [self.pos]
         self.path = []
         self.steps = 0
-        self.obs_grid[START[1]][START[0]] = 0
-        self.obs_grid[GOAL[1]][GOAL[0]] = 0
+        self.obs_grid.mark_free([START[0], GOAL[0]], [START[1], GOAL[1]])
 
     def update_observations(self):
-        obs = lidar_scan(self.true_grid, self.pos)
-        for i in range(LIDAR_ANGLES):
-            theta = 2*math.pi*i/LIDAR_ANGLES
-            for r in range(1, LIDAR_RANGE+1):
-                bx = int(round(self.pos[0] + math.cos(theta)*r))
-                by = int(round(self.pos[1] + math.sin(theta)*r))
-                if not (0 <= bx < GRID_SIZE and 0 <= by < GRID_SIZE): break
-                if (bx,by) in obs:
-                    self.obs_grid[by][bx] = 1
-                    break
-                else:
-                    if self.obs_grid[by][bx] != 1:
-                        self.obs_grid[by][bx] = 0
+        hit_xs, hit_ys, free_xs, free_ys = lidar_scan(self.true_grid, self.pos)
+        self.obs_grid.mark_blocked(hit_xs, hit_ys)
+        self.obs_grid.mark_free(free_xs, free_ys, keep_blocked=True)
 
     def plan_path(self):
-        # treat unknown (-1) as free for optimistic planning
-        plan_grid = [[0 if self.obs_grid[r][c] != 1 else 1 for c in range(GRID_SIZE)] for r in range(GRID_SIZE)]
-        p = a_star(plan_grid, self.pos, self.goal)
+        # treat unknown (-1) as free for optimistic planning: the blocked mask is used as-is
+        planner = get_planner(self.obs_grid.shape)
+        p = planner.plan(self.pos, self.goal, self.obs_grid.blocked_list, mode=SEARCH_MODE)
         if not p:
             # fallback: fully optimistic
-            plan_grid = [[0 for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
-            p = a_star(plan_grid, self.pos, self.goal)
+            p = planner.plan(self.pos, self.goal, None, mode=SEARCH_MODE)
         return p
 
     def step(self):
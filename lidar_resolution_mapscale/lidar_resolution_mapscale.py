@@ -2,6 +2,13 @@ import random
 import matplotlib.pyplot as plt
 import numpy as np
 import heapq
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.experiment import run_trials, success_rate
+
+TRIALS = 30
+SEED = 0         # 試行ごとのシードの元（ワーカー数に依らず再現）
+WORKERS = None   # None=CPUコア数, 1=並列化しない
 
 # --- A* Pathfinding ---
 def a_star(grid, start, goal):
@@ -35,55 +42,65 @@ def generate_grid(size=20, density=0.2, start=(0,0), goal=None):
 # --- LiDAR Simulation ---
 def lidar_scan(grid, pos, resolution=16, max_range=10,
                false_pos=0.01, false_neg=0.01):
+    # ビームごとに距離 r=1..max_range の点 round(pos + r*dir) を一括で作る
+    # （ノイズは DDA の通過セルではなくこのサンプル点ごと。同じセルを何度か通ればその回数だけ抽選する）
     GRID_SIZE = len(grid)
+    g = np.asarray(grid)
     x0, y0 = pos
-    noisy_grid = [[0]*GRID_SIZE for _ in range(GRID_SIZE)]
-
-    for i in range(resolution):
-        angle = 2*np.pi * i/resolution
-        dx, dy = np.cos(angle), np.sin(angle)
-        for r in range(1, max_range+1):
-            x, y = int(round(x0+dx*r)), int(round(y0+dy*r))
-            if 0 <= x < GRID_SIZE and 0 <= y < GRID_SIZE:
-                if grid[y][x] == 1:  # 実際に障害物
-                    if random.random() > false_neg:
-                        noisy_grid[y][x] = 1
-                    break
-                else:  # 空きマスに誤検知
-                    if random.random() < false_pos:
-                        noisy_grid[y][x] = 1
+    angle = 2*np.pi * np.arange(resolution)/resolution
+    r = np.arange(1, max_range+1)
+    xs = np.round(x0 + np.cos(angle)[:, None]*r).astype(np.intp)
+    ys = np.round(y0 + np.sin(angle)[:, None]*r).astype(np.intp)
+    inb = (xs >= 0) & (xs < GRID_SIZE) & (ys >= 0) & (ys < GRID_SIZE)
+    occ = np.zeros_like(inb)
+    occ[inb] = g[ys[inb], xs[inb]] == 1
+    # 最初の障害物でビームは止まる（盤面外の点は飛ばして先へ進む）
+    first = np.where(occ.any(axis=1), occ.argmax(axis=1), max_range)
+    sampled = inb & (np.arange(max_range) <= first[:, None])
+    sx, sy, so = xs[sampled], ys[sampled], occ[sampled]
+    # 乱数は従来どおり random から、ビーム順・距離順に 1 サンプル 1 回
+    u = np.array([random.random() for _ in range(sx.size)])
+    # 実際の障害物は見逃し確率で落とし、空きマスには誤検知を乗せる
+    mark = np.where(so, u > false_neg, u < false_pos)
+    noisy_grid = np.zeros((GRID_SIZE, GRID_SIZE), dtype=int)
+    noisy_grid[sy[mark], sx[mark]] = 1
     return noisy_grid
 
 # --- Run Experiment ---
-def run_experiment(size, resolution, trials=30):
-    success = 0
-    for _ in range(trials):
-        grid = generate_grid(size=size, density=0.2)
-        start, goal = (0,0), (size-1, size-1)
-        noisy_grid = lidar_scan(grid, start, resolution=resolution, max_range=size//4)
-        path = a_star(noisy_grid, start, goal)
-        if path and path[-1]==goal:
-            success += 1
-    return success/trials
+def run_trial(size, resolution):
+    grid = generate_grid(size=size, density=0.2)
+    start, goal = (0,0), (size-1, size-1)
+    noisy_grid = lidar_scan(grid, start, resolution=resolution, max_range=size//4)
+    path = a_star(noisy_grid, start, goal)
+    return bool(path and path[-1]==goal)
+
+def run_experiment(size, resolution, trials=TRIALS):
+    return success_rate(run_trials(run_trial, [(size, resolution)], trials, seed=SEED, workers=WORKERS))[0]
 
 # --- Main ---
-map_sizes = [20, 50]
-resolutions = [8, 16, 32]
-results = {size: [run_experiment(size, r) for r in resolutions] for size in map_sizes}
+def main():
+    map_sizes = [20, 50]
+    resolutions = [8, 16, 32]
+    settings = [(size, r) for size in map_sizes for r in resolutions]
+    rates = success_rate(run_trials(run_trial, settings, TRIALS, seed=SEED, workers=WORKERS))
+    results = {size: rates[i*len(resolutions):(i+1)*len(resolutions)] for i, size in enumerate(map_sizes)}
+
+    # Plot
+    fig, ax = plt.subplots()
+    bar_width = 0.35
+    x = np.arange(len(resolutions))
 
-# Plot
-fig, ax = plt.subplots()
-bar_width = 0.35
-x = np.arange(len(resolutions))
+    for i, size in enumerate(map_sizes):
+        ax.bar(x + i*bar_width, results[size], bar_width, label=f"{size}x{size}")
 
-for i, size in enumerate(map_sizes):
-    ax.bar(x + i*bar_width, results[size], bar_width, label=f"{size}x{size}")
+    ax.set_xticks(x + bar_width/2)
+    ax.set_xticklabels([str(r) for r in resolutions])
+    ax.set_ylim(0,1)
+    ax.set_xlabel("LiDAR Resolution (beams)")
+    ax.set_ylabel("Success Rate")
+    ax.set_title("Effect of Map Scale on LiDAR Resolution")
+    ax.legend()
+    plt.show()
 
-ax.set_xticks(x + bar_width/2)
-ax.set_xticklabels([str(r) for r in resolutions])
-ax.set_ylim(0,1)
-ax.set_xlabel("LiDAR Resolution (beams)")
-ax.set_ylabel("Success Rate")
-ax.set_title("Effect of Map Scale on LiDAR Resolution")
-ax.legend()
-plt.show()
+if __name__ == "__main__":
+    main()
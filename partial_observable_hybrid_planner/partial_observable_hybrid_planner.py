@@ -1,7 +1,14 @@
 # partial_observable_hybrid_planner.py
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-import heapq, random, math
+import random
+import numpy as np
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.raycast import cast_scan
+from avlib.distfield import DistanceField
+from avlib.experiment import run_headless
+from avlib.scenario import random_scenario
+from avlib.frontier import FrontierTracker
+from avlib.knownmap import KnownMap, FREE, BLOCKED
 
 # ============ Config ============
 GRID = 10
@@ -12,13 +19,9 @@ MAX_LIDAR_RANGE = 5
 LIDAR_BEAMS = 16         # 360° / 16本
 SHOW_TRUTH_FAINT = False # True にすると真の障害物を薄く表示（デバッグ用）
 RNG_SEED = None          # 例: 42 固定すると再現
-
-# 既知マップ: -1 unknown / 0 free / 1 blocked
-UNKNOWN, FREE, BLOCKED = -1, 0, 1
+MAX_STEPS = 300          # バッチ実行時のセーフティブレーキ
 
 # ============ Utils ============
-def manhattan(a, b): return abs(a[0]-b[0]) + abs(a[1]-b[1])
-
 def in_bounds(x, y): return 0 <= x < GRID and 0 <= y < GRID
 
 def neighbors4(x, y):
@@ -29,144 +32,56 @@ def neighbors4(x, y):
 
 # ============ True grid ============
 def generate_true_grid():
-    g = [[0]*GRID for _ in range(GRID)]
-    cnt = 0
-    while cnt < OBSTACLES:
-        x, y = random.randrange(GRID), random.randrange(GRID)
-        if (x, y) in (START, GOAL): continue
-        if g[y][x] == 0:
-            g[y][x] = 1
-            cnt += 1
-    return g
-
-def astar(grid01, start, goal):
-    # grid01: 1=blocked, 0=free
-    h = lambda p: manhattan(p, goal)
-    pq = [(h(start), 0, start)]
-    came = {start: None}
-    gscore = {start: 0}
-    while pq:
-        _, gc, cur = heapq.heappop(pq)
-        if cur == goal:
-            # reconstruct
-            path = []
-            c = cur
-            while c is not None:
-                path.append(c)
-                c = came[c]
-            return path[::-1]
-        for nx, ny in neighbors4(*cur):
-            if grid01[ny][nx] == 1: 
-                continue
-            ng = gc + 1
-            if ng < gscore.get((nx,ny), 1e9):
-                gscore[(nx,ny)] = ng
-                came[(nx,ny)] = cur
-                heapq.heappush(pq, (ng + h((nx,ny)), ng, (nx,ny)))
-    return None
-
-def ensure_solvable(grid_true, max_tries=30):
-    tries = 0
-    while tries < max_tries:
-        # try true A* on ground truth
-        if astar(grid_true, START, GOAL) is not None:
-            return grid_true
-        # regenerate
-        grid_true = generate_true_grid()
-        tries += 1
-    return grid_true  # 諦めて返す（ほぼ無いはず）
+    # START→GOAL が必ずつながるマップ（avlib.scenario のプールから選ぶので解けるまで作り直す必要なし）
+    return random_scenario(GRID, OBSTACLES, START, GOAL)
 
 # ============ Sensing (LiDAR-like) ============
-def raycast(grid_true, origin, angle_rad, max_range):
-    # 連続空間でビームを進めつつ、最も近い障害セルに当たるまで free を列挙
-    x, y = origin
-    fx, fy = x + 0.5, y + 0.5  # セル中心から発射
-    dx, dy = math.cos(angle_rad), math.sin(angle_rad)
-    free_cells = []
-    for r in [i*0.2 for i in range(1, int(max_range/0.2)+1)]:
-        rx = fx + dx * r
-        ry = fy + dy * r
-        cx, cy = int(rx), int(ry)
-        if not in_bounds(cx, cy):
-            break
-        if grid_true[cy][cx] == 0:
-            if (cx, cy) not in free_cells:
-                free_cells.append((cx, cy))
-        else:
-            # 最初の衝突セル
-            return free_cells, (cx, cy)
-    return free_cells, None
-
 def sense_and_update(known_map, grid_true, pos):
-    # 全方位ビームで更新
-    free_total = set()
-    hit_obstacles = set()
-    for k in range(LIDAR_BEAMS):
-        ang = 2*math.pi * k / LIDAR_BEAMS
-        frees, hit = raycast(grid_true, pos, ang, MAX_LIDAR_RANGE)
-        for c in frees: free_total.add(c)
-        if hit: hit_obstacles.add(hit)
+    # 全方位ビームを一括で飛ばし、最も近い障害セルまでを free、当たったセルを blocked に
+    hit_xs, hit_ys, free_xs, free_ys = cast_scan(grid_true, pos, LIDAR_BEAMS, MAX_LIDAR_RANGE)
     # 自位置はFree
-    free_total.add(pos)
-    # 更新
-    for (x, y) in free_total:
-        known_map[y][x] = FREE
-    for (x, y) in hit_obstacles:
-        known_map[y][x] = BLOCKED
-
-# Frontier: 未知に隣接する free セル（探索すると視界が広がる）
-def collect_frontiers(known_map):
-    fronts = []
-    for y in range(GRID):
-        for x in range(GRID):
-            if known_map[y][x] == FREE:
-                for nx, ny in neighbors4(x, y):
-                    if known_map[ny][nx] == UNKNOWN:
-                        fronts.append((x, y))
-                        break
-    return fronts
-
-# 既知マップを A* 用 0/1 に変換（UNKNOWN は 0 として通行可能扱い）
-def known_to_grid01(known_map):
-    g = [[0]*GRID for _ in range(GRID)]
-    for y in range(GRID):
-        for x in range(GRID):
-            g[y][x] = 1 if known_map[y][x] == BLOCKED else 0
-    return g
+    # 更新（known_map は KnownMap。自位置・free・blocked の順にまとめて書き、マスクも同時に更新）
+    xs = np.concatenate([[pos[0]], free_xs, hit_xs])
+    ys = np.concatenate([[pos[1]], free_ys, hit_ys])
+    vals = np.concatenate([[FREE], np.full(len(free_xs), FREE), np.full(len(hit_xs), BLOCKED)])
+    known_map.set(xs, ys, vals)
+    # 書き換えたセル（フロンティアの差分更新用）
+    return xs, ys
 
 # ============ Agent ============
 class HybridPOAgent:
     def __init__(self, grid_true):
         self.grid_true = grid_true
-        self.known = [[UNKNOWN]*GRID for _ in range(GRID)]
+        self.known = KnownMap((GRID, GRID))   # 未知で初期化
         self.pos = START
         self.history = [START]
         self.forward_path = []   # 現在追従中のA*経路
         self.backtracking = False
         sense_and_update(self.known, self.grid_true, self.pos)
+        self.frontiers = FrontierTracker(self.known.grid)   # 以後は観測したセルの周りだけ更新
+
+    def sense(self):
+        xs, ys = sense_and_update(self.known, self.grid_true, self.pos)
+        self.frontiers.update(xs, ys)
 
-    def plan(self, target):
-        grid01 = known_to_grid01(self.known)
-        return astar(grid01, self.pos, target)
+    def field(self):
+        """現在地からの距離場（1 回の BFS で GOAL にもすべてのフロンティアにも答える）"""
+        return DistanceField(self.known.blocked_list, self.pos, shape=self.known.shape)
 
     def step(self):
         if self.pos == GOAL:
             return True
 
-        # 1) まず GOAL へ計画
-        path = self.plan(GOAL)
-        if path is None:
+        # 1) まず GOAL へ（目標ごとに A* せず、現在地からの距離場を 1 回だけ作って使い回す）
+        field = self.field()
+        path = field.path_to(GOAL)
+        if not path:
             # 2) フロンティア（未知に隣接する free）へ
-            fronts = collect_frontiers(self.known)
-            if fronts:
-                # 近いフロンティア順に試す
-                fronts.sort(key=lambda c: manhattan(self.pos, c))
-                planned = None
-                for f in fronts[:8]:
-                    p = self.plan(f)
-                    if p:
-                        planned = p
-                        break
+            clusters = self.frontiers.clusters()
+            if len(clusters):
+                # フロンティアの塊（代表セル）のうち、到達できて実際の経路長が最も近いもの
+                f, _ = field.nearest(clusters.anchors)
+                planned = field.path_to(f) if f is not None else None
                 if planned is None:
                     # 3) それでもダメ → バックトラック（隣接で未訪問freeがあれば進む）
                     self.backtracking = True
@@ -174,13 +89,13 @@ class HybridPOAgent:
                         if in_bounds(nx, ny) and self.known[ny][nx] == FREE and (nx,ny) not in self.history:
                             self.pos = (nx, ny)
                             self.history.append(self.pos)
-                            sense_and_update(self.known, self.grid_true, self.pos)
+                            self.sense()
                             return False
                     # 全滅なら履歴から1手戻る（経路は灰色で残す）
                     if len(self.history) > 1:
                         self.pos = self.history[-2]
                         self.history.append(self.pos)
-                        sense_and_update(self.known, self.grid_true, self.pos)
+                        self.sense()
                         return False
                     return False
                 else:
@@ -199,15 +114,36 @@ class HybridPOAgent:
             self.pos = self.forward_path.pop(0)
             self.history.append(self.pos)
             # 観測して既知マップ更新
-            sense_and_update(self.known, self.grid_true, self.pos)
+            self.sense()
         return self.pos == GOAL
 
+# ============ Batch (描画なし) ============
+def run_episode(max_steps=MAX_STEPS):
+    """描画なしで 1 エピソード回して指標を返す（バッチ実行・回帰テスト用）"""
+    agent = HybridPOAgent(generate_true_grid())
+    steps, backtrack_steps, done = 0, 0, agent.pos == GOAL
+    while not done and steps < max_steps:
+        done = agent.step()
+        steps += 1
+        backtrack_steps += agent.backtracking
+    known = agent.known.known_count()
+    return {
+        "success": done,
+        "steps": steps,
+        "path_len": len(agent.history) - 1,
+        "backtrack_steps": backtrack_steps,
+        "known_ratio": known / (GRID*GRID),
+    }
+
 # ============ Run & Animate ============
 def main():
+    import matplotlib.pyplot as plt
+    import matplotlib.animation as animation
+
     if RNG_SEED is not None:
         random.seed(RNG_SEED)
 
-    grid_true = ensure_solvable(generate_true_grid())
+    grid_true = generate_true_grid()
 
     agent = HybridPOAgent(grid_true)
 
@@ -293,4 +229,8 @@ def main():
     plt.show()
 
 if __name__ == "__main__":
-    main()
+    # python partial_observable_hybrid_planner.py --headless 1000  → 描画なしで 1000 エピソード
+    if "--headless" in sys.argv:
+        run_headless(run_episode, sys.argv, seed=RNG_SEED or 0)
+    else:
+        main()
@@ -0,0 +1,198 @@
+# pid_gain_tuning.py
+# pid_path_following_demo の PID / Vehicle / PathFollower を描画なしでまとめて回すゲイン調整ツール
+#
+# - ゲインの組 (Kp, Ki, Kd, MAX_STEER_RATE, LOOKAHEAD_DIST) をグリッドで総当たり
+# - 1 組 = 配列の 1 レーン。1 本の参照経路について全レーンを同じベクトル演算で 1 ステップずつ進める
+#   （式は demo の update() と同じ: 弧長 lookahead の目標点 → ヘディング誤差 → PID → 角速度飽和 → 前進）
+# - 参照経路 × レーンのチャンクを avlib.experiment で CPU コアに分散
+# - 指標: 横ずれ（経路折れ線までの距離）の平均・最大、整定時間（横ずれが SETTLE_TOL 以下に収まった時刻）、
+#   ゴール到達時間
+import itertools
+import time
+import numpy as np
+import os, sys
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, ".."))
+sys.path.append(os.path.join(HERE, "..", "pid_path_following_demo"))
+from avlib.experiment import run_trials
+from avlib.arcpath import ArcPath
+import pid_path_following_demo as demo
+
+# ====== 探索するゲイン ======
+KP_GRID = [1.0, 1.6, 2.2, 3.0, 4.0]
+KI_GRID = [0.0, 0.05, 0.2]
+KD_GRID = [0.0, 0.25, 0.5]
+STEER_RATE_GRID = [1.5, 2.5, 4.0]
+LOOKAHEAD_GRID = [0.4, 0.6, 0.9]
+
+MAX_TIME = 30.0      # [s] これまでにゴールしなければ失敗
+SETTLE_TOL = 0.15    # [m] 横ずれがこの値以下に収まった時刻を整定時間とする
+CHUNK = 256          # 1 タスクあたりのレーン数
+WORKERS = None       # None=CPUコア数, 1=並列化しない
+TOP = 10             # 表示する上位の組数
+
+# ====== 参照経路ライブラリ ======
+def lane_change_path():
+    xs = np.linspace(0.5, 9.5, 30)
+    ys = 3.0 + 3.0 / (1.0 + np.exp(-2.0 * (xs - 5.0)))
+    return np.vstack([xs, ys]).T
+
+def u_turn_path():
+    t = np.linspace(-np.pi/2, np.pi/2, 25)
+    arc = np.vstack([6.0 + 2.5*np.cos(t), 5.0 + 2.5*np.sin(t)]).T
+    return np.vstack([[(1.0, 2.5), (3.5, 2.5)], arc, [(3.5, 7.5), (1.0, 7.5)]])
+
+def zigzag_path():
+    xs = np.arange(0.5, 9.6, 1.5)
+    ys = np.where(np.arange(xs.size) % 2 == 0, 3.0, 7.0)
+    return np.vstack([xs, ys]).T
+
+PATHS = {
+    "s_curve": demo.build_demo_path,
+    "lane_change": lane_change_path,
+    "u_turn": u_turn_path,
+    "zigzag": zigzag_path,
+}
+
+# ====== 指標計算 ======
+def polyline_distance(px, py, wps):
+    """各点 (px[i], py[i]) から折れ線 wps までの最短距離 (N,)"""
+    a = wps[:-1]
+    ab = wps[1:] - a
+    L2 = np.maximum((ab**2).sum(axis=1), 1e-12)
+    dx = px[:, None] - a[:, 0]
+    dy = py[:, None] - a[:, 1]
+    t = np.clip((dx*ab[:, 0] + dy*ab[:, 1]) / L2, 0.0, 1.0)
+    ex = dx - t*ab[:, 0]
+    ey = dy - t*ab[:, 1]
+    return np.sqrt((ex*ex + ey*ey).min(axis=1))
+
+# ====== バッチシミュレーション ======
+def lookahead_batch(route, x, y, s_hint, dist, window):
+    """
+    ArcPath.lookahead(pos, dist, s_hint, window) を全レーン分まとめて（同じ式・同じ丸め）。
+    戻り値: 目標点 x, y と最寄り点の弧長（どれも (N,)）
+    """
+    n = len(route.seg_len)
+    s_max = s_hint + window
+    lo = np.clip(route.s.searchsorted(s_hint, side="right") - 1, 0, n - 1)
+    hi = np.clip(np.maximum(route.s.searchsorted(s_max, side="left"), lo + 1), None, n)
+    k = np.arange(n)
+    inside = (k >= lo[:, None]) & (k < hi[:, None])       # 各レーンが見る区間 [lo, hi)
+    a = route.points[:-1]
+    ab = route.points[1:] - a
+    L2 = route.seg_len ** 2
+    dx = x[:, None] - a[:, 0]
+    dy = y[:, None] - a[:, 1]
+    t = np.clip((dx*ab[:, 0] + dy*ab[:, 1]) / np.where(L2 > 0, L2, 1.0), 0.0, 1.0)
+    ex = dx - t*ab[:, 0]
+    ey = dy - t*ab[:, 1]
+    d2 = np.where(inside, ex*ex + ey*ey, np.inf)
+    j = d2.argmin(axis=1)
+    rows = np.arange(len(x))
+    s = route.s[j] + t[rows, j] * route.seg_len[j]
+    s = np.minimum(np.maximum(s, s_hint), s_max)
+    target = route.point_at(s + dist)
+    return target[:, 0], target[:, 1], s
+
+def simulate_batch(wps, kp, ki, kd, max_rate, lookahead, dt=demo.DT, v=demo.V, max_time=MAX_TIME):
+    """
+    wps: (M, 2) 参照経路。ゲイン類は (N,) 配列（1 要素 = 1 レーン）。
+    戻り値: dict（mean_cte / max_cte / settle_time / goal_time は (N,)、ゴールしないレーンの goal_time は inf）
+    """
+    wps = np.asarray(wps, dtype=float)
+    route = ArcPath(wps)
+    n = len(kp)
+    x = np.full(n, wps[0, 0])
+    y = np.full(n, wps[0, 1])
+    yaw = np.full(n, np.arctan2(wps[1, 1] - wps[0, 1], wps[1, 0] - wps[0, 0]))
+    s_near = np.zeros(n)
+    integral = np.zeros(n)
+    prev_err = np.zeros(n)
+    int_lim = 2.0   # demo.PID の既定 integral_limit
+    active = np.ones(n, dtype=bool)
+    goal_time = np.full(n, np.inf)
+    cte_sum = np.zeros(n)
+    cte_max = np.zeros(n)
+    last_bad = np.zeros(n)     # 横ずれが SETTLE_TOL を超えた最後の時刻
+    steps = np.zeros(n, dtype=np.intp)
+    for k in range(int(round(max_time / dt))):
+        if not active.any():
+            break
+        # 最寄り点から弧長 lookahead 先（PathFollower.current_target と同じ）
+        tx, ty, s_near = lookahead_batch(route, x, y, s_near, lookahead, demo.SEARCH_WINDOW)
+        err = (np.arctan2(ty - y, tx - x) - yaw + np.pi) % (2*np.pi) - np.pi
+        # PID（anti-windup 付き）
+        integral = np.clip(integral + err*dt, -int_lim, int_lim)
+        omega = kp*err + ki*integral + kd*(err - prev_err)/dt
+        prev_err = err
+        omega = np.clip(omega, -max_rate, max_rate)
+        # ゴールしたレーンはその場で止める（demo の done フラグと同じ）
+        x = np.where(active, x + v*np.cos(yaw)*dt, x)
+        y = np.where(active, y + v*np.sin(yaw)*dt, y)
+        yaw = np.where(active, (yaw + omega*dt + np.pi) % (2*np.pi) - np.pi, yaw)
+        t = (k + 1) * dt
+        cte = polyline_distance(x, y, wps)
+        cte_sum += np.where(active, cte, 0.0)
+        cte_max = np.where(active, np.maximum(cte_max, cte), cte_max)
+        last_bad = np.where(active & (cte > SETTLE_TOL), t, last_bad)
+        steps += active
+        reached = active & (np.hypot(x - wps[-1, 0], y - wps[-1, 1]) < demo.GOAL_TOL)
+        goal_time[reached] = t
+        active &= ~reached
+    return {
+        "mean_cte": cte_sum / np.maximum(steps, 1),
+        "max_cte": cte_max,
+        "settle_time": last_bad,
+        "goal_time": goal_time,
+    }
+
+def _run_chunk(path_name, gains):
+    """run_trials 用（トップレベル関数）。gains: (5, n) の配列"""
+    return simulate_batch(PATHS[path_name](), *gains)
+
+# ====== 全体 ======
+def gain_grid():
+    """探索するゲインの組 (5, N)。行は Kp, Ki, Kd, MAX_STEER_RATE, LOOKAHEAD_DIST"""
+    combos = itertools.product(KP_GRID, KI_GRID, KD_GRID, STEER_RATE_GRID, LOOKAHEAD_GRID)
+    return np.array(list(combos), dtype=float).T
+
+def tune(workers=WORKERS):
+    gains = gain_grid()
+    n = gains.shape[1]
+    chunks = [gains[:, i:i+CHUNK] for i in range(0, n, CHUNK)]
+    settings = [(name, c) for name in PATHS for c in chunks]
+    results = run_trials(_run_chunk, settings, 1, workers=workers)
+    # 経路ごとに (N,) へつなぎ直す
+    per_path = {}
+    for p, name in enumerate(PATHS):
+        rs = [results[p*len(chunks) + c][0] for c in range(len(chunks))]
+        per_path[name] = {k: np.concatenate([r[k] for r in rs]) for k in rs[0]}
+    return gains, per_path
+
+def score(per_path):
+    """全経路の合計ゴール時間（1 本でも失敗すれば inf）→ 平均横ずれ の順で良い組"""
+    total = sum(m["goal_time"] for m in per_path.values())
+    cte = np.mean([m["mean_cte"] for m in per_path.values()], axis=0)
+    return np.lexsort((cte, total)), total, cte
+
+def main():
+    t0 = time.perf_counter()
+    gains, per_path = tune()
+    elapsed = time.perf_counter() - t0
+    order, total, cte = score(per_path)
+    n = gains.shape[1]
+    print(f"{n} gain sets x {len(PATHS)} paths in {elapsed:.2f} s")
+    print(f"baseline (demo): Kp={demo.Kp} Ki={demo.Ki} Kd={demo.Kd} "
+          f"MAX_STEER_RATE={demo.MAX_STEER_RATE} LOOKAHEAD_DIST={demo.LOOKAHEAD_DIST}")
+    print(f"{'Kp':>5} {'Ki':>5} {'Kd':>5} {'rate':>5} {'look':>5} | {'goal_sum':>8} {'cte':>6} {'maxcte':>6} {'settle':>6}")
+    for i in order[:TOP]:
+        kp, ki, kd, rate, look = gains[:, i]
+        max_cte = max(m["max_cte"][i] for m in per_path.values())
+        settle = max(m["settle_time"][i] for m in per_path.values())
+        print(f"{kp:>5.2f} {ki:>5.2f} {kd:>5.2f} {rate:>5.1f} {look:>5.2f} | "
+              f"{total[i]:>8.2f} {cte[i]:>6.3f} {max_cte:>6.3f} {settle:>6.2f}")
+    print(f"reached goal on every path: {np.isfinite(total).mean()*100:.1f}% of gain sets")
+
+if __name__ == "__main__":
+    main()
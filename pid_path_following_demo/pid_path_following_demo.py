@@ -2,13 +2,17 @@ import math
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.arcpath import ArcPath
 
 # =========================
 # Config (feel free to tune)
 # =========================
 DT = 0.05                 # [s] sim time step
 V  = 1.2                  # [m/s] constant forward speed
-LOOKAHEAD_DIST = 0.6      # [m] waypoint切替のしきい値
+LOOKAHEAD_DIST = 0.6      # [m] 経路上の最寄り点から弧長でどれだけ先を狙うか
+SEARCH_WINDOW = 1.0       # [m] 最寄り点を前回の最寄り点から弧長でどこまで先まで探すか
 GOAL_TOL = 0.5            # [m] ゴール到達判定
 MAX_STEER_RATE = 2.5      # [rad/s] 角速度飽和（実機っぽさ）
 Kp, Ki, Kd = 2.2, 0.05, 0.25  # PID ゲイン（見やすい初期値）
@@ -78,20 +82,13 @@ def build_demo_path():
 class PathFollower:
     def __init__(self, waypoints):
         self.wps = waypoints
-        self.i = 0  # current target index
+        self.route = ArcPath(waypoints)  # 累積弧長を前計算
+        self.s = 0.0  # 前回の最寄り点の弧長（戻らない）
 
     def current_target(self, pos):
-        """pos=(x,y) に最も近い or 次の waypoint を返す簡易ロジック"""
-        x, y = pos
-        # 近づいたら次へ
-        while self.i < len(self.wps)-1:
-            dx = self.wps[self.i][0] - x
-            dy = self.wps[self.i][1] - y
-            if math.hypot(dx, dy) < LOOKAHEAD_DIST:
-                self.i += 1
-            else:
-                break
-        return self.wps[self.i]
+        """pos=(x,y) の最寄り点（前回から SEARCH_WINDOW 先まで）から弧長 LOOKAHEAD_DIST 先の点"""
+        target, self.s = self.route.lookahead(pos, LOOKAHEAD_DIST, self.s, SEARCH_WINDOW)
+        return target
 
     def reached_goal(self, pos):
         gx, gy = self.wps[-1]
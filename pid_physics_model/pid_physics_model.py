@@ -4,7 +4,12 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
-import heapq, random
+import random
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.grid_astar import a_star
+from avlib.smoothing import smooth_path
+from avlib.experiment import run_headless
 
 # --------------------
 # A* Pathfinding
@@ -14,25 +19,25 @@ START = (0, 0)
 GOAL = (19, 19)
 NUM_OBS = 40  # 障害物数（調整済み）
 
-def heuristic(a, b):
-    return abs(a[0]-b[0]) + abs(a[1]-b[1])
-
-def a_star(grid, start, goal):
-    OPEN = [(heuristic(start,goal), 0, start, [start])]
-    visited = set()
-    while OPEN:
-        _, cost, cur, path = heapq.heappop(OPEN)
-        if cur in visited:
-            continue
-        visited.add(cur)
-        if cur == goal:
-            return path
-        x, y = cur
-        for dx,dy in [(1,0),(-1,0),(0,1),(0,-1)]:
-            nx, ny = x+dx, y+dy
-            if 0 <= nx < GRID and 0 <= ny < GRID and grid[ny][nx]==0:
-                heapq.heappush(OPEN, (cost+1+heuristic((nx,ny),goal), cost+1, (nx,ny), path+[(nx,ny)]))
-    return []
+# 制御・物理パラメータ（Car / CarFleet 共通）
+STEER_GAINS = (2.0, 0.0, 0.5)   # (kp, ki, kd)
+SPEED_GAINS = (1.0, 0.0, 0.2)
+CRUISE_SPEED = 2.0
+MAX_SPEED = 3.0
+DT = 0.1
+REACH_DIST = 0.5   # この距離まで近づいたら次のウェイポイントへ
+
+# 一斉シミュレーション（python pid_physics_model.py --fleet N [--steps S]）
+FLEET_STEPS = 500
+FLEET_KP_RANGE = (0.5, 4.0)   # 操舵 kp を台数分この範囲に並べて比較する
+
+# A* の階段状の経路を見通しで間引き、角を円弧で丸めてから追従する（avlib.smoothing）
+SMOOTH_PATH = True
+MAX_CURVATURE = 1.0   # 丸めた角の曲率上限 [1/セル]
+
+# バッチ実行（python pid_physics_model.py --headless [N]）: 生の経路と平滑化した経路を同じマップで比較
+EPISODE_STEPS = 1000
+SEED = 0
 
 def generate_grid():
     grid = [[0]*GRID for _ in range(GRID)]
@@ -69,9 +74,9 @@ class Car:
         self.heading = heading
         self.speed = 0.0
         self.acc = 0.0
-        self.steer_pid = PID(2.0, 0.0, 0.5)
-        self.speed_pid = PID(1.0, 0.0, 0.2)
-    def update(self, target, dt=0.1):
+        self.steer_pid = PID(*STEER_GAINS)
+        self.speed_pid = PID(*SPEED_GAINS)
+    def update(self, target, dt=DT):
         # 目標方向
         vec = np.array(target) - self.pos
         dist = np.linalg.norm(vec)
@@ -80,15 +85,154 @@ class Car:
         steer = self.steer_pid.control(err_heading, dt)
         self.heading += steer*dt
         # 速度制御（ゴール付近では減速）
-        desired_speed = min(2.0, dist)
+        desired_speed = min(CRUISE_SPEED, dist)
         err_speed = desired_speed - self.speed
         acc_cmd = self.speed_pid.control(err_speed, dt)
         self.acc = acc_cmd
         self.speed += self.acc*dt
-        self.speed = max(0.0, min(self.speed, 3.0))  # clamp
+        self.speed = max(0.0, min(self.speed, MAX_SPEED))  # clamp
         # 移動
         self.pos += np.array([np.cos(self.heading), np.sin(self.heading)]) * self.speed * dt
 
+# --------------------
+# Fleet (N cars at once)
+# --------------------
+class CarFleet:
+    """
+    Car を N 台まとめて持ち、1 回のベクトル演算で全台を 1 ステップ進める。
+    状態（位置・向き・速度・PID の積分 / 前回誤差）は台数分の連続配列。
+    ゲインはスカラーでも (N,) 配列でもよい（台ごとに変えてチューニングに使う）。
+    """
+    def __init__(self, n, pos=(0,0), heading=0.0, steer_gains=STEER_GAINS, speed_gains=SPEED_GAINS):
+        self.n = n
+        self.pos = np.empty((n, 2))
+        self.pos[:] = pos
+        self.heading = np.full(n, heading, dtype=float)
+        self.speed = np.zeros(n)
+        self.acc = np.zeros(n)
+        self.steer = np.zeros(n)   # 直前の操舵（角速度）指令
+        self.steer_k = [np.broadcast_to(np.asarray(k, dtype=float), (n,)) for k in steer_gains]
+        self.speed_k = [np.broadcast_to(np.asarray(k, dtype=float), (n,)) for k in speed_gains]
+        self.steer_int = np.zeros(n)
+        self.steer_prev = np.zeros(n)
+        self.speed_int = np.zeros(n)
+        self.speed_prev = np.zeros(n)
+        self.wp_idx = np.zeros(n, dtype=np.intp)   # follow() で追っているウェイポイント番号
+
+    def update(self, targets, dt=DT):
+        """targets: (N, 2) か (2,)。Car.update と同じ式を全台に"""
+        vec = np.subtract(targets, self.pos)
+        dist = np.hypot(vec[:, 0], vec[:, 1])
+        err = np.arctan2(vec[:, 1], vec[:, 0]) - self.heading
+        err += np.pi
+        np.mod(err, 2*np.pi, out=err)
+        err -= np.pi
+        # 操舵 PID
+        self.steer_int += err*dt
+        kp, ki, kd = self.steer_k
+        self.steer = kp*err + ki*self.steer_int + kd*(err - self.steer_prev)/dt
+        self.steer_prev = err
+        self.heading += self.steer*dt
+        # 速度 PID（ゴール付近では減速）
+        err = np.minimum(dist, CRUISE_SPEED)
+        err -= self.speed
+        self.speed_int += err*dt
+        kp, ki, kd = self.speed_k
+        self.acc = kp*err + ki*self.speed_int + kd*(err - self.speed_prev)/dt
+        self.speed_prev = err
+        self.speed += self.acc*dt
+        np.clip(self.speed, 0.0, MAX_SPEED, out=self.speed)
+        # 移動
+        step = self.speed*dt
+        self.pos[:, 0] += np.cos(self.heading)*step
+        self.pos[:, 1] += np.sin(self.heading)*step
+
+    def follow(self, waypoints, dt=DT, reach=REACH_DIST):
+        """
+        waypoints: (M, 2)。各台が自分の wp_idx 番目へ向かって 1 ステップ進み、
+        reach 以内に入ったら次へ（最後の点では止まらず追い続ける）。最後の点からの距離 (N,) を返す
+        """
+        last = len(waypoints) - 1
+        target = waypoints[self.wp_idx]
+        at_last = self.wp_idx == last
+        self.update(target, dt)
+        d = np.hypot(self.pos[:, 0] - target[:, 0], self.pos[:, 1] - target[:, 1])
+        self.wp_idx += (d < reach) & ~at_last
+        return np.where(at_last, d, np.inf)
+
+
+def simulate_fleet(waypoints, steer_gains=STEER_GAINS, speed_gains=SPEED_GAINS, n=None,
+                   steps=FLEET_STEPS, dt=DT, reach=REACH_DIST):
+    """
+    描画なしで N 台に同じ経路を走らせる。n を省略するとゲイン配列の長さ。
+    戻り値: dict（どれも (N,)）
+      arrival: ゴールに reach 以内まで近づいた最初のステップ（未到達は -1）
+      final_dist: 最終的なゴールまでの距離
+      steer_effort / acc_effort: 到達までの |操舵指令|・|加速度指令| の時間積分（制御の手間）
+    """
+    waypoints = np.asarray(waypoints, dtype=float)
+    if n is None:
+        n = max(np.size(k) for k in tuple(steer_gains) + tuple(speed_gains))
+    fleet = CarFleet(n, waypoints[0], 0.0, steer_gains, speed_gains)
+    arrival = np.full(n, -1)
+    steer_effort = np.zeros(n)
+    acc_effort = np.zeros(n)
+    for t in range(steps):
+        d = fleet.follow(waypoints, dt, reach)
+        running = arrival < 0
+        steer_effort[running] += np.abs(fleet.steer[running])*dt
+        acc_effort[running] += np.abs(fleet.acc[running])*dt
+        arrival[running & (d < reach)] = t + 1
+        if not running.any():
+            break
+    goal = waypoints[-1]
+    return {
+        "arrival": arrival,
+        "final_dist": np.hypot(fleet.pos[:, 0] - goal[0], fleet.pos[:, 1] - goal[1]),
+        "steer_effort": steer_effort,
+        "acc_effort": acc_effort,
+    }
+
+
+def run_fleet(n, steps=FLEET_STEPS):
+    """操舵 kp を FLEET_KP_RANGE に並べた n 台を同じ A* 経路で走らせ、処理時間と到達時間を表示"""
+    import time
+    grid = generate_grid()
+    path = a_star(grid, START, GOAL)
+    if not path:
+        print("No path found!")
+        return
+    kp = np.linspace(*FLEET_KP_RANGE, n)
+    t0 = time.perf_counter()
+    arrival = simulate_fleet(path, (kp, STEER_GAINS[1], STEER_GAINS[2]), steps=steps)["arrival"]
+    elapsed = time.perf_counter() - t0
+    ok = arrival >= 0
+    print(f"cars: {n}, steps: {steps}, {elapsed/steps*1e3:.3f} ms/tick ({elapsed:.2f} s)")
+    print(f"reached goal: {ok.mean()*100:.1f}%")
+    if ok.any():
+        best = np.flatnonzero(ok)[np.argmin(arrival[ok])]
+        print(f"fastest: kp={kp[best]:.3f}, {arrival[best]*DT:.1f} s")
+
+def run_episode(steps=EPISODE_STEPS):
+    """描画なしで 1 マップ分: 生の A* 経路と平滑化した経路を 1 台ずつ走らせた指標"""
+    while True:
+        grid = generate_grid()
+        path = a_star(grid, START, GOAL)
+        if path:
+            break
+    smooth = smooth_path(path, np.array(grid) == 1, MAX_CURVATURE)
+    out = {}
+    for name, wps in (("raw", path), ("smooth", smooth)):
+        r = simulate_fleet(wps, n=1, steps=steps)
+        reached = bool(r["arrival"][0] >= 0)
+        out[f"{name}_success"] = reached
+        out[f"{name}_waypoints"] = len(wps)
+        # 未到達は打ち切り時刻で数える
+        out[f"{name}_time"] = (r["arrival"][0] if reached else steps) * DT
+        out[f"{name}_steer"] = float(r["steer_effort"][0])   # 制御の手間（操舵・加速度）
+        out[f"{name}_accel"] = float(r["acc_effort"][0])
+    return out
+
 # --------------------
 # Simulation
 # --------------------
@@ -98,7 +242,10 @@ def run():
     if not path:
         print("No path found!")
         return
-    waypoints = [np.array(p, dtype=float) for p in path]
+    if SMOOTH_PATH:
+        waypoints = list(smooth_path(path, np.array(grid) == 1, MAX_CURVATURE))
+    else:
+        waypoints = [np.array(p, dtype=float) for p in path]
 
     car = Car(pos=START, heading=0.0)
     history = [car.pos.copy()]
@@ -117,9 +264,11 @@ def run():
                 ax.text(x, y, "✕", color="red", ha="center", va="center")
 
     # Draw path
-    xs = [p[0] for p in waypoints]
-    ys = [p[1] for p in waypoints]
+    xs = [p[0] for p in path]
+    ys = [p[1] for p in path]
     ax.plot(xs, ys, "c--", label="A* path")
+    if SMOOTH_PATH:
+        ax.plot([p[0] for p in waypoints], [p[1] for p in waypoints], "m.-", alpha=0.7, label="smoothed")
 
     trail, = ax.plot([], [], "b-", linewidth=2)
     point, = ax.plot([], [], "ro", markersize=6)
@@ -147,4 +296,12 @@ def run():
     plt.show()
 
 if __name__ == "__main__":
-    run()
+    if "--fleet" in sys.argv:
+        i = sys.argv.index("--fleet")
+        n = int(sys.argv[i+1]) if i + 1 < len(sys.argv) and sys.argv[i+1].isdigit() else 10000
+        steps = int(sys.argv[sys.argv.index("--steps")+1]) if "--steps" in sys.argv else FLEET_STEPS
+        run_fleet(n, steps)
+    elif "--headless" in sys.argv:
+        run_headless(run_episode, sys.argv, seed=SEED)
+    else:
+        run()
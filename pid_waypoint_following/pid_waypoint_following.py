@@ -1,6 +1,9 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.arcpath import ArcPath
 
 GRID = 20
 START, GOAL = (0, GRID-1), (GRID-1, 0)
@@ -60,12 +63,13 @@ def simulate_path(path, grid):
     head = np.array([float(xs[0]), float(ys[0])])
 
     pid = PID(0.5,0.0,0.1)
+    route = ArcPath(path)   # waypoint は (N,2) 配列で 1 回だけ作る
     idx=[0]
 
     def update(_):
         nonlocal head
-        if idx[0] >= len(path): return point,
-        target = np.array(path[idx[0]])
+        if idx[0] >= len(route): return point,
+        target = route.points[idx[0]]
         error = np.linalg.norm(target - head)
         if error < 0.1:
             idx[0]+=1
@@ -2,6 +2,9 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 import random, heapq
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.arcpath import ArcPath
 
 GRID = 20
 START, GOAL = (0, GRID-1), (GRID-1, 0)
@@ -25,16 +28,9 @@ def a_star(grid, start, goal):
 
 # ==== Waypoint 抽出 ====
 def extract_waypoints(path):
+    # 進む向きが変わる点（と始点・終点）だけ残す。向きは ArcPath が区間ごとに前計算済み
     if not path: return []
-    waypoints=[path[0]]
-    for i in range(1,len(path)-1):
-        prev=np.array(path[i-1])
-        curr=np.array(path[i])
-        nxt=np.array(path[i+1])
-        if not np.array_equal((curr-prev),(nxt-curr)):
-            waypoints.append(tuple(curr))
-    waypoints.append(path[-1])
-    return waypoints
+    return [path[i] for i in ArcPath(path).corners()]
 
 # ==== PID ====
 class PID:
@@ -79,12 +75,13 @@ def simulate(grid,path,waypoints):
 
     head=np.array([float(xs[0]),float(ys[0])])
     pid=PID(0.5,0.0,0.1)
+    route=ArcPath(waypoints)
     idx=[0]
 
     def update(_):
         nonlocal head
-        if idx[0]>=len(waypoints): return point,
-        target=np.array(waypoints[idx[0]])
+        if idx[0]>=len(route): return point,
+        target=route.points[idx[0]]
         error=np.linalg.norm(target-head)
         if error<0.1:
             idx[0]+=1
@@ -3,10 +3,17 @@ import matplotlib.animation as animation
 import numpy as np
 import heapq
 import random
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.arcpath import ArcPath
 
 GRID = 20
 START = (19, 0)
 GOAL = (0, 19)
+REACH_DIST = 1.0      # ゴール到達判定
+LOOKAHEAD_DIST = 1.5  # 経路上の最寄り点から弧長でどれだけ先を狙うか
+SEARCH_WINDOW = 2.0   # 最寄り点を前回の最寄り点から弧長でどこまで先まで探すか（1 フレームの移動 ≤ 0.5）
+SLOW_DIST = 4.0       # 最寄り点からゴールまでの残り弧長がこれ未満なら減速
 
 # ========= A* Pathfinding =========
 def a_star(grid, start, goal):
@@ -53,7 +60,8 @@ if not path:
     print("No path found")
     exit()
 
-waypoints = [np.array([x,y],dtype=float) for x,y in path]
+route = ArcPath(path)   # 累積弧長を前計算（waypoint は route.points）
+s_near = 0.0            # 前回の最寄り点の弧長（戻らない）
 
 # 車の状態
 pos = np.array(START,dtype=float)
@@ -76,7 +84,7 @@ def angle_between(v1,v2):
     return np.arccos(dot)
 
 def update(frame):
-    global pos, heading, speed
+    global pos, heading, speed, s_near
 
     ax.clear()
     ax.set_aspect("equal")
@@ -93,15 +101,13 @@ def update(frame):
     ax.text(*START,"START",color="green",ha="center",va="center")
     ax.text(*GOAL,"GOAL",color="blue",ha="center",va="center")
 
-    if waypoints:
-        target = waypoints[0]
+    # ゴール到達判定を緩める
+    if np.linalg.norm(route.points[-1] - pos) >= REACH_DIST:
+        # 最寄り点から弧長 LOOKAHEAD_DIST 先を狙う
+        target, s_near = route.lookahead(pos, LOOKAHEAD_DIST, s_near, SEARCH_WINDOW)
         vec = target - pos
         dist = np.linalg.norm(vec)
-
-        # waypoint到達判定を緩める
-        if dist < 1.0:
-            waypoints.pop(0)
-        else:
+        if dist > 0:
             desired = vec/dist
             err_angle = np.arctan2(desired[1],desired[0]) - np.arctan2(heading[1],heading[0])
             err_angle = np.arctan2(np.sin(err_angle),np.cos(err_angle))
@@ -116,7 +122,7 @@ def update(frame):
             speed = max(0.2, 1.0 - abs(err_angle))
 
             # ゴール直前でさらに減速
-            if len(waypoints)<5:
+            if route.remaining(s_near) < SLOW_DIST:
                 speed = 0.3
 
             pos += heading*speed*0.5  # 前進成分保証
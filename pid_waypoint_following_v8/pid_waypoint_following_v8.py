@@ -3,10 +3,19 @@ import matplotlib.animation as animation
 import numpy as np
 import heapq
 import random
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.pathcursor import PathCursor
+from avlib.arcpath import ArcPath
+from avlib.smoothing import smooth_path, resample
 
 GRID_SIZE = 20
 START = (19, 0)
 GOAL = (0, 19)
+PATH_WINDOW = 16   # 最近傍 path 点を前回の位置から何点先まで探すか
+RELOC_DIST = 2.0   # 窓内の最近傍がこれより遠ければ path 全体から探し直す
+SMOOTH_PATH = True # A* の階段を見通しで間引き、角を円弧で丸めてから追従する
+PATH_SPACING = 1.0 # 丸めた経路を打ち直す間隔（最近傍探索用）
 
 # ---------- A* ----------
 def a_star(grid, start, goal):
@@ -57,12 +66,17 @@ def main():
     if not path:
         print("No path found")
         return
+    raw_path = path
+    if SMOOTH_PATH:
+        path = [tuple(p) for p in resample(smooth_path(path, np.array(grid) == 1), PATH_SPACING)]
 
     pos = np.array(START, dtype=float)
     heading = np.array([0.0,1.0])   # 上向き
     pid = PID(2.0,0.0,0.3)
     history = [tuple(pos)]
-    lookahead = 3   # ✅ Lookahead導入
+    lookahead = 3.0   # ✅ Lookahead導入（最寄り点から弧長で何マス先を狙うか）
+    route = ArcPath(path)   # 累積弧長を前計算
+    cursor = PathCursor(path, PATH_WINDOW, RELOC_DIST)   # path は (N,2) 配列で保持
 
     fig, ax = plt.subplots()
 
@@ -93,11 +107,11 @@ def main():
             ax.set_title("Goal reached!")
             return []
 
-        # ✅ 現在位置に最も近いpath点を探す
-        dists = [np.linalg.norm(pos-np.array(p)) for p in path]
-        nearest_idx = int(np.argmin(dists))
-        target_idx = min(nearest_idx+lookahead, len(path)-1)
-        target = path[target_idx]
+        # ✅ 現在位置に最も近いpath点を探す（前回の最近傍から先の窓だけ）。
+        #    その前後の区間に射影した点から弧長 lookahead 先を狙う
+        i = cursor.nearest(pos)
+        s0 = route.s[max(i - 1, 0)]
+        target, _ = route.lookahead(pos, lookahead, s0, route.s[min(i + 1, len(route) - 1)] - s0)
 
         vec = np.array([target[0]-pos[0], target[1]-pos[1]])
         desired = vec / np.linalg.norm(vec)
@@ -126,6 +140,7 @@ def main():
         history.append(tuple(pos))
 
         # 描画
+        ax.plot(*zip(*raw_path),"k:",alpha=0.2)   # A* path
         ax.plot(*zip(*path),"k--",alpha=0.3)   # 参照path
         ax.plot(*zip(*history),"b-")           # 実際の走行
         ax.plot(pos[0],pos[1],"ro")
@@ -3,7 +3,10 @@ import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 import heapq
 import random
-from collections import deque
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.scenario import random_scenario
+from avlib.connectivity import ConnectivityOracle
 
 # ---------------------------
 # Config
@@ -29,22 +32,6 @@ def neighbors(cell):
         if in_bounds(nx, ny):
             yield (nx, ny)
 
-# ---------- connectivity check (BFS) ----------
-def is_connected(grid, start, goal):
-    if grid[start[1]][start[0]] == 1 or grid[goal[1]][goal[0]] == 1:
-        return False
-    seen = set([start])
-    q = deque([start])
-    while q:
-        cur = q.popleft()
-        if cur == goal:
-            return True
-        for nb in neighbors(cur):
-            if nb not in seen and grid[nb[1]][nb[0]] == 0:
-                seen.add(nb)
-                q.append(nb)
-    return False
-
 # ---------- A* ----------
 def a_star(grid, start, goal):
     # Manhattan heuristic
@@ -66,22 +53,8 @@ def a_star(grid, start, goal):
 
 # ---------- generate initial grid while preserving connectivity ----------
 def generate_grid():
-    grid = [[0]*GRID_SIZE for _ in range(GRID_SIZE)]
-    placed = 0
-    attempts = 0
-    while placed < INITIAL_OBSTACLES and attempts < INITIAL_OBSTACLES*20:
-        attempts += 1
-        x = random.randrange(GRID_SIZE)
-        y = random.randrange(GRID_SIZE)
-        if (x,y) in (START, GOAL) or grid[y][x] == 1:
-            continue
-        # tentatively place and test connectivity
-        grid[y][x] = 1
-        if is_connected(grid, START, GOAL):
-            placed += 1
-        else:
-            grid[y][x] = 0  # rollback
-    return grid
+    # 1個置くたびに BFS する代わりに、連結成分ラベリング済みのマップのプール（avlib.scenario）から選ぶ
+    return random_scenario(GRID_SIZE, INITIAL_OBSTACLES, START, GOAL)
 
 # ---------- sensor model ----------
 # Our car has three binary sensors relative to facing: (left, front, right)
@@ -115,6 +88,8 @@ def read_sensors(grid, pos, facing_idx):
 # ---------- dynamic obstacle adder but preserves connectivity ----------
 def add_dynamic_obstacle_preserve_connectivity(grid):
     # try a few times to find a random cell that is free and doesn't disconnect Start-Goal
+    # (ConnectivityOracle answers without re-running BFS over the whole map)
+    oracle.set_source(current_pos)  # ensure connectivity from current pos too
     tries = 0
     while tries < 50:
         tries += 1
@@ -124,16 +99,14 @@ def add_dynamic_obstacle_preserve_connectivity(grid):
             continue
         if grid[y][x] == 1:
             continue
-        # tentatively place
-        grid[y][x] = 1
-        if is_connected(grid, current_pos, GOAL):  # ensure connectivity from current pos too
+        if oracle.try_block((x,y)):
             return (x,y)
-        # rollback
-        grid[y][x] = 0
     return None
 
 # ---------- main simulation (with Matplotlib animation) ----------
 grid = generate_grid()
+# connectivity oracle shared by every obstacle insertion (it updates grid in place)
+oracle = ConnectivityOracle(grid, START, GOAL)
 # Keep a separate overlay of detected obstacles (so we can mark where sensors actually saw them)
 detected_overlay = [[False]*GRID_SIZE for _ in range(GRID_SIZE)]
 
@@ -247,10 +220,8 @@ def update(frame):
                 # update map (we choose to immediately mark them as obstacles to enforce replan)
                 if grid[y][x] == 0:
                     # But ensure marking doesn't disconnect Start-Goal
-                    grid[y][x] = 1
-                    if not is_connected(grid, current_pos, GOAL):
-                        grid[y][x] = 0  # rollback if disconnects
-                    else:
+                    oracle.set_source(current_pos)
+                    if oracle.try_block(c):
                         print("Sensor-detected obstacle recorded at", c)
 
         # if front is free, move forward
@@ -293,6 +264,7 @@ def update(frame):
     dynamic_counter += 1
     if dynamic_counter % DYNAMIC_OBSTACLE_INTERVAL == 0:
         # try to add a dynamic obstacle that does not disconnect start-goal
+        oracle.set_source(current_pos)
         tries = 0
         added = False
         while tries < 30 and not added:
@@ -301,12 +273,9 @@ def update(frame):
             ry = random.randrange(GRID_SIZE)
             if (rx,ry) in (START, GOAL) or grid[ry][rx] == 1 or (rx,ry) == current_pos:
                 continue
-            grid[ry][rx] = 1
-            if is_connected(grid, current_pos, GOAL):
+            if oracle.try_block((rx,ry)):
                 print("Dynamic obstacle added at", (rx,ry))
                 added = True
-            else:
-                grid[ry][rx] = 0
 
     # if reached goal
     if current_pos == GOAL:
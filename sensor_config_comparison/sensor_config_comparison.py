@@ -2,12 +2,17 @@ import random
 import matplotlib.pyplot as plt
 import heapq
 import numpy as np
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.experiment import run_trials, success_rate
 
 # マップ設定
 GRID_SIZE = 10
 START = (9, 0)
 GOAL = (0, 9)
 OBSTACLE_COUNT = 20
+SEED = 0         # 試行ごとのシードの元（ワーカー数に依らず再現）
+WORKERS = None   # None=CPUコア数, 1=並列化しない
 
 # ====== A* 探索 ======
 def a_star(grid, start, goal):
@@ -74,26 +79,32 @@ def perceive_environment(grid, mode="front3", distance=3, false_pos=0.05, false_
     return perceived
 
 # ====== 実験関数 ======
+def run_trial(mode, distance=3, false_pos=0.05, false_neg=0.05):
+    grid = generate_grid()
+    perceived_grid = perceive_environment(grid, mode, distance, false_pos, false_neg)
+    path = a_star(perceived_grid, START, GOAL)
+    return bool(path)
+
 def run_experiment(mode, trials=50, distance=3, false_pos=0.05, false_neg=0.05):
-    success_count = 0
-    for _ in range(trials):
-        grid = generate_grid()
-        perceived_grid = perceive_environment(grid, mode, distance, false_pos, false_neg)
-        path = a_star(perceived_grid, START, GOAL)
-        if path:
-            success_count += 1
-    return success_count / trials
+    # 試行はプロセス並列（試行ごとのシード固定）
+    results = run_trials(run_trial, [(mode, distance, false_pos, false_neg)], trials, seed=SEED, workers=WORKERS)
+    return success_rate(results)[0]
 
 # ====== 実験実行 ======
-trials = 100
-fp, fn = 0.05, 0.05
+def main():
+    trials = 100
+    fp, fn = 0.05, 0.05
+
+    # 2 構成分をまとめて 1 つのプールに投げる
+    settings = [(mode, 3, fp, fn) for mode in ("front3", "lidar360")]
+    front3_success, lidar_success = success_rate(run_trials(run_trial, settings, trials, seed=SEED, workers=WORKERS))
 
-front3_success = run_experiment("front3", trials=trials, distance=3, false_pos=fp, false_neg=fn)
-lidar_success = run_experiment("lidar360", trials=trials, distance=3, false_pos=fp, false_neg=fn)
+    # ====== 可視化 ======
+    plt.bar(["Front 3 Sensors", "360° LiDAR"], [front3_success, lidar_success], color=["orange", "blue"])
+    plt.ylim(0,1)
+    plt.ylabel("Success Rate")
+    plt.title(f"Sensor Config Comparison (Trials={trials}, FP={fp}, FN={fn})")
+    plt.show()
 
-# ====== 可視化 ======
-plt.bar(["Front 3 Sensors", "360° LiDAR"], [front3_success, lidar_success], color=["orange", "blue"])
-plt.ylim(0,1)
-plt.ylabel("Success Rate")
-plt.title(f"Sensor Config Comparison (Trials={trials}, FP={fp}, FN={fn})")
-plt.show()
+if __name__ == "__main__":
+    main()
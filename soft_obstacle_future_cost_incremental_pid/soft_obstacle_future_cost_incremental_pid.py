@@ -1,7 +1,16 @@
 # Filename suggestion: soft_obstacle_future_cost_incremental_pid.py
-import random, heapq, math, time
+import random, time
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
+import numpy as np
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from avlib.grid_astar import get_planner
+from avlib.kernels import inflation_offsets, stamp_kernel
+from avlib.costmap import LayeredCostMap
+from avlib.plantrack import PlanTracker
+from avlib.dynobs import DynamicObstacles, velocity_candidates
+from avlib.scenario import random_scenario
 
 # --------------------------
 # Config
@@ -15,6 +24,7 @@ DYNAMIC_OBS = 4
 
 SEED = 123
 random.seed(SEED)
+np.random.seed(SEED)
 
 # Future prediction horizon (frames) and inflation params
 PRED_HORIZON = 3
@@ -23,9 +33,9 @@ INFLATION_WEIGHT = 4.0       # larger -> avoid more
 INFLATION_METRIC = "euclid"  # "euclid" or "manhattan"
 
 # incremental replanning parameters
-LOOKAHEAD_CHECK_K = 2  # if planned path remains valid for next k steps, reuse
 REPLAN_ON_HIGH_COST = True  # if next cell cost too high, trigger replanning
 HIGH_COST_THRESHOLD = 2.5
+REPAIR_MARGIN = 2  # local repair window margin (cells) around the invalid segment
 
 # PID-like smooth motion params (simple P-term)
 P_GAIN = 0.6
@@ -34,175 +44,67 @@ DT = 0.08  # pause time between rendering updates (sec)
 MAX_STEPS = 500
 MAX_WAIT = 3
 
-# --------------------------
-# Utilities
-# --------------------------
-def in_bounds(x,y): return 0 <= x < GRID and 0 <= y < GRID
-def neighbors4(x,y):
-    return [(x+1,y),(x-1,y),(x,y+1),(x,y-1)]
-def manhattan(a,b): return abs(a[0]-b[0])+abs(a[1]-b[1])
-def euclid(a,b): return math.hypot(a[0]-b[0], a[1]-b[1])
-def dist(a,b):
-    return manhattan(a,b) if INFLATION_METRIC=="manhattan" else euclid(a,b)
-
 # --------------------------
 # Grid generation
 # --------------------------
-def empty_grid(): return [[0]*GRID for _ in range(GRID)]
 def generate_static():
-    while True:
-        g = empty_grid()
-        p = 0
-        while p < STATIC_OBS:
-            x = random.randrange(GRID); y = random.randrange(GRID)
-            if (x,y) in (START,GOAL): continue
-            if g[y][x]==0:
-                g[y][x]=1
-                p+=1
-        # ensure at least one path exists ignoring dynamic costs:
-        if a_star(g, START, GOAL): 
-            return g
-
-# --------------------------
-# A* plain (no inflation) used for validation
-# --------------------------
-def a_star(grid, start, goal):
-    if start==goal: return [start]
-    h = lambda a,b: manhattan(a,b)
-    openq = [(h(start,goal), 0, start, None)]
-    came = {}
-    costg = {start:0}
-    visited=set()
-    while openq:
-        f,gc,cur,parent = heapq.heappop(openq)
-        if cur in visited: continue
-        visited.add(cur); came[cur]=parent
-        if cur==goal:
-            path=[]
-            n=cur
-            while n is not None:
-                path.append(n); n=came[n]
-            return list(reversed(path))
-        for nx,ny in neighbors4(*cur):
-            if not in_bounds(nx,ny) or grid[ny][nx]==1: continue
-            ng = gc + 1
-            if (nx,ny) not in costg or ng < costg[(nx,ny)]:
-                costg[(nx,ny)] = ng
-                heapq.heappush(openq, (ng + h((nx,ny),goal), ng, (nx,ny), cur))
-    return []
-
-# --------------------------
-# A* with inflation cost (soft obstacles)
-# --------------------------
-def a_star_with_inflation(grid, start, goal, inflation_cost):
-    if start==goal: return [start]
-    if grid[goal[1]][goal[0]]==1 or grid[start[1]][start[0]]==1: return []
-    h = lambda a,b: manhattan(a,b)
-    openq = [(h(start,goal), 0.0, start, None)]
-    came = {}
-    gvals = {start:0.0}
-    visited=set()
-    while openq:
-        f,gc,cur,parent = heapq.heappop(openq)
-        if cur in visited: continue
-        visited.add(cur); came[cur]=parent
-        if cur==goal:
-            path=[]; n=cur
-            while n is not None:
-                path.append(n); n=came[n]
-            return list(reversed(path))
-        for nx,ny in neighbors4(*cur):
-            if not in_bounds(nx,ny): continue
-            if grid[ny][nx]==1: continue  # static block
-            step_cost = 1.0 + inflation_cost[ny][nx]
-            ng = gc + step_cost
-            if (nx,ny) not in gvals or ng < gvals[(nx,ny)]:
-                gvals[(nx,ny)] = ng
-                heapq.heappush(openq, (ng + h((nx,ny),goal), ng, (nx,ny), cur))
-    return []
+    # pick a map from the cached pool in avlib.scenario (START-GOAL connectivity guaranteed)
+    return random_scenario(GRID, STATIC_OBS, START, GOAL)
 
 # --------------------------
 # Inflation cost builder with future prediction
 # --------------------------
 def build_inflation_cost(dynamic_list):
-    C = [[0.0]*GRID for _ in range(GRID)]
-    for (ox,oy, vx,vy) in dynamic_list:
-        # for each predicted future step
-        for t in range(PRED_HORIZON+1):
-            px = ox + vx*t
-            py = oy + vy*t
-            # round to nearest integer cell (we allow subcell if desired)
-            for y in range(GRID):
-                for x in range(GRID):
-                    d = dist((x,y),(px,py))
-                    if d <= INFLATION_RADIUS:
-                        # simple attenuation
-                        C[y][x] += INFLATION_WEIGHT * (1.0/(d+1.0)) * (1.0/(t+1.0))  # future-decay
-    return C
+    # kernel offsets within INFLATION_RADIUS (cached per radius/metric) are stamped
+    # only around each predicted position instead of scanning the whole grid
+    dx, dy, d = inflation_offsets(INFLATION_RADIUS, INFLATION_METRIC)
+    if len(dynamic_list) == 0:
+        return np.zeros((GRID, GRID))
+    ox, oy, vx, vy = (a[:, None] for a in np.asarray(dynamic_list, dtype=np.intp).T)
+    # predicted positions for t = 0..PRED_HORIZON, shape (obstacles, T)
+    t = np.arange(PRED_HORIZON+1)[None, :]
+    px = ox + vx*t
+    py = oy + vy*t
+    # simple attenuation 1/(d+1) with future-decay 1/(t+1)
+    return stamp_kernel((GRID, GRID), px, py, 1.0/(t+1.0), dx, dy, INFLATION_WEIGHT / (d + 1.0))
 
 # --------------------------
 # Dynamic obstacles logic (with velocity)
 # --------------------------
 def spawn_dynamic(grid, n):
-    dyn=[]
+    dyn=[]; taken=set()
     tries=0
     while len(dyn)<n and tries<2000:
         tries+=1
         x,y = random.randrange(GRID), random.randrange(GRID)
-        if (x,y) in (START,GOAL) or grid[y][x]==1: continue
+        if (x,y) in (START,GOAL) or grid[y][x]==1 or (x,y) in taken: continue
         # give small velocity -1/0/1 each axis
         vx,vy = random.choice([-1,0,1]), random.choice([-1,0,1])
-        dyn.append([x,y,vx,vy])
-    return dyn
+        dyn.append([x,y,vx,vy]); taken.add((x,y))
+    # struct-of-arrays (x, y, vx, vy) + occupancy bitmap
+    return DynamicObstacles.from_rows((GRID, GRID), dyn)
 
-def move_dyn(grid, dyn, car_pos):
-    occupied=set()
-    for d in dyn: occupied.add((d[0],d[1]))
-    newdyn=[]
-    for (x,y,vx,vy) in dyn:
-        # propose next using velocity plus small randomness
-        cand_positions = []
-        # keep same velocity attempt
-        nx,ny = x+vx, y+vy
-        cand_positions.append((nx,ny,vx,vy))
-        # try to jitter velocity
-        for dvx in (-1,0,1):
-            for dvy in (-1,0,1):
-                cand_positions.append((x+dvx, y+dvy, dvx, dvy))
-        random.shuffle(cand_positions)
-        chosen = (x,y,vx,vy)
-        for nx,ny,nvx,nvy in cand_positions:
-            if not in_bounds(nx,ny): continue
-            if grid[ny][nx]==1: continue
-            if (nx,ny) in (START,GOAL): continue
-            if (nx,ny)==car_pos: continue
-            # avoid overlapping other dynamics in new positions
-            if (nx,ny) in occupied: continue
-            # accept
-            chosen=(nx,ny,nvx,nvy)
-            occupied.add((nx,ny))
-            break
-        newdyn.append([chosen[0],chosen[1], chosen[2], chosen[3]])
-    return newdyn
+def move_dyn(static_blocked, dyn, car_pos):
+    """Move all dynamics in place: keep-velocity + all 9 jitter velocities, shuffled per
+    obstacle; conflicts are resolved in bulk against the occupancy bitmap"""
+    cdx, cdy = velocity_candidates(dyn.vx, dyn.vy)
+    dyn.move(cdx, cdy, static_blocked, [START, GOAL, car_pos], set_velocity=True)
 
 # --------------------------
 # Incremental replanning helper
 # --------------------------
-def is_plan_still_ok(plan, inflation_cost, dynamic_list, curidx, car_pos):
-    """Check lookahead steps in plan: if next LOOKAHEAD_CHECK_K cells have very high cost or occupied by dynamic obstacle -> not ok"""
-    # if plan too short -> not ok
-    if not plan or curidx >= len(plan)-1: return False
-    for k in range(1, LOOKAHEAD_CHECK_K+1):
-        idx = curidx + k
-        if idx >= len(plan): break
-        cell = plan[idx]
-        x,y = cell
-        # occupied by dynamic now?
-        for dx,dy,vx,vy in dynamic_list:
-            if (x,y)==(dx,dy): return False
-        if inflation_cost[y][x] >= HIGH_COST_THRESHOLD: 
-            return False
-    return True
+def plan_hazards(inflation_cost, dynamic_list, blocked):
+    """Masks for the lookahead check: hard = static + cells occupied by a dynamic now,
+    bad = very high cost cells (only if REPLAN_ON_HIGH_COST)"""
+    hard = blocked.copy()
+    if len(dynamic_list):
+        d = np.asarray(dynamic_list, dtype=np.intp)
+        hard[d[:, 1], d[:, 0]] = True
+    if REPLAN_ON_HIGH_COST:
+        bad = np.asarray(inflation_cost) >= HIGH_COST_THRESHOLD
+    else:
+        bad = np.zeros_like(hard)
+    return hard, bad
 
 # --------------------------
 # Main simulation
@@ -213,9 +115,20 @@ dynamic = spawn_dynamic(grid, DYNAMIC_OBS)
 # car state (continuous pos for smooth rendering)
 car_cell = START
 car_pos = [float(START[0]), float(START[1])]
-path_plan = a_star(grid, car_cell, GOAL)  # initial plain plan
-infl_cost = build_inflation_cost([(x,y,vx,vy) for x,y,vx,vy in dynamic])
-path_plan = a_star_with_inflation(grid, car_cell, GOAL, infl_cost)
+# soft costs only (the planners get 1.0 + inflation as the step cost);
+# the inflation layer is rebuilt only when the dynamic obstacles' state changes
+costmap = LayeredCostMap((GRID, GRID), base=0.0, static_blocked=grid)
+costmap.add_layer("inflation", build_inflation_cost)
+costmap.update("inflation", dynamic.state())
+infl_cost, _ = costmap.compose()
+# full plans and local repairs both use avlib.grid_astar on the same cost model
+planner = get_planner((GRID, GRID))
+# keeps the plan between frames; only the invalid segment is repaired locally
+tracker = PlanTracker(REPAIR_MARGIN)
+tracker.set_path(planner.plan(car_cell, GOAL, costmap.static_blocked, 1.0 + infl_cost),
+                 infl_cost >= HIGH_COST_THRESHOLD)
+path_plan = tracker.path
+hazards = None  # (hard, bad) of the previous frame, to find the cells that changed
 
 history_forward = [car_cell]
 history_back = []
@@ -251,12 +164,12 @@ def draw_dynamic():
     global dyn_marks
     for t in dyn_marks: t.remove()
     dyn_marks=[]
-    for (x,y,vx,vy) in dynamic:
+    for (x,y) in dynamic.cells():
         dyn_marks.append(ax.text(x,y,"■",ha="center",va="center", color="orange"))
 
 def update_frame(_):
-    global dynamic, path_plan, car_cell, car_pos, history_forward, history_back
-    global wait, step, goal_reached
+    global path_plan, car_cell, car_pos, history_forward, history_back
+    global wait, step, goal_reached, hazards
 
     if goal_reached:
         # keep final display static
@@ -268,15 +181,23 @@ def update_frame(_):
         return forward_line, back_line, plan_line, car_dot
 
     # move dynamics first (they move independently)
-    dynamic = move_dyn(grid, dynamic, car_cell)
+    move_dyn(costmap.static_blocked, dynamic, car_cell)
 
     # build inflation cost including predicted future
-    infl = build_inflation_cost([(x,y,vx,vy) for x,y,vx,vy in dynamic])
-
-    # incremental replanning: check if existing plan is still ok
-    if not is_plan_still_ok(path_plan, infl, dynamic, 0, car_cell):
-        # recompute plan from current cell
-        path_plan = a_star_with_inflation(grid, car_cell, GOAL, infl)
+    costmap.update("inflation", dynamic.state())
+    infl, static_blocked = costmap.compose()
+
+    # incremental replanning: only cells whose hazard state changed are checked against the plan
+    # (advance along the plan, repair the broken segment, or recompute from current cell)
+    hard, bad = plan_hazards(infl, dynamic.xy(), static_blocked)
+    changed = None
+    if hazards is not None:
+        ys, xs = np.nonzero((hard != hazards[0]) | (bad != hazards[1]))
+        changed = (xs, ys)
+    hazards = (hard, bad)
+    tracker.update(car_cell, 1.0 + infl, hard, bad,
+                   lambda: planner.plan(car_cell, GOAL, static_blocked, 1.0 + infl), changed)
+    path_plan = tracker.path
 
     # if no plan, try wait/backtrack policy
     if not path_plan or len(path_plan) < 2:
@@ -296,7 +217,7 @@ def update_frame(_):
         wait = 0
         nxt = path_plan[1]
         # if next is currently occupied by a dynamic -> wait (reactive)
-        occupied_now = any((nxt[0]==dx and nxt[1]==dy) for dx,dy,vx,vy in dynamic)
+        occupied_now = dynamic.occupied(nxt)
         if occupied_now:
             wait += 1
         else: